@@ -0,0 +1,676 @@
+#!/usr/bin/env python3
+"""
+ALS MODEL - IMPLICIT-FEEDBACK MATRIX FACTORIZATION
+Retrain collaborative filtering từ ratings export của DataController (/api/internal/data/ratings)
+hoặc ratings.pkl bằng alternating least squares thuần NumPy: ratings -> CSR matrix, mỗi half-iteration
+giải per-user / per-item least squares (conjugate gradient hoặc direct solves) song song trên thread
+pool, rồi ghi model bundle mà service load trực tiếp (mappings.pkl + als_weights.npz + metadata)
+
+    python als_model.py --ratings http://podcastrecommendation-api/api/internal/data/ratings --output-dir ./models-als
+    python als_model.py --ratings ./models/ratings.pkl --output-dir ./models-als --factors 64 --workers 16
+"""
+
+import argparse
+import json
+import logging
+import os
+import pickle
+import shutil
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ncf_model import DEFAULT_OUTPUT_RANGE, SCORE_CHUNK_ROWS, output_range_from_metadata
+
+logger = logging.getLogger(__name__)
+
+WEIGHTS_FILE = "als_weights.npz"
+
+# Factors + calibration next to the raw .npy arrays (model_artifacts)
+NPY_CONFIG_FILE = "als_config.json"
+
+# Implicit feedback (Hu, Koren & Volinsky 2008): rating >= threshold là preference 1, thấp hơn là 0;
+# confidence = 1 + alpha * |rating - NEUTRAL_RATING| (rating càng xa mức trung tính càng chắc chắn)
+PREFERENCE_THRESHOLD = 3.0
+NEUTRAL_RATING = 2.5
+
+# Entries (ratings) mỗi chunk của một half-iteration; mỗi chunk là một task của thread pool
+CHUNK_ENTRIES = 65536
+
+SOLVERS = ('cg', 'direct')
+
+
+def preference_confidence(ratings: np.ndarray, alpha: float) -> Tuple[np.ndarray, np.ndarray]:
+    """(preference p in {0, 1}, confidence c >= 1) cho explicit ratings 1-5"""
+    ratings = np.asarray(ratings, dtype=np.float32)
+    preference = (ratings >= PREFERENCE_THRESHOLD).astype(np.float32)
+    confidence = 1.0 + np.float32(alpha) * np.abs(ratings - np.float32(NEUTRAL_RATING))
+    return preference, confidence
+
+
+class ALSModel:
+    """Matrix factorization: rating = offset + scale * (user factors . podcast factors), clip vào output range.
+
+    Cùng interface với NCFModel (embeddings, projections, score_*, fold_in) nên ScoringEngine,
+    user-vector overlay và similar podcasts dùng được cả hai; "projection" ở đây chính là factors.
+    """
+
+    def __init__(
+        self,
+        user_factors: np.ndarray,
+        podcast_factors: np.ndarray,
+        offset: float = 0.0,
+        scale: float = 1.0,
+        output_range: Tuple[float, float] = DEFAULT_OUTPUT_RANGE,
+        alpha: float = 10.0,
+    ):
+        self.user_embeddings = np.ascontiguousarray(user_factors, dtype=np.float32)
+        self.podcast_embeddings = np.ascontiguousarray(podcast_factors, dtype=np.float32)
+        if self.user_embeddings.shape[1] != self.podcast_embeddings.shape[1]:
+            raise ValueError("User and podcast factors must have the same dimension")
+        self.user_projection = self.user_embeddings
+        self.podcast_projection = self.podcast_embeddings
+        self.offset = float(offset)
+        self.scale = float(scale)
+        self.output_range = (float(output_range[0]), float(output_range[1]))
+        self.alpha = float(alpha)
+        self._gram = None  # type: Optional[np.ndarray]  # podcast factors^T @ podcast factors (fold-in)
+
+    @property
+    def num_users(self) -> int:
+        return self.user_embeddings.shape[0]
+
+    @property
+    def num_podcasts(self) -> int:
+        return self.podcast_embeddings.shape[0]
+
+    @property
+    def embedding_size(self) -> int:
+        return self.user_embeddings.shape[1]
+
+    @property
+    def num_parameters(self) -> int:
+        return int(self.user_embeddings.size + self.podcast_embeddings.size + 2)
+
+    # ------------------------------------------------------------------ #
+    # Loading / export
+    # ------------------------------------------------------------------ #
+    def _config(self) -> Dict[str, Any]:
+        return {
+            'offset': self.offset,
+            'scale': self.scale,
+            'output_range': list(self.output_range),
+            'alpha': self.alpha,
+        }
+
+    @classmethod
+    def from_npz(cls, path: Path) -> "ALSModel":
+        with np.load(path, allow_pickle=False) as data:
+            config = json.loads(str(data['config']))
+            return cls(data['user_factors'], data['podcast_factors'], config['offset'], config['scale'],
+                       tuple(config['output_range']), config['alpha'])
+
+    def save_npz(self, path: Path) -> None:
+        np.savez(path, user_factors=self.user_embeddings, podcast_factors=self.podcast_embeddings,
+                 config=np.array(json.dumps(self._config())))
+
+    @classmethod
+    def from_npy_dir(cls, directory: Path, mmap_mode: Optional[str] = 'r') -> "ALSModel":
+        """Load raw .npy factors written by `save_npy_dir`, memory-mapped by default"""
+        config = json.loads((directory / NPY_CONFIG_FILE).read_text())
+
+        def load(name: str) -> np.ndarray:
+            return np.load(directory / f"{name}.npy", mmap_mode=mmap_mode, allow_pickle=False)
+
+        return cls(load('user_factors'), load('podcast_factors'), config['offset'], config['scale'],
+                   tuple(config['output_range']), config['alpha'])
+
+    def save_npy_dir(self, directory: Path) -> None:
+        directory.mkdir(parents=True, exist_ok=True)
+        np.save(directory / "user_factors.npy", self.user_embeddings)
+        np.save(directory / "podcast_factors.npy", self.podcast_embeddings)
+        (directory / NPY_CONFIG_FILE).write_text(json.dumps(self._config()))
+
+    # ------------------------------------------------------------------ #
+    # Inference
+    # ------------------------------------------------------------------ #
+    def _rating(self, dots: np.ndarray) -> np.ndarray:
+        low, high = self.output_range
+        dots *= np.float32(self.scale)
+        dots += np.float32(self.offset)
+        return np.clip(dots, low, high, out=dots)
+
+    def predict(self, user_indices: np.ndarray, podcast_indices: np.ndarray) -> np.ndarray:
+        """Pairwise prediction, cùng contract với NCFModel.predict"""
+        user_indices = np.asarray(user_indices, dtype=np.int64)
+        podcast_indices = np.asarray(podcast_indices, dtype=np.int64)
+        out = np.empty(len(user_indices), dtype=np.float32)
+        for start in range(0, len(user_indices), SCORE_CHUNK_ROWS):
+            end = start + SCORE_CHUNK_ROWS
+            out[start:end] = self._rating(np.einsum(
+                'ij,ij->i', self.user_embeddings[user_indices[start:end]],
+                self.podcast_embeddings[podcast_indices[start:end]]))
+        return out
+
+    def score_user(self, user_index: int, podcast_indices: np.ndarray) -> np.ndarray:
+        """Ratings of one user against many podcasts"""
+        podcast_indices = np.asarray(podcast_indices, dtype=np.int64)
+        return self._rating(self.podcast_embeddings[podcast_indices] @ self.user_embeddings[user_index])
+
+    def score_users(self, user_indices: np.ndarray, podcast_indices: np.ndarray) -> np.ndarray:
+        """(users x podcasts) rating block = một matrix multiply"""
+        user_indices = np.asarray(user_indices, dtype=np.int64)
+        return self.score_projections(self.user_embeddings[user_indices], podcast_indices)
+
+    def score_projections(self, user_rows: np.ndarray, podcast_indices: np.ndarray) -> np.ndarray:
+        """`score_users` với user factors cho sẵn (vd. folded-in users)"""
+        podcast_indices = np.asarray(podcast_indices, dtype=np.int64)
+        return self.score_rows(user_rows, self.podcast_embeddings[podcast_indices])
+
+    def score_rows(self, user_rows: np.ndarray, podcast_rows: np.ndarray) -> np.ndarray:
+        """(users x podcasts) ratings từ factors của cả hai phía (vd. ANN centroids)"""
+        user_rows = np.asarray(user_rows, dtype=np.float32)
+        return self._rating(user_rows @ np.asarray(podcast_rows, dtype=np.float32).T)
+
+    # ------------------------------------------------------------------ #
+    # Online fold-in
+    # ------------------------------------------------------------------ #
+    def project_user(self, embedding: np.ndarray) -> np.ndarray:
+        return np.asarray(embedding, dtype=np.float32)
+
+    def fold_in(
+        self,
+        podcast_indices: np.ndarray,
+        ratings: np.ndarray,
+        prior: np.ndarray,
+        regularization: float = 10.0,
+        steps: int = 1,
+    ) -> np.ndarray:
+        """User factors cập nhật theo `ratings` mới, podcast factors giữ nguyên - một d x d solve chính xác.
+
+        Objective của user quanh `prior` được xấp xỉ bằng (x - prior)^T (Y^T Y + regularization I) (x - prior),
+        cộng thêm sum c (p - x . y)^2 của các ratings mới; không có ratings -> đúng `prior`.
+        `steps` không dùng (objective là quadratic, đã giải chính xác).
+        """
+        podcast_rows = self.podcast_embeddings[np.asarray(podcast_indices, dtype=np.int64)]
+        preference, confidence = preference_confidence(ratings, self.alpha)
+        prior = np.asarray(prior, dtype=np.float32)
+        if self._gram is None:
+            self._gram = self.podcast_embeddings.T @ self.podcast_embeddings
+        anchor = self._gram.copy()
+        anchor.flat[::self.embedding_size + 1] += regularization
+        weighted = podcast_rows * confidence[:, None]
+        system = anchor + weighted.T @ podcast_rows
+        rhs = anchor @ prior + weighted.T @ preference
+        return np.linalg.solve(system, rhs).astype(np.float32)
+
+
+# ---------------------------------------------------------------------- #
+# Training
+# ---------------------------------------------------------------------- #
+class RatingsMatrix:
+    """(users x podcasts) ratings dạng CSR + bản transpose, để cả user lẫn item solves đọc
+    entries của một row liên tục. Một entry mỗi (user, podcast): giữ rating mới nhất."""
+
+    def __init__(self, rows: np.ndarray, cols: np.ndarray, values: np.ndarray, shape: Tuple[int, int]):
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float32)
+        self.shape = shape
+        # Duplicates: input theo thứ tự thời gian, giữ entry cuối của mỗi key
+        keys = rows * shape[1] + cols
+        _, last = np.unique(keys[::-1], return_index=True)
+        keep = len(keys) - 1 - last
+        self.rows, self.cols, self.values = rows[keep], cols[keep], values[keep]
+        self.indptr, self.indices, self.data = _csr(self.rows, self.cols, self.values, shape[0])
+        self.t_indptr, self.t_indices, self.t_data = _csr(self.cols, self.rows, self.values, shape[1])
+
+    @property
+    def nnz(self) -> int:
+        return len(self.values)
+
+
+def _csr(rows: np.ndarray, cols: np.ndarray, values: np.ndarray, num_rows: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    order = np.argsort(rows, kind='stable')
+    indptr = np.zeros(num_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=num_rows), out=indptr[1:])
+    return indptr, cols[order].astype(np.int32), values[order]
+
+
+def _chunks(indptr: np.ndarray, entries: int) -> List[Tuple[int, int]]:
+    """Row ranges chứa ~`entries` entries mỗi range (một row lớn vẫn nằm trọn trong một range)"""
+    num_rows = len(indptr) - 1
+    bounds = np.searchsorted(indptr, np.arange(entries, int(indptr[-1]) + entries, entries), side='right')
+    bounds = np.unique(np.clip(np.concatenate([[0], bounds, [num_rows]]), 0, num_rows))
+    return list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+
+def _segment_sum(values: np.ndarray, starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Tổng `values` theo CSR segments; segments rỗng -> 0 (np.add.reduceat không xử lý được)"""
+    out = np.zeros((len(lengths),) + values.shape[1:], dtype=values.dtype)
+    nonempty = lengths > 0
+    if nonempty.any():
+        out[nonempty] = np.add.reduceat(values, starts[nonempty], axis=0)
+    return out
+
+
+def _solve_rows(
+    indptr: np.ndarray,
+    indices: np.ndarray,
+    ratings: np.ndarray,
+    other: np.ndarray,
+    factors: np.ndarray,
+    gram: np.ndarray,
+    alpha: float,
+    solver: str,
+    cg_steps: int,
+    start: int,
+    stop: int,
+) -> None:
+    """Cập nhật factors[start:stop] in-place: với mỗi row u (Y = `other`, C_u = confidences của row)
+
+        (Y^T Y + Y_u^T (C_u - I) Y_u + lambda I) x_u = Y_u^T C_u p_u
+
+    `gram` = Y^T Y + lambda I, dùng chung cho mọi row. CG chạy batched trên cả chunk, warm-start
+    từ factors hiện tại; direct build và giải các (d x d) systems bằng một batched LAPACK call.
+    """
+    lo, hi = int(indptr[start]), int(indptr[stop])
+    lengths = np.diff(indptr[start:stop + 1])
+    starts = indptr[start:stop] - lo
+    vectors = other[indices[lo:hi]]
+    preference, confidence = preference_confidence(ratings[lo:hi], alpha)
+    rhs = _segment_sum(vectors * (confidence * preference)[:, None], starts, lengths)
+    weights = confidence - 1.0
+
+    if solver == 'direct':
+        systems = np.empty((stop - start,) + gram.shape, dtype=np.float32)
+        for row, (lo_row, hi_row) in enumerate(zip(starts.tolist(), (starts + lengths).tolist())):
+            block = vectors[lo_row:hi_row]
+            np.matmul((block * weights[lo_row:hi_row, None]).T, block, out=systems[row])
+        systems += gram
+        factors[start:stop] = np.linalg.solve(systems, rhs[..., None])[..., 0]
+        return
+
+    def multiply(x: np.ndarray) -> np.ndarray:
+        dots = np.einsum('ij,ij->i', vectors, np.repeat(x, lengths, axis=0))
+        return x @ gram + _segment_sum(vectors * (weights * dots)[:, None], starts, lengths)
+
+    x = factors[start:stop].copy()
+    residual = rhs - multiply(x)
+    direction = residual.copy()
+    rs_old = np.einsum('ij,ij->i', residual, residual)
+    for _ in range(cg_steps):
+        product = multiply(direction)
+        step = rs_old / np.maximum(np.einsum('ij,ij->i', direction, product), 1e-20)
+        x += step[:, None] * direction
+        residual -= step[:, None] * product
+        rs_new = np.einsum('ij,ij->i', residual, residual)
+        if float(rs_new.max(initial=0.0)) < 1e-10:
+            break
+        direction = residual + (rs_new / np.maximum(rs_old, 1e-20))[:, None] * direction
+        rs_old = rs_new
+    factors[start:stop] = x
+
+
+def _half_iteration(
+    pool: ThreadPoolExecutor,
+    indptr: np.ndarray,
+    indices: np.ndarray,
+    ratings: np.ndarray,
+    other: np.ndarray,
+    factors: np.ndarray,
+    regularization: float,
+    alpha: float,
+    solver: str,
+    cg_steps: int,
+) -> None:
+    """Giải tất cả rows của một phía (users hoặc podcasts); các chunks ghi vào các row ranges rời nhau"""
+    gram = other.T @ other
+    gram.flat[::other.shape[1] + 1] += regularization
+    tasks = [
+        pool.submit(_solve_rows, indptr, indices, ratings, other, factors, gram, alpha, solver, cg_steps, start, stop)
+        for start, stop in _chunks(indptr, CHUNK_ENTRIES)
+    ]
+    for task in tasks:
+        task.result()
+
+
+def train_als(
+    matrix: RatingsMatrix,
+    factors: int = 32,
+    regularization: float = 10.0,
+    alpha: float = 2.0,
+    iterations: int = 15,
+    solver: str = 'cg',
+    cg_steps: int = 3,
+    workers: Optional[int] = None,
+    seed: int = 42,
+    initial: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+    callback: Optional[Callable[[int, float], None]] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """(user factors, podcast factors) float32. `initial` = warm start (vd. refit trên toàn bộ ratings).
+
+    NumPy nhả GIL trong gathers / BLAS / LAPACK nên chunks chạy song song trên threads,
+    không phải copy factors sang processes.
+    """
+    if solver not in SOLVERS:
+        raise ValueError(f"Unknown solver: {solver} (expected one of {SOLVERS})")
+    if initial is not None:
+        users, podcasts = (np.array(a, dtype=np.float32) for a in initial)
+    else:
+        rng = np.random.default_rng(seed)
+        users = (rng.standard_normal((matrix.shape[0], factors)) * 0.01).astype(np.float32)
+        podcasts = (rng.standard_normal((matrix.shape[1], factors)) * 0.01).astype(np.float32)
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        for iteration in range(iterations):
+            started = time.perf_counter()
+            _half_iteration(pool, matrix.indptr, matrix.indices, matrix.data, podcasts, users,
+                            regularization, alpha, solver, cg_steps)
+            _half_iteration(pool, matrix.t_indptr, matrix.t_indices, matrix.t_data, users, podcasts,
+                            regularization, alpha, solver, cg_steps)
+            if callback is not None:
+                callback(iteration, time.perf_counter() - started)
+    return users, podcasts
+
+
+def fit_calibration(dots: np.ndarray, ratings: np.ndarray) -> Tuple[float, float]:
+    """(offset, scale) least squares: rating ~ offset + scale * dot (preference scores -> thang 1-5)"""
+    dots = np.asarray(dots, dtype=np.float64)
+    design = np.stack([np.ones_like(dots), dots], axis=1)
+    (offset, scale), *_ = np.linalg.lstsq(design, np.asarray(ratings, dtype=np.float64), rcond=None)
+    return float(offset), float(scale)
+
+
+def evaluate(model: ALSModel, rows: np.ndarray, cols: np.ndarray, ratings: np.ndarray) -> Dict[str, float]:
+    errors = model.predict(rows, cols).astype(np.float64) - np.asarray(ratings, dtype=np.float64)
+    return {
+        'test_mae': float(np.abs(errors).mean()) if len(errors) else float('nan'),
+        'test_rmse': float(np.sqrt((errors ** 2).mean())) if len(errors) else float('nan'),
+    }
+
+
+# ---------------------------------------------------------------------- #
+# Data sources
+# ---------------------------------------------------------------------- #
+# camelCase (System.Text.Json) / PascalCase fields của UserRatingDto và PodcastDataDto -> columns của bundle
+_RATING_COLUMNS = {
+    'userId': 'user_id', 'UserId': 'user_id',
+    'podcastId': 'podcast_id', 'PodcastId': 'podcast_id',
+    'rating': 'rating', 'Rating': 'rating',
+    'interactionAt': 'timestamp', 'InteractionAt': 'timestamp',
+}
+_PODCAST_COLUMNS = {
+    'id': 'podcast_id', 'Id': 'podcast_id',
+    'title': 'title', 'Title': 'title',
+    'description': 'topics', 'Description': 'topics',
+    'category': 'category', 'Category': 'category',
+    'createdAt': 'created_date', 'CreatedAt': 'created_date',
+    'duration': 'duration_seconds', 'Duration': 'duration_seconds',
+}
+
+
+def _export_records(payload: Any) -> List[dict]:
+    """Data của `Result<List<T>>` từ DataController (hoặc một JSON list thuần)"""
+    if isinstance(payload, dict):
+        if payload.get('isSuccess', payload.get('IsSuccess', True)) is False:
+            raise ValueError(f"Export failed: {payload.get('message') or payload.get('Message')}")
+        payload = payload.get('data', payload.get('Data'))
+    if not isinstance(payload, list):
+        raise ValueError("Export payload has no data list")
+    return payload
+
+
+def read_source(source: str, timeout: float = 120.0) -> pd.DataFrame:
+    """DataFrame từ URL export (DataController), .json, .csv hoặc .pkl"""
+    if source.startswith(('http://', 'https://')):
+        import httpx  # chỉ cần khi đọc export qua HTTP
+
+        response = httpx.get(source, timeout=timeout)
+        response.raise_for_status()
+        return pd.DataFrame(_export_records(response.json()))
+    path = Path(source)
+    if path.suffix == '.pkl':
+        return pd.read_pickle(path)
+    if path.suffix == '.csv':
+        return pd.read_csv(path)
+    return pd.DataFrame(_export_records(json.loads(path.read_text())))
+
+
+def load_ratings(source: str) -> pd.DataFrame:
+    """(user_id, podcast_id, rating, timestamp) theo thứ tự thời gian; rating ngoài 1-5 bị clip"""
+    df = read_source(source).rename(columns=_RATING_COLUMNS)
+    missing = {'user_id', 'podcast_id', 'rating'} - set(df.columns)
+    if missing:
+        raise ValueError(f"Ratings source is missing columns: {sorted(missing)}")
+    if 'timestamp' not in df.columns:
+        df['timestamp'] = pd.NaT
+    df = df[['user_id', 'podcast_id', 'rating', 'timestamp']].copy()
+    df['user_id'] = df['user_id'].astype(str)
+    df['podcast_id'] = df['podcast_id'].astype(str)
+    df['rating'] = pd.to_numeric(df['rating'], errors='coerce')
+    df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
+    df = df.dropna(subset=['rating'])
+    df['rating'] = df['rating'].clip(1.0, 5.0)
+    return df.sort_values('timestamp', kind='stable', na_position='first').reset_index(drop=True)
+
+
+def load_podcasts(source: str) -> pd.DataFrame:
+    """podcasts.pkl của bundle cũ, hoặc export /api/internal/data/podcasts map sang cùng columns"""
+    df = read_source(source).rename(columns=_PODCAST_COLUMNS)
+    if 'duration_seconds' in df.columns:
+        df['duration_minutes'] = pd.to_numeric(df.pop('duration_seconds'), errors='coerce') / 60.0
+    if 'podcast_id' in df.columns:
+        df['podcast_id'] = df['podcast_id'].astype(str)
+    return df
+
+
+# ---------------------------------------------------------------------- #
+# Bundle
+# ---------------------------------------------------------------------- #
+def encode_ids(values: pd.Series) -> Tuple[np.ndarray, List[str]]:
+    """(encoded index mỗi row, IDs theo encoded index) - index theo thứ tự xuất hiện như notebook"""
+    codes, uniques = pd.factorize(values, sort=False)
+    return codes.astype(np.int64), [str(v) for v in uniques]
+
+
+def write_bundle(
+    output_dir: Path,
+    model: ALSModel,
+    ratings: pd.DataFrame,
+    user_ids: Sequence[str],
+    podcast_ids: Sequence[str],
+    podcasts: Optional[pd.DataFrame],
+    metadata: Dict[str, Any],
+) -> None:
+    """Ghi bundle vào thư mục tạm rồi rename: service watch `output_dir` không thấy bundle ghi dở"""
+    tmp = output_dir.with_name(f".{output_dir.name}.tmp-{os.getpid()}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    mappings = {
+        'user2user_encoded': {uid: i for i, uid in enumerate(user_ids)},
+        'podcast2podcast_encoded': {pid: i for i, pid in enumerate(podcast_ids)},
+        'userencoded2user': dict(enumerate(user_ids)),
+        'podcastencoded2podcast': dict(enumerate(podcast_ids)),
+    }
+    with open(tmp / "mappings.pkl", 'wb') as f:
+        pickle.dump(mappings, f, protocol=pickle.HIGHEST_PROTOCOL)
+    ratings.to_pickle(tmp / "ratings.pkl")
+    if podcasts is not None:
+        podcasts.to_pickle(tmp / "podcasts.pkl")
+    model.save_npz(tmp / WEIGHTS_FILE)
+    (tmp / "model_metadata.json").write_text(json.dumps(metadata, indent=2))
+
+    old = output_dir.with_name(f".{output_dir.name}.old-{os.getpid()}")
+    if output_dir.exists():
+        os.replace(output_dir, old)
+    os.replace(tmp, output_dir)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def load_model(model_dir: Path, metadata: Optional[dict] = None):
+    """Model weights của một bundle: ALS factors (als_weights.npz) nếu có, không thì NCF weights"""
+    from ncf_model import load_ncf_model
+
+    if (model_dir / WEIGHTS_FILE).exists():
+        return ALSModel.from_npz(model_dir / WEIGHTS_FILE)
+    return load_ncf_model(model_dir, metadata)
+
+
+def _baseline_metrics(path: Path) -> Optional[Dict[str, float]]:
+    if not path.exists():
+        return None
+    metrics = (json.loads(path.read_text()).get('performance_metrics') or {}).get('test_metrics') or {}
+    if 'test_mae' not in metrics:
+        return None
+    return {key: float(metrics[key]) for key in ('test_mae', 'test_rmse') if key in metrics}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Retrain the recommendation model with implicit-feedback ALS")
+    parser.add_argument('--ratings', default='./models/ratings.pkl',
+                        help="Ratings export URL (/api/internal/data/ratings) or .json / .csv / .pkl file")
+    parser.add_argument('--podcasts', default=None,
+                        help="Podcasts export URL / file for podcasts.pkl (default: <base-model-dir>/podcasts.pkl)")
+    parser.add_argument('--base-model-dir', default='./models', type=Path,
+                        help="Current bundle: baseline metrics + podcasts.pkl")
+    parser.add_argument('--output-dir', required=True, type=Path)
+    parser.add_argument('--factors', default=32, type=int)
+    parser.add_argument('--regularization', default=10.0, type=float)
+    parser.add_argument('--alpha', default=2.0, type=float)
+    parser.add_argument('--iterations', default=15, type=int)
+    parser.add_argument('--solver', default='cg', choices=SOLVERS)
+    parser.add_argument('--cg-steps', default=3, type=int)
+    parser.add_argument('--workers', default=os.cpu_count() or 1, type=int)
+    parser.add_argument('--test-fraction', default=0.15, type=float,
+                        help="Held-out ratings for MAE / RMSE (0 = skip evaluation)")
+    parser.add_argument('--validation-fraction', default=0.15, type=float,
+                        help="Held-out ratings for the score -> rating calibration")
+    parser.add_argument('--refit-iterations', default=2, type=int,
+                        help="Warm-start iterations on all ratings after evaluation")
+    parser.add_argument('--seed', default=42, type=int)
+    parser.add_argument('--artifacts', action='store_true', help="Also write memory-mapped artifacts/")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    started = time.perf_counter()
+    ratings = load_ratings(args.ratings)
+    user_rows, user_ids = encode_ids(ratings['user_id'])
+    podcast_cols, podcast_ids = encode_ids(ratings['podcast_id'])
+    values = ratings['rating'].to_numpy(dtype=np.float32)
+    shape = (len(user_ids), len(podcast_ids))
+    logger.info(f"📥 {len(ratings):,} ratings, {shape[0]:,} users, {shape[1]:,} podcasts "
+                f"({time.perf_counter() - started:.1f}s)")
+
+    # Split như notebook (train / val / test); preference scores của ratings đã train luôn ~1,
+    # nên calibration sang thang 1-5 được fit trên validation ratings - đúng phân phối lúc serve
+    # (podcasts user chưa nghe)
+    split = np.random.default_rng(args.seed).random(len(ratings))
+    test = split < args.test_fraction
+    validation = ~test & (split < args.test_fraction + args.validation_fraction)
+    held_out = test | validation
+    train = RatingsMatrix(user_rows[~held_out], podcast_cols[~held_out], values[~held_out], shape)
+
+    def progress(iteration: int, seconds: float) -> None:
+        logger.info(f"🔁 Iteration {iteration + 1}: {seconds:.2f}s")
+
+    train_started = time.perf_counter()
+    factors = train_als(train, args.factors, args.regularization, args.alpha, args.iterations, args.solver,
+                        args.cg_steps, args.workers, args.seed, callback=progress)
+    calibration = validation if validation.any() else ~held_out
+    offset, scale = fit_calibration(
+        np.einsum('ij,ij->i', factors[0][user_rows[calibration]], factors[1][podcast_cols[calibration]]),
+        values[calibration])
+    model = ALSModel(*factors, offset, scale, alpha=args.alpha)
+    metrics = evaluate(model, user_rows[test], podcast_cols[test], values[test]) if test.any() else {}
+
+    # Refit trên toàn bộ ratings (warm start), giữ calibration đã fit trên held-out ratings
+    if held_out.any() and args.refit_iterations > 0:
+        full = RatingsMatrix(user_rows, podcast_cols, values, shape)
+        factors = train_als(full, args.factors, args.regularization, args.alpha, args.refit_iterations,
+                            args.solver, args.cg_steps, args.workers, initial=factors, callback=progress)
+        model = ALSModel(*factors, offset, scale, alpha=args.alpha)
+    training_seconds = time.perf_counter() - train_started
+
+    base_metadata_path = args.base_model_dir / "model_metadata.json"
+    base_metadata = json.loads(base_metadata_path.read_text()) if base_metadata_path.exists() else None
+    model.output_range = output_range_from_metadata(base_metadata)
+    baseline = _baseline_metrics(base_metadata_path)
+
+    podcasts_source = args.podcasts or str(args.base_model_dir / "podcasts.pkl")
+    podcasts = load_podcasts(podcasts_source) if args.podcasts or Path(podcasts_source).exists() else None
+
+    bundle_ratings = ratings.assign(user_encoded=user_rows, podcast_encoded=podcast_cols)
+    counts = ratings['rating'].round().astype(int).value_counts().sort_index()
+    metadata = {
+        'model_info': {
+            'name': 'als_model',
+            'type': 'implicit_als',
+            'framework': 'numpy',
+            'framework_version': np.__version__,
+            'created_at': datetime.now().isoformat(),
+            'random_seed': args.seed,
+            'config': {
+                'factors': args.factors,
+                'regularization': args.regularization,
+                'alpha': args.alpha,
+                'iterations': args.iterations,
+                'refit_iterations': args.refit_iterations if held_out.any() else 0,
+                'solver': args.solver,
+                'cg_steps': args.cg_steps,
+                'workers': args.workers,
+                'preference_threshold': PREFERENCE_THRESHOLD,
+            },
+        },
+        'architecture': {
+            'embedding_size': args.factors,
+            'total_parameters': model.num_parameters,
+            'output_range': list(model.output_range),
+            'calibration': {'offset': model.offset, 'scale': model.scale},
+        },
+        'data_statistics': {
+            'source': args.ratings,
+            'num_users': shape[0],
+            'num_podcasts': shape[1],
+            'num_ratings': int(len(ratings)),
+            'sparsity_percent': round(100.0 * (1.0 - len(ratings) / max(1, shape[0] * shape[1])), 3),
+            'rating_distribution': {str(k): int(v) for k, v in counts.items()},
+            'train_test_split': {
+                'train_samples': int((~held_out).sum()),
+                'val_samples': int(validation.sum()),
+                'test_samples': int(test.sum()),
+            },
+        },
+        'performance_metrics': {
+            'training_seconds': round(training_seconds, 2),
+            'test_metrics': metrics,
+            'baseline_test_metrics': baseline,
+        },
+    }
+    write_bundle(args.output_dir, model, bundle_ratings, user_ids, podcast_ids, podcasts, metadata)
+    if args.artifacts:
+        from model_artifacts import convert_model_dir
+
+        convert_model_dir(args.output_dir)
+
+    print(f"✅ Wrote {args.output_dir}: {model.num_users:,} users, {model.num_podcasts:,} podcasts, "
+          f"dim={model.embedding_size}, trained in {training_seconds:.1f}s ({args.workers} workers)")
+    if metrics:
+        line = f"📊 Test MAE = {metrics['test_mae']:.4f}, RMSE = {metrics['test_rmse']:.4f}"
+        if baseline:
+            line += (f" | current model: MAE = {baseline['test_mae']:.4f} ({metrics['test_mae'] - baseline['test_mae']:+.4f})"
+                     f", RMSE = {baseline.get('test_rmse', float('nan')):.4f}"
+                     f" ({metrics['test_rmse'] - baseline.get('test_rmse', float('nan')):+.4f})")
+        print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,245 @@
+"""
+ANN INDEX
+IVF (inverted file) index trên podcast vectors của model cho catalogs lớn: k-means coarse clusters
+và quantized vectors (int8 với scale mỗi vector, hoặc float16) lưu liền nhau theo cluster. Query score
+user với centroids bằng chính model, scan `nprobe` lists có score cao nhất trên quantized vectors,
+rồi caller re-rank shortlist bằng exact scoring. Podcasts mới được thêm incrementally.
+"""
+
+import logging
+import math
+import time
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from scoring import top_k_indices
+
+logger = logging.getLogger(__name__)
+
+QUANTIZATIONS = ('int8', 'float16')
+
+# Cells (rows x centroids) của một block distance matrix trong k-means / assignment
+ASSIGN_BLOCK_CELLS = 4_000_000
+
+
+def default_num_lists(num_items: int) -> int:
+    """sqrt(N) lists: ~sqrt(N) items mỗi list"""
+    return max(1, min(num_items, int(round(math.sqrt(num_items)))))
+
+
+def assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Centroid gần nhất (L2) của mỗi vector, tính theo blocks"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    centroid_norms = np.einsum('ij,ij->i', centroids, centroids)
+    labels = np.empty(len(vectors), dtype=np.int32)
+    rows_per_block = max(1, ASSIGN_BLOCK_CELLS // max(1, len(centroids)))
+    for start in range(0, len(vectors), rows_per_block):
+        block = vectors[start:start + rows_per_block]
+        # |x - c|^2 = |x|^2 - 2 x.c + |c|^2; |x|^2 không đổi theo c
+        labels[start:start + len(block)] = np.argmin(centroid_norms - 2 * (block @ centroids.T), axis=1)
+    return labels
+
+
+def kmeans(vectors: np.ndarray, k: int, iterations: int = 10, sample_size: Optional[int] = None,
+           seed: int = 0) -> np.ndarray:
+    """Lloyd k-means trên một random sample (mặc định 64 vectors mỗi centroid); clusters rỗng được re-seed"""
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(vectors), sample_size or 64 * k)
+    sample = np.asarray(vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))], dtype=np.float32)
+    centroids = sample[rng.choice(len(sample), k, replace=False)].copy()
+    for _ in range(iterations):
+        labels = assign(sample, centroids)
+        counts = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        empty = np.flatnonzero(~filled)
+        if empty.size:
+            centroids[empty] = sample[rng.choice(len(sample), empty.size, replace=False)]
+    return centroids
+
+
+def quantize(vectors: np.ndarray, quantization: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """(codes, scales): int8 symmetric với một float32 scale mỗi vector, hoặc float16 (scales = None)"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if quantization == 'float16':
+        return vectors.astype(np.float16), None
+    if quantization != 'int8':
+        raise ValueError(f"Unsupported quantization: {quantization} (expected one of {QUANTIZATIONS})")
+    scales = np.abs(vectors).max(axis=1) / 127.0 if len(vectors) else np.empty(0, dtype=np.float32)
+    scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales
+
+
+class AnnIndex:
+    """Item i = podcast_ids[i] (thứ tự theo cluster); list l = items offsets[l]:offsets[l + 1].
+
+    Immutable sau khi publish: `add` trả về index mới nên request đang đọc index cũ không bị ảnh hưởng.
+    """
+
+    def __init__(
+        self,
+        podcast_ids: List[str],
+        centroids: np.ndarray,
+        offsets: np.ndarray,
+        codes: np.ndarray,
+        scales: Optional[np.ndarray],
+        model_version: int,
+        catalog_version: int = 0,
+        duration_seconds: float = 0.0,
+    ):
+        self.podcast_ids = podcast_ids
+        self.centroids = centroids
+        self.offsets = offsets
+        self.codes = codes
+        self.scales = scales
+        self.model_version = model_version
+        self.catalog_version = catalog_version
+        self.duration_seconds = duration_seconds
+        # (catalog tuple, item -> candidate row, candidate rows không có trong index)
+        self._catalog = None  # type: Optional[Tuple[Sequence[str], np.ndarray, np.ndarray]]
+
+    @property
+    def quantization(self) -> str:
+        return 'float16' if self.scales is None else 'int8'
+
+    @property
+    def num_items(self) -> int:
+        return len(self.podcast_ids)
+
+    @property
+    def num_lists(self) -> int:
+        return len(self.centroids)
+
+    def nbytes(self) -> int:
+        total = self.centroids.nbytes + self.offsets.nbytes + self.codes.nbytes
+        return total + (self.scales.nbytes if self.scales is not None else 0)
+
+    def stats(self) -> dict:
+        sizes = np.diff(self.offsets)
+        return {
+            "podcasts": self.num_items,
+            "lists": self.num_lists,
+            "max_list_size": int(sizes.max()) if sizes.size else 0,
+            "quantization": self.quantization,
+            "bytes": self.nbytes(),
+            "catalog_version": self.catalog_version,
+            "model_version": self.model_version,
+            "duration_seconds": round(self.duration_seconds, 3),
+        }
+
+    def vectors(self, items: np.ndarray) -> np.ndarray:
+        """Dequantized float32 vectors của items"""
+        rows = self.codes[items].astype(np.float32)
+        if self.scales is not None:
+            rows *= self.scales[items, None]
+        return rows
+
+    def catalog_rows(self, catalog_ids: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """(item -> candidate row (-1 = đã bị xoá khỏi catalog), candidate rows không có trong index),
+        cache theo catalog tuple
+        """
+        cached = self._catalog
+        if cached is not None and cached[0] is catalog_ids:
+            return cached[1], cached[2]
+        rows = {pid: i for i, pid in enumerate(catalog_ids)}
+        item_rows = np.fromiter((rows.get(pid, -1) for pid in self.podcast_ids),
+                                dtype=np.int64, count=self.num_items)
+        covered = np.zeros(len(catalog_ids), dtype=bool)
+        covered[item_rows[item_rows >= 0]] = True
+        uncovered = np.flatnonzero(~covered)
+        self._catalog = (catalog_ids, item_rows, uncovered)
+        return item_rows, uncovered
+
+    def search(
+        self,
+        score: Callable[[np.ndarray], np.ndarray],
+        catalog_ids: Sequence[str],
+        nprobe: int,
+        shortlist: int,
+        selected: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """Candidate rows cần exact scoring: top `shortlist` (approximate score) trong `nprobe` lists
+        + mọi candidate chưa có trong index. Sorted, chỉ gồm rows `selected` (nếu có).
+
+        `score(vectors)` trả về score của user cho từng row (centroids hoặc dequantized items).
+        """
+        item_rows, uncovered = self.catalog_rows(catalog_ids)
+        probes = top_k_indices(score(self.centroids), max(1, min(nprobe, self.num_lists)))
+        items = np.concatenate([np.arange(self.offsets[l], self.offsets[l + 1]) for l in probes.tolist()])
+        rows = item_rows[items]
+        live = rows >= 0
+        if selected is not None:
+            live[live] = selected[rows[live]]
+            uncovered = uncovered[selected[uncovered]]
+        items, rows = items[live], rows[live]
+        if len(items) > shortlist:
+            rows = rows[top_k_indices(score(self.vectors(items)), shortlist)]
+        return np.union1d(rows, uncovered)
+
+    def with_catalog_version(self, catalog_version: int) -> "AnnIndex":
+        """Index mới cho `catalog_version`, share arrays với index này (index đã publish không bị mutate)"""
+        index = AnnIndex(self.podcast_ids, self.centroids, self.offsets, self.codes, self.scales,
+                         self.model_version, catalog_version, self.duration_seconds)
+        index._catalog = self._catalog
+        return index
+
+    def add(self, podcast_ids: List[str], vectors: np.ndarray) -> "AnnIndex":
+        """Index mới có thêm `podcast_ids`, gán vào centroid gần nhất (centroids giữ nguyên)"""
+        started = time.perf_counter()
+        if not podcast_ids:
+            return self
+        labels = assign(vectors, self.centroids)
+        codes, scales = quantize(vectors, self.quantization)
+        old_labels = np.repeat(np.arange(self.num_lists, dtype=np.int32), np.diff(self.offsets))
+        # Stable: items cũ giữ thứ tự trong list, items mới nối vào cuối list của chúng
+        order = np.argsort(np.concatenate([old_labels, labels]), kind='stable')
+        all_ids = self.podcast_ids + list(podcast_ids)
+        counts = np.bincount(np.concatenate([old_labels, labels]), minlength=self.num_lists)
+        return AnnIndex(
+            [all_ids[i] for i in order.tolist()],
+            self.centroids,
+            np.concatenate([[0], np.cumsum(counts)]).astype(np.int64),
+            np.concatenate([self.codes, codes])[order],
+            np.concatenate([self.scales, scales])[order] if self.scales is not None else None,
+            self.model_version,
+            self.catalog_version,
+            time.perf_counter() - started,
+        )
+
+
+def build_ann_index(
+    podcast_ids: Sequence[str],
+    vectors: np.ndarray,
+    model_version: int,
+    num_lists: int = 0,
+    quantization: str = 'int8',
+    iterations: int = 10,
+    seed: int = 0,
+) -> AnnIndex:
+    """Full build: k-means (num_lists = 0 -> sqrt(N)), gán mọi vector vào list, quantize"""
+    started = time.perf_counter()
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(f"Unsupported quantization: {quantization} (expected one of {QUANTIZATIONS})")
+    vectors = np.asarray(vectors, dtype=np.float32)
+    num_lists = min(len(vectors), num_lists or default_num_lists(len(vectors)))
+    centroids = kmeans(vectors, num_lists, iterations, seed=seed)
+    labels = assign(vectors, centroids)
+    order = np.argsort(labels, kind='stable')
+    codes, scales = quantize(vectors[order], quantization)
+    counts = np.bincount(labels, minlength=num_lists)
+    index = AnnIndex(
+        [podcast_ids[i] for i in order.tolist()],
+        centroids,
+        np.concatenate([[0], np.cumsum(counts)]).astype(np.int64),
+        codes,
+        scales,
+        model_version,
+        duration_seconds=time.perf_counter() - started,
+    )
+    logger.info(f"🗂️ Built ANN index ({index.num_lists} lists, {quantization}) for {index.num_items} podcasts "
+                f"in {index.duration_seconds:.2f}s")
+    return index
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+ANN RECALL BENCHMARK
+IVF index (ann_index.py) so với exact scoring trên toàn bộ catalog: recall@k của top-k sau exact
+re-rank, latency mỗi query và memory (float32 vectors vs quantized index) ở 10k / 100k / 1M podcasts
+
+Chạy từ thư mục ai_service:
+    python benchmarks/ann_recall.py --sizes 10000 100000 1000000 --nprobe 1 4 16 64 256
+
+Podcast vectors là synthetic: embeddings của model trong --model-dir (NCF hoặc ALS, như bundle load)
++ Gaussian noise, nên clusters giống phân bố của model thật. Users là users đã train (random sample),
+cùng user projection như request path. Recall đếm một kết quả là đúng nếu exact score của nó không
+thấp hơn score thứ k của exact top-k (podcasts gần trùng nhau có thể tie).
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+AI_SERVICE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(AI_SERVICE_DIR))
+
+from ann_index import build_ann_index  # noqa: E402
+from scoring import top_k_indices  # noqa: E402
+
+# Noise (theo std của embeddings gốc) cộng vào embedding của podcast gốc để sinh podcasts mới
+NOISE_SCALE = 0.35
+
+
+def percentiles(samples: List[float]) -> Dict[str, Optional[float]]:
+    samples = sorted(samples)
+
+    def at(q: float) -> Optional[float]:
+        return round(samples[min(len(samples) - 1, int(q * len(samples)))] * 1e3, 3) if samples else None
+
+    return {'p50_ms': at(0.50), 'p95_ms': at(0.95)}
+
+
+def load_base_model(model_dir: Path):
+    """Model của bundle (NCF hoặc ALS), hoặc random NCF cùng shape Kaggle nếu không đọc được"""
+    from als_model import load_model
+    from ncf_model import NCFModel
+    model = None
+    try:
+        model = load_model(model_dir)
+    except (OSError, ValueError):
+        pass
+    if model is None:
+        rng = np.random.default_rng(0)
+        shape = [128, 256, 128, 64, 1]
+        layers = [(rng.normal(0, 1 / np.sqrt(a), (a if i else 2 * a, b)).astype(np.float32),
+                   np.zeros(b, dtype=np.float32), 'sigmoid' if b == 1 else 'relu')
+                  for i, (a, b) in enumerate(zip(shape[:-1], shape[1:]))]
+        model = NCFModel(rng.normal(0, 0.1, (1000, 128)), rng.normal(0, 0.1, (2000, 128)), layers)
+    return model
+
+
+def synthetic_vectors(model, size: int, seed: int) -> np.ndarray:
+    """`size` podcast vectors trong không gian scoring của model (projection cho NCF, factors cho ALS)"""
+    rng = np.random.default_rng(seed)
+    base = np.asarray(model.podcast_embeddings, dtype=np.float32)
+    noise = NOISE_SCALE * base.std(axis=0)
+    vectors = None
+    chunk = 65536
+    for start in range(0, size, chunk):
+        count = min(chunk, size - start)
+        embeddings = base[rng.integers(0, len(base), count)] + rng.normal(size=(count, base.shape[1])).astype(np.float32) * noise
+        if hasattr(model, 'dense_layers'):
+            kernel, bias, _ = model.dense_layers[0]
+            block = embeddings @ kernel[model.embedding_size:] + bias
+        else:
+            block = embeddings
+        if vectors is None:
+            vectors = np.empty((size, block.shape[1]), dtype=np.float32)
+        vectors[start:start + count] = block
+    return vectors
+
+
+def run_size(model, size: int, args) -> List[dict]:
+    rng = np.random.default_rng(size)
+    vectors = synthetic_vectors(model, size, seed=size)
+    podcast_ids = tuple(f'p_{i:07d}' for i in range(size))
+    user_rows = np.asarray(model.user_projection[rng.choice(model.num_users, args.queries, replace=False)],
+                           dtype=np.float32)
+
+    # Exact: score mọi podcast rồi top-k (như rank_sync không có ANN)
+    thresholds, exact_seconds = [], []
+    for user in user_rows:
+        started = time.perf_counter()
+        scores = model.score_rows(user[None, :], vectors)[0]
+        top = top_k_indices(scores, args.k)
+        exact_seconds.append(time.perf_counter() - started)
+        thresholds.append(scores[top[-1]])
+    results = [{
+        'size': size, 'method': 'exact', 'quantization': 'float32', 'nprobe': None, 'recall': 1.0,
+        'latency': percentiles(exact_seconds), 'memory_mb': round(vectors.nbytes / 2 ** 20, 1),
+        'build_s': 0.0, 'lists': None,
+    }]
+
+    for quantization in args.quantization:
+        index = build_ann_index(podcast_ids, vectors, model_version=1, num_lists=args.lists,
+                                quantization=quantization)
+        # Exact re-rank cần vectors gốc theo catalog row (model giữ sẵn chúng trên request path)
+        index.catalog_rows(podcast_ids)
+        for nprobe in args.nprobe:
+            hits, seconds = 0, []
+            for user, threshold in zip(user_rows, thresholds):
+                started = time.perf_counter()
+                rows = index.search(lambda items: model.score_rows(user[None, :], items)[0],
+                                    podcast_ids, nprobe, max(args.shortlist, 4 * args.k))
+                scores = model.score_rows(user[None, :], vectors[rows])[0]
+                top = top_k_indices(scores, args.k)
+                seconds.append(time.perf_counter() - started)
+                hits += int(np.count_nonzero(scores[top] >= threshold))
+            results.append({
+                'size': size, 'method': 'ivf', 'quantization': quantization, 'nprobe': nprobe,
+                'recall': round(hits / (args.k * len(user_rows)), 4), 'latency': percentiles(seconds),
+                'memory_mb': round(index.nbytes() / 2 ** 20, 1), 'build_s': round(index.duration_seconds, 2),
+                'lists': index.num_lists,
+            })
+        del index
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="IVF ANN recall@k / latency / memory vs exact scoring")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[1, 4, 16, 64, 256])
+    parser.add_argument('--quantization', nargs='+', default=['int8', 'float16'], choices=['int8', 'float16'])
+    parser.add_argument('--lists', type=int, default=0, help="Số IVF lists (0 = sqrt(N), như ANN_LISTS)")
+    parser.add_argument('--shortlist', type=int, default=200, help="ANN_SHORTLIST")
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--queries', type=int, default=20)
+    parser.add_argument('--model-dir', type=Path, default=AI_SERVICE_DIR / 'models',
+                        help="Bundle dùng làm embedding / layer weights")
+    parser.add_argument('--json', action='store_true', help="Print JSON instead of a table")
+    args = parser.parse_args()
+
+    model = load_base_model(args.model_dir)
+    results = []
+    for size in args.sizes:
+        results.extend(run_size(model, size, args))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+
+    print(f"model={type(model).__name__} k={args.k} shortlist={args.shortlist} queries={args.queries}")
+    print(f"{'podcasts':>9} {'method':>7} {'quant':>8} {'lists':>6} {'nprobe':>7} {'recall@k':>9} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'memory MB':>10} {'build s':>8}")
+    for r in results:
+        print(f"{r['size']:>9} {r['method']:>7} {r['quantization']:>8} {str(r['lists'] or '-'):>6} "
+              f"{str(r['nprobe'] or '-'):>7} {r['recall']:>9} {r['latency']['p50_ms']:>9} "
+              f"{r['latency']['p95_ms']:>9} {r['memory_mb']:>10} {r['build_s']:>8}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+CATALOG MEMORY BENCHMARK
+So sánh pandas DataFrame catalog (cách cũ) với columnar CatalogStore:
+memory giữ bởi catalog (tracemalloc) + process RSS, và allocations mỗi request (top-10 fields + /podcasts/real listing)
+
+Chạy từ thư mục ai_service:
+    python benchmarks/catalog_memory.py --sizes 1000 10000 100000
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+CATEGORIES = ['Career', 'Health', 'Lifestyle', 'Personal_Development', 'Psychology', 'Business', 'Technology']
+
+
+def rss_bytes() -> int:
+    """Current resident set size (Linux /proc), 0 nếu không đọc được"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return 0
+
+
+def synthetic_podcasts(size: int, seed: int = 42):
+    """Internal API style podcasts (GUID ids, description, HH:MM:SS duration)"""
+    rng = random.Random(seed)
+    return [
+        {
+            'id': str(uuid.UUID(int=rng.getrandbits(128))),
+            'title': f'Bài học {i + 1}: Sample Podcast Title',
+            'description': f'Topic about {CATEGORIES[i % len(CATEGORIES)].lower()}',
+            'category': CATEGORIES[i % len(CATEGORIES)],
+            'duration': f'00:{rng.randint(5, 59):02d}:{rng.randint(0, 59):02d}',
+            'audioUrl': f'https://cdn.example.com/audio/{i}.mp3',
+            'thumbnailUrl': f'https://cdn.example.com/thumb/{i}.jpg',
+            'topicCategories': [i % 5, (i + 1) % 5],
+        }
+        for i in range(size)
+    ]
+
+
+def legacy_fields(df, i):
+    """Per-row access như trước (DataFrame.iloc + Series.get)"""
+    import pandas as pd
+    podcast = df.iloc[i]
+    return dict(
+        podcast_id=str(podcast['podcast_id']),
+        title=podcast.get('title'),
+        category=podcast.get('category', 'Unknown'),
+        topics=podcast.get('topics', podcast.get('description', 'Unknown')),
+        duration_minutes=int(podcast.get('duration_minutes', 0)) if pd.notna(podcast.get('duration_minutes')) else None,
+        content_url=podcast.get('content_url', podcast.get('url')),
+    )
+
+
+def measure_allocations(fn, repeat: int = 5) -> int:
+    """Peak bytes allocated by one call (max over `repeat` calls)"""
+    peak = 0
+    for _ in range(repeat):
+        gc.collect()
+        tracemalloc.start()
+        fn()
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return peak
+
+
+def run_variant(variant: str, size: int) -> dict:
+    import pandas as pd
+    from catalog import GUID_PATTERN, build_snapshot, normalize_podcast
+    from catalog_store import CatalogStore
+    from fastapi_service import RecommendationService
+
+    gc.collect()
+    tracemalloc.start()
+    raw = synthetic_podcasts(size)
+    records = [normalize_podcast(p, i) for i, p in enumerate(raw)]
+    del raw
+
+    if variant == 'dataframe':
+        podcasts_df = pd.DataFrame(records)
+        guid_mask = podcasts_df['podcast_id'].astype(str).str.match(GUID_PATTERN)
+        candidates = podcasts_df[guid_mask].reset_index(drop=True)
+        catalog = (podcasts_df, candidates)
+
+        def top10():
+            return [legacy_fields(candidates, i) for i in range(10)]
+
+        def listing():
+            # JSONResponse render của toàn bộ to_dict('records')
+            return json.dumps(podcasts_df.to_dict('records'), ensure_ascii=False, separators=(",", ":"))
+    else:
+        snapshot = build_snapshot(CatalogStore.from_records(records), 1)
+        catalog = snapshot
+
+        def top10():
+            return [RecommendationService.podcast_fields(snapshot.candidates, snapshot.podcast_ids, i) for i in range(10)]
+
+        def listing():
+            # Streaming encode như /podcasts/real (mỗi record được encode rồi bỏ)
+            for record in snapshot.store.iter_records():
+                json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+
+    del records
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    result = {
+        'variant': variant,
+        'podcasts': size,
+        'catalog_mb': round(retained / 2 ** 20, 2),
+        'process_rss_mb': round(rss_bytes() / 2 ** 20, 1),
+        'top10_alloc_kb': round(measure_allocations(top10) / 1024, 1),
+        'listing_alloc_mb': round(measure_allocations(listing, repeat=2) / 2 ** 20, 2),
+    }
+    del catalog
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Catalog memory: DataFrame vs CatalogStore")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--variant', choices=['dataframe', 'store'], help=argparse.SUPPRESS)
+    parser.add_argument('--json', action='store_true', help="Print JSON instead of a table")
+    args = parser.parse_args()
+
+    if args.variant:
+        print(json.dumps(run_variant(args.variant, args.sizes[0])))
+        return 0
+
+    # Mỗi variant chạy trong process riêng để RSS không bị lẫn; DATA_DIR rỗng: import không restore catalog snapshot
+    results = []
+    with tempfile.TemporaryDirectory(prefix='catalog-memory-') as data_dir:
+        env = dict(os.environ, DATA_DIR=data_dir)
+        for size in args.sizes:
+            for variant in ('dataframe', 'store'):
+                output = subprocess.run(
+                    [sys.executable, __file__, '--variant', variant, '--sizes', str(size)],
+                    check=True, capture_output=True, text=True, env=env
+                ).stdout
+                results.append(json.loads(output.strip().splitlines()[-1]))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+
+    print(f"{'variant':<10} {'podcasts':>9} {'catalog MB':>11} {'process RSS MB':>15} "
+          f"{'top-10 alloc KB':>16} {'listing alloc MB':>17}")
+    for r in results:
+        print(f"{r['variant']:<10} {r['podcasts']:>9} {r['catalog_mb']:>11} {r['process_rss_mb']:>15} "
+              f"{r['top10_alloc_kb']:>16} {r['listing_alloc_mb']:>17}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+RECOMMENDATION HOT-PATH BENCHMARK
+Per-stage microbenchmarks (fetch, filter, score, top-k, serialize) và end-to-end load test của
+GET /recommendations/{user_id}, trước stub ContentService (/api/internal/podcasts) + UserService
+(/api/users), với synthetic catalogs / model bundles ở nhiều scales
+
+Chạy từ thư mục ai_service:
+    python benchmarks/hot_path.py --podcasts 1000 10000 100000 --users 1000 1000000 --output bench.json
+    python benchmarks/hot_path.py --output new.json --baseline bench.json --max-regression 0.2
+    python benchmarks/hot_path.py --podcasts 10000 --users 100000 --microbatch-window-ms 2 --concurrency 128
+
+Mỗi scale: stub catalog (GUID podcasts), bundle synthetic cùng format create_dummy_models.py /
+Kaggle export với training podcast IDs = GUIDs của catalog (memory-mapped artifacts, NCF weights
+ngẫu nhiên cùng shape với models/), stages đo trong một process riêng, load test chạy uvicorn
+(1 worker). Result cache, top-K precompute và similar-podcasts refresh bị tắt để mỗi request
+đều score online. `--baseline` so sánh p50 của stages + p95 / RPS của load test và exit 1
+khi chậm hơn quá `--max-regression`.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+AI_SERVICE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(AI_SERVICE_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from model_startup import artifacts_bundle, base_shape, write_pickle_bundle  # noqa: E402
+from multiworker import StubContentService, free_port, load, wait_ready  # noqa: E402
+
+# Chạy trong process con (MODEL_DIR / upstream URLs qua env): đo từng stage của request path
+PROBE = r"""
+import asyncio, json, os, random, time
+import numpy as np
+import fastapi_service
+from catalog import build_snapshot
+from catalog_sync import CatalogSync
+from scoring import top_k_indices
+
+service = fastapi_service.recommendation_service
+bundle = service.model_registry.active
+engine = bundle.scoring_engine
+repeat = int(os.environ['BENCH_REPEAT'])
+network_repeat = int(os.environ['BENCH_NETWORK_REPEAT'])
+num_recommendations = int(os.environ['BENCH_NUM_RECOMMENDATIONS'])
+rng = random.Random(0)
+known_users = [f'user_{rng.randrange(len(engine.user2idx)):08d}' for _ in range(repeat)]
+cold_users = [f'cold-{i}' for i in range(repeat)]
+
+
+def summary(samples):
+    samples = sorted(samples)
+    return {
+        'n': len(samples),
+        'mean_us': round(sum(samples) / len(samples) * 1e6, 1),
+        'p50_us': round(samples[len(samples) // 2] * 1e6, 1),
+        'p95_us': round(samples[int(len(samples) * 0.95)] * 1e6, 1),
+        'p99_us': round(samples[int(len(samples) * 0.99)] * 1e6, 1),
+    }
+
+
+def timed(fn, args):
+    samples = []
+    for arg in args:
+        started = time.perf_counter()
+        fn(arg)
+        samples.append(time.perf_counter() - started)
+    return summary(samples)
+
+
+async def timed_async(fn, args):
+    samples = []
+    for arg in args:
+        started = time.perf_counter()
+        await fn(arg)
+        samples.append(time.perf_counter() - started)
+    return summary(samples)
+
+
+async def main():
+    stages = {}
+    base_url = service.contentservice_url
+
+    async def cold_sync(_):
+        sync = CatalogSync(base_url, fastapi_service.CATALOG_PAGE_SIZE, fastapi_service.CATALOG_SYNC_CONCURRENCY)
+        try:
+            await sync.sync()
+        finally:
+            await sync.aclose()
+
+    # fetch: full sync (mọi page parse + build store) và re-sync khi catalog không đổi
+    stages['fetch_catalog'] = await timed_async(cold_sync, range(network_repeat))
+    store = await service.catalog_sync.sync()
+    stages['fetch_catalog_unchanged'] = await timed_async(lambda _: service.catalog_sync.sync(), range(network_repeat))
+    stages['fetch_users'] = await timed_async(lambda _: service.get_real_users(), range(network_repeat))
+
+    # filter: GUID candidates (một lần mỗi catalog refresh)
+    stages['filter'] = timed(lambda _: build_snapshot(store, 1), range(max(1, repeat // 10)))
+    service.index_catalog(store)
+    snapshot = service.catalog.publish(store)
+    candidates_store, podcast_ids = service.snapshot_candidates(snapshot)
+
+    # score: encode + score cả catalog + round, như rank_recommendations
+    def score(user_id):
+        return np.round(engine.score_user(user_id, podcast_ids, bundle.encode_podcasts(podcast_ids)), 2)
+
+    stages['score_known'] = timed(score, known_users)
+    stages['score_cold'] = timed(score, cold_users)
+    scores = [score(user_id) for user_id in known_users[:16]]
+    stages['topk'] = timed(lambda s: top_k_indices(s, num_recommendations), scores * (repeat // 16 + 1))
+
+    # serialize: pre-encoded fragments (lần đầu encode từng podcast, sau đó chỉ ghép bytes)
+    fragments = service.fragments_for(candidates_store, podcast_ids)
+    tops = [(top_k_indices(s, num_recommendations).tolist(), s) for s in scores]
+    stages['serialize_first'] = timed(lambda t: fragments.array(t[0], t[1][t[0]].tolist()), tops[:1])
+    stages['serialize'] = timed(lambda t: fragments.array(t[0], t[1][t[0]].tolist()), tops * (repeat // 16 + 1))
+
+    # handler: recommendations_fragment (select bundle + cache key + rank + serialize), cache tắt
+    async def handler(user_id):
+        await service.recommendations_fragment(user_id, num_recommendations, True)
+
+    stages['handler_known'] = await timed_async(handler, known_users)
+    stages['handler_cold'] = await timed_async(handler, cold_users)
+    print(json.dumps({'candidates': len(podcast_ids), 'stages': stages}))
+
+
+asyncio.run(main())
+"""
+
+
+def service_env(model_dir: Path, data_dir: Path, stub: StubContentService, args) -> Dict[str, str]:
+    stub_url = f'http://127.0.0.1:{stub.server_address[1]}'
+    env = dict(
+        os.environ,
+        MODEL_DIR=str(model_dir),
+        DATA_DIR=str(data_dir),  # stub catalog không được ghi đè snapshot của service thật
+        CONTENT_SERVICE_URL=stub_url,
+        USER_SERVICE_URL=stub_url,
+        TOPK_PRECOMPUTE_K='0',
+        SIMILAR_NEIGHBORS='0',
+        MODEL_WATCH_INTERVAL_SECONDS='0',
+        INTERACTION_SNAPSHOT_SECONDS='0',
+        MICROBATCH_WINDOW_MS=str(args.microbatch_window_ms),
+        MICROBATCH_MAX_SIZE=str(args.microbatch_max_size),
+    )
+    if not args.cache:
+        env['RESULT_CACHE_MAX_BYTES'] = '0'
+    env.pop('SHARED_STATE_DIR', None)
+    env.pop('WEB_CONCURRENCY', None)
+    return env
+
+
+def run_stages(env: Dict[str, str], args) -> dict:
+    env = dict(env, BENCH_REPEAT=str(args.repeat), BENCH_NETWORK_REPEAT=str(args.network_repeat),
+               BENCH_NUM_RECOMMENDATIONS=str(args.num_recommendations))
+    output = subprocess.run([sys.executable, '-c', PROBE], cwd=AI_SERVICE_DIR, env=env,
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run_load(env: Dict[str, str], users: int, args) -> dict:
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'fastapi_service:app', '--host', '127.0.0.1', '--port', str(port),
+         '--log-level', 'warning'],
+        cwd=AI_SERVICE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        asyncio.run(wait_ready(base_url, 1, timeout=300))
+        step = max(1, users // 1000)
+        user_ids = [f'user_{i:08d}' for i in range(0, users, step)][:1000] + [f'cold-{i}' for i in range(200)]
+        result = asyncio.run(load(base_url, user_ids, args.duration, args.concurrency))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return {
+        'concurrency': args.concurrency,
+        'duration_s': args.duration,
+        'requests': result['requests'],
+        'errors': result['errors'],
+        'rps': round(result['rps'], 1),
+        **{key: round(result[key], 2) if result[key] is not None else None for key in ('p50_ms', 'p95_ms', 'p99_ms')},
+    }
+
+
+def run_scale(workdir: Path, stub: StubContentService, users: int, shape: dict, args) -> dict:
+    started = time.perf_counter()
+    pickle_dir, model_dir = workdir / f'pickle-{users}', workdir / f'bundle-{users}'
+    podcast_ids = [podcast['id'] for podcast in stub.podcasts]
+    write_pickle_bundle(pickle_dir, users, len(podcast_ids), shape['embedding'], shape['layers'], podcast_ids)
+    artifacts_bundle(pickle_dir, model_dir)
+    shutil.rmtree(pickle_dir)
+    setup_s = time.perf_counter() - started
+
+    env = service_env(model_dir, workdir / f'data-{users}', stub, args)
+    try:
+        result = dict(users=users, podcasts=len(podcast_ids), setup_s=round(setup_s, 2), **run_stages(env, args))
+        if not args.skip_load:
+            result['load'] = run_load(env, users, args)
+    finally:
+        shutil.rmtree(model_dir, ignore_errors=True)
+    return result
+
+
+def regressions(results: List[dict], baseline: dict, threshold: float) -> List[str]:
+    """Các metrics chậm hơn baseline quá `threshold` (tỉ lệ), so theo cùng (users, podcasts)"""
+    previous = {(r['users'], r['podcasts']): r for r in baseline.get('results', [])}
+    found = []
+    for result in results:
+        base = previous.get((result['users'], result['podcasts']))
+        if base is None:
+            continue
+        scale = f"users={result['users']} podcasts={result['podcasts']}"
+        for stage, stats in result['stages'].items():
+            before = base['stages'].get(stage, {}).get('p50_us')
+            if before and stats['p50_us'] > before * (1 + threshold):
+                found.append(f"{scale} {stage}: p50 {before}us -> {stats['p50_us']}us")
+        load_now, load_before = result.get('load'), base.get('load')
+        if load_now and load_before:
+            if load_before.get('p95_ms') and load_now['p95_ms'] and load_now['p95_ms'] > load_before['p95_ms'] * (1 + threshold):
+                found.append(f"{scale} load: p95 {load_before['p95_ms']}ms -> {load_now['p95_ms']}ms")
+            if load_before.get('rps') and load_now['rps'] < load_before['rps'] * (1 - threshold):
+                found.append(f"{scale} load: {load_before['rps']} -> {load_now['rps']} req/s")
+    return found
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Per-stage + end-to-end latency of GET /recommendations/{user_id}")
+    parser.add_argument('--podcasts', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--users', type=int, nargs='+', default=[1000, 1000000])
+    parser.add_argument('--repeat', type=int, default=200, help="Samples per in-process stage")
+    parser.add_argument('--network-repeat', type=int, default=5, help="Samples per upstream fetch stage")
+    parser.add_argument('--num-recommendations', type=int, default=10)
+    parser.add_argument('--duration', type=float, default=10, help="Load test seconds per scale")
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--cache', action='store_true', help="Keep the result cache on during the load test")
+    parser.add_argument('--microbatch-window-ms', type=float, default=0,
+                        help="MICROBATCH_WINDOW_MS của service (0 = tắt micro-batching)")
+    parser.add_argument('--microbatch-max-size', type=int, default=64)
+    parser.add_argument('--skip-load', action='store_true')
+    parser.add_argument('--model-dir', type=Path, default=AI_SERVICE_DIR / 'models',
+                        help="Bundle dùng làm embedding / layer shapes")
+    parser.add_argument('--output', type=Path, default=None, help="Write JSON results to this file")
+    parser.add_argument('--baseline', type=Path, default=None, help="Previous --output to compare against")
+    parser.add_argument('--max-regression', type=float, default=0.2)
+    parser.add_argument('--json', action='store_true', help="Print JSON instead of a table")
+    args = parser.parse_args()
+
+    shape = base_shape(args.model_dir)
+    workdir = Path(tempfile.mkdtemp(prefix='hot-path-'))
+    results = []
+    try:
+        for podcasts in args.podcasts:
+            stub = StubContentService(podcasts, users=max(args.users))
+            threading.Thread(target=stub.serve_forever, daemon=True).start()
+            try:
+                for users in args.users:
+                    results.append(run_scale(workdir, stub, users, shape, args))
+            finally:
+                stub.shutdown()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'benchmark': 'hot_path',
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': {
+            'python': platform.python_version(),
+            'cpus': os.cpu_count(),
+            'machine': platform.machine(),
+            'embedding': shape['embedding'],
+            'layers': shape['layers'],
+        },
+        'config': {key: getattr(args, key) for key in ('repeat', 'network_repeat', 'num_recommendations',
+                                                        'duration', 'concurrency', 'cache',
+                                                        'microbatch_window_ms', 'microbatch_max_size')},
+        'results': results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"cpus={os.cpu_count()} embedding={shape['embedding']} concurrency={args.concurrency} duration={args.duration}s")
+        stages = list(results[0]['stages']) if results else []
+        print(f"{'users':>8} {'podcasts':>9} " + ' '.join(f'{stage:>14}' for stage in stages) +
+              f" {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for r in results:
+            load_result = r.get('load') or {}
+            print(f"{r['users']:>8} {r['podcasts']:>9} " +
+                  ' '.join(f"{r['stages'][stage]['p50_us']:>14}" for stage in stages) +
+                  f" {load_result.get('rps', '-'):>8} {load_result.get('p50_ms', '-'):>8} "
+                  f"{load_result.get('p95_ms', '-'):>8} {load_result.get('p99_ms', '-'):>8}")
+        print("(stage columns: p50 us)")
+
+    if args.baseline:
+        found = regressions(results, json.loads(args.baseline.read_text()), args.max_regression)
+        for line in found:
+            print(f"❌ Regression: {line}")
+        if found:
+            return 1
+        print(f"✅ No regressions beyond {args.max_regression:.0%} vs {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+MODEL STARTUP BENCHMARK
+Import-to-ready time của fastapi_service với model bundle dạng pickle (mappings.pkl + ncf_weights.npz)
+so với memory-mapped artifacts (model_artifacts.py), ở 1x / 10x / 100x mapping size hiện tại
+
+Chạy từ thư mục ai_service:
+    python benchmarks/model_startup.py --scales 1 10 100
+
+Mỗi lần đo là một process mới (MODEL_DIR trỏ vào bundle synthetic). Files vừa được ghi nên
+nằm sẵn trong page cache: số liệu là warm-cache start, đúng với restart / scale-out trên cùng node.
+"""
+
+import argparse
+import json
+import os
+import pickle
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+AI_SERVICE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(AI_SERVICE_DIR))
+
+CATEGORIES = ['Career', 'Health', 'Lifestyle', 'Personal_Development', 'Psychology', 'Business', 'Technology']
+
+# Chạy trong process con: import service (load model) rồi đo lookup + scoring đầu tiên
+PROBE = r"""
+import json, os, sys, time
+started = time.perf_counter()
+import fastapi_service
+ready = time.perf_counter()
+bundle = fastapi_service.recommendation_service.model_registry.active
+engine = bundle.scoring_engine
+user_ids = [f'user_{i:08d}' for i in range(0, len(engine.user2idx), max(1, len(engine.user2idx) // 100))][:100]
+podcast_ids = [f'p_{i:07d}' for i in range(1000)]
+t0 = time.perf_counter()
+user_idx = engine.encode_users(user_ids)
+t1 = time.perf_counter()
+engine.score_users(user_ids[:1], podcast_ids, engine.encode_podcasts(podcast_ids))
+t2 = time.perf_counter()
+with open('/proc/self/statm') as f:
+    rss = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+print(json.dumps({
+    'import_to_ready_s': ready - started,
+    'model_load_s': bundle.load_seconds,
+    'lookup_us_per_id': (t1 - t0) / len(user_ids) * 1e6,
+    'first_score_ms': (t2 - t1) * 1e3,
+    'known_users_found': int((user_idx >= 0).sum()),
+    'rss_mb': rss / 2 ** 20,
+}))
+"""
+
+
+def base_shape(model_dir: Path) -> dict:
+    """Mapping sizes + NCF layer shapes của bundle hiện tại (hoặc Kaggle defaults)"""
+    from ncf_model import load_ncf_model
+    shape = {'users': 1000, 'podcasts': 1990, 'embedding': 128, 'layers': [256, 128, 64, 1]}
+    try:
+        with open(model_dir / "mappings.pkl", 'rb') as f:
+            mappings = pickle.load(f)
+        shape['users'] = len(mappings['user2user_encoded'])
+        shape['podcasts'] = len(mappings['podcast2podcast_encoded'])
+        model = load_ncf_model(model_dir)
+        if model is not None:
+            shape['embedding'] = model.embedding_size
+            shape['layers'] = [kernel.shape[1] for kernel, _, _ in model.dense_layers]
+    except (OSError, KeyError, ValueError):
+        pass
+    return shape
+
+
+def write_pickle_bundle(directory: Path, users: int, podcasts: int, embedding: int, layers: list,
+                        podcast_ids: Optional[list] = None) -> None:
+    """Synthetic bundle cùng format với Kaggle export (+ ncf_weights.npz).
+
+    `podcast_ids`: IDs của training podcasts (vd. GUIDs của stub catalog), mặc định p_XXXXXXX
+    """
+    import pandas as pd
+    from ncf_model import NCFModel
+
+    directory.mkdir(parents=True)
+    user_ids = [f'user_{i:08d}' for i in range(users)]
+    podcast_ids = list(podcast_ids) if podcast_ids is not None else [f'p_{i:07d}' for i in range(podcasts)]
+    mappings = {
+        'user2user_encoded': {uid: i for i, uid in enumerate(user_ids)},
+        'podcast2podcast_encoded': {pid: i for i, pid in enumerate(podcast_ids)},
+        'userencoded2user': dict(enumerate(user_ids)),
+        'podcastencoded2podcast': dict(enumerate(podcast_ids)),
+    }
+    with open(directory / "mappings.pkl", 'wb') as f:
+        pickle.dump(mappings, f)
+    pd.DataFrame({
+        'podcast_id': podcast_ids,
+        'title': [f'Podcast {i}' for i in range(podcasts)],
+        'topics': [CATEGORIES[i % len(CATEGORIES)].lower() for i in range(podcasts)],
+        'category': [CATEGORIES[i % len(CATEGORIES)] for i in range(podcasts)],
+        'duration_minutes': [5 + i % 55 for i in range(podcasts)],
+    }).to_pickle(directory / "podcasts.pkl")
+    (directory / "model_metadata.json").write_text(json.dumps({"model_info": {"version": "bench"}}))
+
+    rng = np.random.default_rng(0)
+    sizes = [2 * embedding] + layers
+    dense = [
+        (rng.standard_normal((sizes[i], sizes[i + 1]), dtype=np.float32) * 0.05,
+         np.zeros(sizes[i + 1], dtype=np.float32),
+         'sigmoid' if i == len(layers) - 1 else 'relu')
+        for i in range(len(layers))
+    ]
+    NCFModel(
+        rng.standard_normal((users, embedding), dtype=np.float32) * 0.05,
+        rng.standard_normal((podcasts, embedding), dtype=np.float32) * 0.05,
+        dense
+    ).save_npz(directory / "ncf_weights.npz")
+
+
+def artifacts_bundle(pickle_dir: Path, directory: Path) -> None:
+    """Bundle chỉ gồm artifacts/ + metadata + training podcasts (không có mappings.pkl / weights)"""
+    from model_artifacts import ARTIFACTS_DIR, convert_model_dir
+    convert_model_dir(pickle_dir)
+    directory.mkdir(parents=True)
+    shutil.move(str(pickle_dir / ARTIFACTS_DIR), str(directory / ARTIFACTS_DIR))
+    for name in ("model_metadata.json", "podcasts.pkl"):
+        shutil.copy2(pickle_dir / name, directory / name)
+
+
+def probe(model_dir: Path, repeat: int) -> dict:
+    """Best of `repeat` fresh processes"""
+    env = dict(os.environ, MODEL_DIR=str(model_dir), DATA_DIR=str(model_dir.parent / 'data'),
+               TOPK_PRECOMPUTE_K='0', MODEL_WATCH_INTERVAL_SECONDS='0')
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', PROBE], cwd=AI_SERVICE_DIR, env=env,
+                                check=True, capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        result['process_s'] = time.perf_counter() - started
+        runs.append(result)
+    return min(runs, key=lambda r: r['import_to_ready_s'])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Service startup: pickle bundle vs memory-mapped artifacts")
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--model-dir', type=Path, default=AI_SERVICE_DIR / 'models',
+                        help="Bundle dùng làm base size / layer shapes")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', action='store_true', help="Print JSON instead of a table")
+    args = parser.parse_args()
+
+    shape = base_shape(args.model_dir)
+    workdir = Path(tempfile.mkdtemp(prefix='model-startup-'))
+    results = []
+    try:
+        for scale in args.scales:
+            users, podcasts = shape['users'] * scale, shape['podcasts'] * scale
+            pickle_dir, mmap_dir = workdir / f'pickle-{scale}x', workdir / f'mmap-{scale}x'
+            write_pickle_bundle(pickle_dir, users, podcasts, shape['embedding'], shape['layers'])
+            artifacts_bundle(pickle_dir, mmap_dir)
+            for variant, directory in (('pickle', pickle_dir), ('mmap', mmap_dir)):
+                result = probe(directory, args.repeat)
+                results.append(dict(variant=variant, scale=scale, users=users, podcasts=podcasts,
+                                    **{key: round(value, 3) for key, value in result.items()}))
+            shutil.rmtree(pickle_dir)
+            shutil.rmtree(mmap_dir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+
+    print(f"{'variant':<8} {'scale':>5} {'users':>8} {'podcasts':>9} {'import->ready s':>16} {'model load s':>13} "
+          f"{'lookup us/id':>13} {'1st score ms':>13} {'RSS MB':>8}")
+    for r in results:
+        print(f"{r['variant']:<8} {str(r['scale']) + 'x':>5} {r['users']:>8} {r['podcasts']:>9} "
+              f"{r['import_to_ready_s']:>16} {r['model_load_s']:>13} {r['lookup_us_per_id']:>13} "
+              f"{r['first_score_ms']:>13} {r['rss_mb']:>8}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
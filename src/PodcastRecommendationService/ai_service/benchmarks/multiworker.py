@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+MULTI-WORKER BENCHMARK
+Throughput (GET /recommendations/{user_id}) và memory mỗi worker khi chạy gunicorn_conf.py với
+1 / 2 / 4 / 8 workers, trước một stub ContentService (đếm số lần catalog được fetch)
+
+Chạy từ thư mục ai_service:
+    python benchmarks/multiworker.py --workers 1 2 4 8 --duration 10
+
+RSS đếm cả pages dùng chung; PSS chia pages dùng chung cho số processes đang map chúng,
+nên tổng PSS là memory thật của cả service. Result cache và top-K precompute bị tắt để mỗi
+request đều score online (CPU-bound).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+
+AI_SERVICE_DIR = Path(__file__).resolve().parent.parent
+CATEGORIES = ['Career', 'Health', 'Lifestyle', 'Personal_Development', 'Psychology', 'Business', 'Technology']
+
+
+class StubContentService(ThreadingHTTPServer):
+    """/api/internal/podcasts?page=&pageSize= với totalCount; đếm số lần page 1 được fetch.
+
+    Cũng serve /api/users?page=&pageSize= (UserService PaginationResult) khi `users` > 0.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, podcasts: int, users: int = 0):
+        rng = random.Random(7)
+        self.podcasts = [
+            {
+                'id': str(uuid.UUID(int=rng.getrandbits(128))),
+                'title': f'Podcast {i}',
+                'description': CATEGORIES[i % len(CATEGORIES)].lower(),
+                'category': CATEGORIES[i % len(CATEGORIES)],
+                'duration': f'00:{5 + i % 50:02d}:00',
+                'audioUrl': f'https://cdn.example.com/{i}.mp3',
+            }
+            for i in range(podcasts)
+        ]
+        self.users = users
+        self.catalog_fetches = 0
+        super().__init__(('127.0.0.1', 0), _StubHandler)
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        page, size = int(query.get('page', ['1'])[0]), int(query.get('pageSize', ['1000'])[0])
+        if url.path == '/api/internal/podcasts':
+            if page == 1:
+                self.server.catalog_fetches += 1
+            items = self.server.podcasts[(page - 1) * size:page * size]
+            body = json.dumps({'podcasts': items, 'totalCount': len(self.server.podcasts)}).encode()
+        elif url.path == '/api/users' and self.server.users:
+            start, stop = (page - 1) * size, min(page * size, self.server.users)
+            items = [{'id': f'user_{i:08d}'} for i in range(start, stop)]
+            body = json.dumps({'isSuccess': True, 'data': {'items': items, 'hasNext': stop < self.server.users}}).encode()
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def memory_kb(pid: int) -> dict:
+    """Rss / Pss (kB) từ /proc/<pid>/smaps_rollup"""
+    result = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in ('Rss', 'Pss'):
+                    result[key.lower()] = int(value.split()[0])
+    except OSError:
+        pass
+    return result
+
+
+def child_pids(pid: int) -> list:
+    children = []
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    if int(f.read().rsplit(')', 1)[1].split()[1]) == pid:
+                        children.append(int(entry))
+            except (OSError, IndexError, ValueError):
+                continue
+    return children
+
+
+async def wait_ready(base_url: str, workers: int, timeout: float) -> None:
+    """Chờ tới khi requests liên tiếp đều 200 (catalog đã có ở mọi worker)"""
+    deadline = time.monotonic() + timeout
+    ok = 0
+    async with httpx.AsyncClient(base_url=base_url, timeout=10) as client:
+        while ok < workers * 20:
+            if time.monotonic() > deadline:
+                raise RuntimeError("service did not become ready")
+            try:
+                response = await client.get('/recommendations/user_00001')
+                ok = ok + 1 if response.status_code == 200 else 0
+            except httpx.HTTPError:
+                ok = 0
+            if not ok:
+                await asyncio.sleep(0.2)
+
+
+async def load(base_url: str, user_ids: list, duration: float, concurrency: int) -> dict:
+    latencies = []
+    errors = 0
+    stop_at = time.monotonic() + duration
+
+    async def run(client: httpx.AsyncClient, seed: int) -> None:
+        nonlocal errors
+        rng = random.Random(seed)
+        while time.monotonic() < stop_at:
+            started = time.perf_counter()
+            response = await client.get(f'/recommendations/{rng.choice(user_ids)}', params={'num_recommendations': 10})
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=30, limits=limits) as client:
+        started = time.monotonic()
+        await asyncio.gather(*(run(client, i) for i in range(concurrency)))
+        elapsed = time.monotonic() - started
+    latencies.sort()
+    return {
+        'rps': len(latencies) / elapsed,
+        'p50_ms': latencies[len(latencies) // 2] * 1e3 if latencies else None,
+        'p95_ms': latencies[int(len(latencies) * 0.95)] * 1e3 if latencies else None,
+        'p99_ms': latencies[int(len(latencies) * 0.99)] * 1e3 if latencies else None,
+        'requests': len(latencies),
+        'errors': errors,
+    }
+
+
+def run_workers(workers: int, stub: StubContentService, args) -> dict:
+    with tempfile.TemporaryDirectory(prefix='multiworker-') as data_dir:
+        return _run_workers(workers, stub, args, Path(data_dir))
+
+
+def _run_workers(workers: int, stub: StubContentService, args, data_dir: Path) -> dict:
+    port = free_port()
+    env = dict(
+        os.environ,
+        DATA_DIR=str(data_dir),  # stub catalog không được ghi đè snapshot của service thật
+        WEB_CONCURRENCY=str(workers),
+        BIND=f'127.0.0.1:{port}',
+        CONTENT_SERVICE_URL=f'http://127.0.0.1:{stub.server_address[1]}',
+        RESULT_CACHE_MAX_BYTES='0',
+        TOPK_PRECOMPUTE_K='0',
+        MODEL_WATCH_INTERVAL_SECONDS='0',
+    )
+    env.pop('SHARED_STATE_DIR', None)
+    fetches_before = stub.catalog_fetches
+    master = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn_conf.py', 'fastapi_service:app'],
+                              cwd=AI_SERVICE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        asyncio.run(wait_ready(base_url, workers, timeout=120))
+        user_ids = [f'user_{i:05d}' for i in range(1, 1001)] + [f'cold-{i}' for i in range(200)]
+        result = asyncio.run(load(base_url, user_ids, args.duration, args.concurrency))
+        worker_memory = [memory_kb(pid) for pid in child_pids(master.pid)]
+        master_memory = memory_kb(master.pid)
+    finally:
+        master.terminate()
+        master.wait(timeout=30)
+
+    worker_memory = [m for m in worker_memory if m]
+    return dict(
+        workers=workers,
+        rps=round(result['rps'], 1),
+        p50_ms=round(result['p50_ms'], 1) if result['p50_ms'] is not None else None,
+        p99_ms=round(result['p99_ms'], 1) if result['p99_ms'] is not None else None,
+        errors=result['errors'],
+        worker_rss_mb=round(sum(m.get('rss', 0) for m in worker_memory) / len(worker_memory) / 1024, 1),
+        worker_pss_mb=round(sum(m.get('pss', 0) for m in worker_memory) / len(worker_memory) / 1024, 1),
+        total_pss_mb=round((sum(m.get('pss', 0) for m in worker_memory) + master_memory.get('pss', 0)) / 1024, 1),
+        catalog_fetches=stub.catalog_fetches - fetches_before,
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="gunicorn multi-worker throughput + per-worker memory")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--podcasts', type=int, default=5000)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--json', action='store_true', help="Print JSON instead of a table")
+    args = parser.parse_args()
+
+    stub = StubContentService(args.podcasts)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    try:
+        results = [run_workers(workers, stub, args) for workers in args.workers]
+    finally:
+        stub.shutdown()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+
+    print(f"cpus={os.cpu_count()} podcasts={args.podcasts} concurrency={args.concurrency} duration={args.duration}s")
+    print(f"{'workers':>7} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'worker RSS MB':>14} "
+          f"{'worker PSS MB':>14} {'total PSS MB':>13} {'catalog fetches':>16}")
+    for r in results:
+        print(f"{r['workers']:>7} {r['rps']:>8} {r['p50_ms']:>8} {r['p99_ms']:>8} {r['errors']:>7} "
+              f"{r['worker_rss_mb']:>14} {r['worker_pss_mb']:>14} {r['total_pss_mb']:>13} {r['catalog_fetches']:>16}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
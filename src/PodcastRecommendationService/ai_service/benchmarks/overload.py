@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+OVERLOAD BENCHMARK
+Bão hoà GET /recommendations/{user_id} (nhiều clients hơn khả năng score của service) trong khi một
+probe gọi /health và /metrics đều đặn, để thấy admission control của scoring pool: requests vượt
+SCORING_MAX_PENDING nhận 503 + Retry-After ngay, latency của requests được phục vụ bị chặn trên,
+và health checks vẫn trả lời nhanh (Docker HEALTHCHECK timeout = 10s)
+
+Chạy từ thư mục ai_service:
+    python benchmarks/overload.py --podcasts 10000 --concurrency 256 --max-pending 16 0
+
+Mỗi giá trị `--max-pending` là một lần chạy (0 = không giới hạn, requests xếp hàng vô hạn trong pool).
+Result cache, top-K precompute và similar-podcasts refresh bị tắt để mọi request đều score online.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+AI_SERVICE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from model_startup import artifacts_bundle, base_shape, write_pickle_bundle  # noqa: E402
+from multiworker import StubContentService, free_port, wait_ready  # noqa: E402
+
+# Docker HEALTHCHECK --timeout
+HEALTH_TIMEOUT_SECONDS = 10.0
+
+
+def percentiles(samples: List[float]) -> Dict[str, Optional[float]]:
+    samples = sorted(samples)
+
+    def at(q: float) -> Optional[float]:
+        return round(samples[min(len(samples) - 1, int(q * len(samples)))] * 1e3, 2) if samples else None
+
+    return {'p50_ms': at(0.50), 'p95_ms': at(0.95), 'p99_ms': at(0.99), 'max_ms': at(1.0)}
+
+
+async def saturate(base_url: str, user_ids: list, duration: float, concurrency: int, probe_interval: float) -> dict:
+    served, shed = [], []
+    other_errors = 0
+    missing_retry_after = 0
+    probes = {'/health': [], '/metrics': []}
+    probe_failures = 0
+    stop_at = time.monotonic() + duration
+
+    async def client_loop(client: httpx.AsyncClient, seed: int) -> None:
+        nonlocal other_errors, missing_retry_after
+        rng = random.Random(seed)
+        while time.monotonic() < stop_at:
+            started = time.perf_counter()
+            try:
+                response = await client.get(f'/recommendations/{rng.choice(user_ids)}', params={'num_recommendations': 10})
+            except httpx.HTTPError:
+                other_errors += 1
+                continue
+            elapsed = time.perf_counter() - started
+            if response.status_code == 200:
+                served.append(elapsed)
+            elif response.status_code in (429, 503):
+                shed.append(elapsed)
+                retry_after = response.headers.get('retry-after')
+                if retry_after is None:
+                    missing_retry_after += 1
+                # Client tôn trọng Retry-After (jitter 0.5-1x để các clients không retry cùng lúc)
+                await asyncio.sleep(float(retry_after or 1) * (0.5 + 0.5 * rng.random()))
+            else:
+                other_errors += 1
+
+    async def probe_loop() -> None:
+        nonlocal probe_failures
+        # Client riêng: probe không chờ connection của load clients
+        async with httpx.AsyncClient(base_url=base_url, timeout=HEALTH_TIMEOUT_SECONDS) as client:
+            while time.monotonic() < stop_at:
+                for path, samples in probes.items():
+                    started = time.perf_counter()
+                    try:
+                        response = await client.get(path)
+                        if response.status_code == 200:
+                            samples.append(time.perf_counter() - started)
+                        else:
+                            probe_failures += 1
+                    except httpx.HTTPError:
+                        probe_failures += 1
+                await asyncio.sleep(probe_interval)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        started = time.monotonic()
+        await asyncio.gather(probe_loop(), *(client_loop(client, i) for i in range(concurrency)))
+        elapsed = time.monotonic() - started
+    return {
+        'served': len(served),
+        'served_rps': round(len(served) / elapsed, 1),
+        'served_latency': percentiles(served),
+        'shed': len(shed),
+        'shed_latency': percentiles(shed),
+        'shed_missing_retry_after': missing_retry_after,
+        'other_errors': other_errors,
+        'health': percentiles(probes['/health']),
+        'metrics': percentiles(probes['/metrics']),
+        'probe_failures': probe_failures,
+    }
+
+
+def run(model_dir: Path, stub: StubContentService, users: int, max_pending: int, args) -> dict:
+    stub_url = f'http://127.0.0.1:{stub.server_address[1]}'
+    env = dict(
+        os.environ,
+        MODEL_DIR=str(model_dir),
+        DATA_DIR=str(model_dir.parent / f'data-{max_pending}'),  # stub catalog không được ghi đè snapshot của service thật
+        CONTENT_SERVICE_URL=stub_url,
+        USER_SERVICE_URL=stub_url,
+        TOPK_PRECOMPUTE_K='0',
+        SIMILAR_NEIGHBORS='0',
+        MODEL_WATCH_INTERVAL_SECONDS='0',
+        INTERACTION_SNAPSHOT_SECONDS='0',
+        RESULT_CACHE_MAX_BYTES='0',
+        SCORING_MAX_PENDING=str(max_pending),
+        SCORING_WORKERS=str(args.workers),
+    )
+    env.pop('SHARED_STATE_DIR', None)
+    env.pop('WEB_CONCURRENCY', None)
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'fastapi_service:app', '--host', '127.0.0.1', '--port', str(port),
+         '--log-level', 'warning'],
+        cwd=AI_SERVICE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        asyncio.run(wait_ready(base_url, 1, timeout=300))
+        user_ids = [f'user_{i:08d}' for i in range(users)] + [f'cold-{i}' for i in range(200)]
+        result = asyncio.run(saturate(base_url, user_ids, args.duration, args.concurrency, args.probe_interval))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return dict(max_pending=max_pending, **result)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Load shedding + /health responsiveness under saturation")
+    parser.add_argument('--podcasts', type=int, default=10000)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--max-pending', type=int, nargs='+', default=[16, 0],
+                        help="SCORING_MAX_PENDING của mỗi lần chạy (0 = không giới hạn)")
+    parser.add_argument('--workers', type=int, default=0, help="SCORING_WORKERS (0 = số cores)")
+    parser.add_argument('--concurrency', type=int, default=256)
+    parser.add_argument('--duration', type=float, default=15)
+    parser.add_argument('--probe-interval', type=float, default=0.1, help="Giây giữa hai lần probe /health + /metrics")
+    parser.add_argument('--model-dir', type=Path, default=AI_SERVICE_DIR / 'models',
+                        help="Bundle dùng làm embedding / layer shapes")
+    parser.add_argument('--json', action='store_true', help="Print JSON instead of a table")
+    args = parser.parse_args()
+
+    shape = base_shape(args.model_dir)
+    workdir = Path(tempfile.mkdtemp(prefix='overload-'))
+    stub = StubContentService(args.podcasts)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    try:
+        pickle_dir, model_dir = workdir / 'pickle', workdir / 'bundle'
+        podcast_ids = [podcast['id'] for podcast in stub.podcasts]
+        write_pickle_bundle(pickle_dir, args.users, len(podcast_ids), shape['embedding'], shape['layers'], podcast_ids)
+        artifacts_bundle(pickle_dir, model_dir)
+        results = [run(model_dir, stub, args.users, max_pending, args) for max_pending in args.max_pending]
+    finally:
+        stub.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+
+    print(f"cpus={os.cpu_count()} podcasts={args.podcasts} concurrency={args.concurrency} duration={args.duration}s")
+    print(f"{'max pending':>11} {'served/s':>9} {'served p50':>11} {'served p99':>11} {'shed':>7} {'shed p99':>9} "
+          f"{'health p50':>11} {'health max':>11} {'metrics max':>12} {'probe fails':>12}")
+    for r in results:
+        print(f"{r['max_pending'] or 'unbounded':>11} {r['served_rps']:>9} {r['served_latency']['p50_ms']:>11} "
+              f"{r['served_latency']['p99_ms']:>11} {r['shed']:>7} {str(r['shed_latency']['p99_ms']):>9} "
+              f"{r['health']['p50_ms']:>11} {r['health']['max_ms']:>11} {r['metrics']['max_ms']:>12} "
+              f"{r['probe_failures']:>12}")
+    print("(latencies in ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,305 @@
+"""
+CATALOG SNAPSHOT
+Real podcast catalog từ ContentService, giữ dưới dạng immutable versioned snapshot
+(columnar CatalogStore) và refresh ở background (single-flight, stale-while-revalidate)
+"""
+
+import asyncio
+import logging
+import re
+import time
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from catalog_filters import FilterIndex
+from catalog_store import CatalogStore
+
+logger = logging.getLogger(__name__)
+
+# Podcast IDs từ ContentService là GUIDs; training IDs (p_00xxx) bị loại
+GUID_PATTERN = r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$"
+_GUID_RE = re.compile(GUID_PATTERN)
+
+# Internal API field -> catalog column
+COLUMN_MAPPING = {
+    'id': 'podcast_id',
+    'title': 'title',
+    'description': 'topics',  # Use description as topic
+    'duration': 'duration_raw',  # Format: "00:11:27"
+    'audioUrl': 'content_url',
+    'thumbnailUrl': 'thumbnail_url'
+}
+
+
+def parse_duration_to_minutes(duration) -> Optional[int]:
+    """Parse duration từ nhiều format về minutes
+    - "00:33:20" (HH:MM:SS) -> 33
+    - "33:20" (MM:SS) -> 33
+    - 2000 (seconds) -> 33
+    - 33.5 (minutes) -> 33
+    """
+    if pd.isna(duration) or duration is None:
+        return None
+
+    try:
+        # If already a number (seconds or minutes)
+        if isinstance(duration, (int, float)):
+            # Assume if > 1000 it's seconds, else minutes
+            return int(duration / 60) if duration > 1000 else int(duration)
+
+        # If string, try parsing HH:MM:SS or MM:SS
+        duration_str = str(duration).strip()
+        parts = duration_str.split(':')
+
+        if len(parts) == 3:  # HH:MM:SS
+            hours, minutes, seconds = map(int, parts)
+            return hours * 60 + minutes + (1 if seconds > 30 else 0)
+        elif len(parts) == 2:  # MM:SS
+            minutes, seconds = map(int, parts)
+            return minutes + (1 if seconds > 30 else 0)
+        elif len(parts) == 1:  # Just number
+            num = float(duration_str)
+            return int(num / 60) if num > 1000 else int(num)
+        else:
+            logger.warning(f"⚠️ Unknown duration format: {duration}")
+            return None
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to parse duration '{duration}': {e}")
+        return None
+
+
+def parse_duration_hhmmss(duration_str) -> Optional[int]:
+    """Parse "00:11:27" / "05:00:00" (Internal API format) về minutes"""
+    if pd.isna(duration_str) or duration_str is None:
+        return None
+    try:
+        parts = str(duration_str).split(':')
+        if len(parts) == 3:  # HH:MM:SS
+            hours, minutes, seconds = map(int, parts)
+            return hours * 60 + minutes + (1 if seconds > 30 else 0)
+        elif len(parts) == 2:  # MM:SS
+            minutes, seconds = map(int, parts)
+            return minutes + (1 if seconds > 30 else 0)
+        # Try to extract number from "11 phút" format as fallback
+        match = re.search(r'(\d+)', str(duration_str))
+        if match:
+            return int(match.group(1))
+        return None
+    except Exception as e:
+        logger.warning(f"Failed to parse duration '{duration_str}': {e}")
+        return None
+
+
+def normalize_podcast(raw: Dict[str, Any], position: int = 0) -> Dict[str, Any]:
+    """Chuẩn hoá một Internal API podcast thành catalog row (rename + parse duration)"""
+    # Rename fields if they exist (keeping field order)
+    record = {
+        COLUMN_MAPPING[key] if key in COLUMN_MAPPING and COLUMN_MAPPING[key] not in raw else key: value
+        for key, value in raw.items()
+    }
+
+    # Ensure required fields exist
+    if 'podcast_id' not in record:
+        record['podcast_id'] = str(position)
+    if 'title' not in record:
+        record['title'] = f"Podcast {position + 1}"
+
+    # Convert podcast_id to string
+    record['podcast_id'] = str(record['podcast_id'])
+
+    # Parse duration from "00:11:27" (HH:MM:SS) string to minutes
+    if 'duration_raw' in record:
+        record['duration_minutes'] = parse_duration_hhmmss(record['duration_raw'])
+    elif 'duration_minutes' in record:
+        record['duration_minutes'] = parse_duration_to_minutes(record['duration_minutes'])
+
+    return record
+
+
+def build_catalog_store(podcasts_list: List[Dict[str, Any]]) -> CatalogStore:
+    """Chuẩn hoá Internal API podcasts thành columnar catalog"""
+    if not isinstance(podcasts_list, list) or len(podcasts_list) == 0:
+        return CatalogStore.empty()
+    return CatalogStore.from_records([normalize_podcast(p, i) for i, p in enumerate(podcasts_list)])
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """Immutable view của catalog tại một version; không được mutate sau khi publish"""
+    version: int
+    fetched_at: float               # epoch seconds
+    store: CatalogStore             # all parsed podcasts
+    candidates: CatalogStore        # GUID-only rows, row 0..n-1
+    podcast_ids: Tuple[str, ...]    # candidates.podcast_ids (row order)
+    filter_seconds: float = 0.0     # thời gian GUID filtering lúc build
+    filter_index: Optional[FilterIndex] = None  # category / duration bitsets trên candidates
+
+    @property
+    def age_seconds(self) -> float:
+        return max(0.0, time.time() - self.fetched_at)
+
+    @property
+    def fetched_at_iso(self) -> str:
+        return datetime.fromtimestamp(self.fetched_at).isoformat()
+
+    def __len__(self) -> int:
+        return len(self.podcast_ids)
+
+
+def build_snapshot(
+    store: Union[CatalogStore, pd.DataFrame, None],
+    version: int,
+    fetched_at: Optional[float] = None
+) -> CatalogSnapshot:
+    """GUID filtering và filter index build chạy một lần mỗi refresh, không phải mỗi request"""
+    if not isinstance(store, CatalogStore):
+        store = CatalogStore.from_dataframe(store)
+    started = time.perf_counter()
+    if store.has_column('podcast_id'):
+        guid_rows = np.fromiter((i for i, pid in enumerate(store.podcast_ids) if _GUID_RE.match(pid)), dtype=np.int64)
+    else:
+        guid_rows = np.empty(0, dtype=np.int64)
+    candidates = store if len(guid_rows) == len(store) else store.take(guid_rows)
+    filter_seconds = time.perf_counter() - started
+    return CatalogSnapshot(
+        version=version,
+        fetched_at=time.time() if fetched_at is None else fetched_at,
+        store=store,
+        candidates=candidates,
+        podcast_ids=candidates.podcast_ids,
+        filter_seconds=filter_seconds,
+        filter_index=FilterIndex(candidates),
+    )
+
+
+class CatalogRefresher:
+    """Giữ snapshot hiện tại và refresh nó ở background.
+
+    - Requests đọc `snapshot` ngay lập tức, không bao giờ chờ refresh nếu đã có data.
+    - Mọi refresh (background loop + request path) đi qua một in-flight task duy nhất.
+    - Refresh fail hoặc trả về rỗng thì giữ snapshot cũ (stale) thay vì xoá.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[], Awaitable[CatalogStore]],
+        ttl_seconds: float = 300,
+        refresh_interval: Optional[float] = None,
+        retry_interval: float = 15,
+        on_publish: Optional[Callable[[CatalogSnapshot], None]] = None,
+    ):
+        self._fetch = fetch
+        self.ttl_seconds = ttl_seconds
+        self.refresh_interval = refresh_interval if refresh_interval is not None else ttl_seconds
+        self.retry_interval = retry_interval
+        self.on_publish = on_publish  # called with each new snapshot version
+        self._snapshot = None      # type: Optional[CatalogSnapshot]
+        self._version = 0
+        self._inflight = None      # type: Optional[asyncio.Task]
+        self._loop_task = None     # type: Optional[asyncio.Task]
+        self.last_error = None     # type: Optional[str]
+        # Counters cho /metrics
+        self.stale_serves = 0      # requests nhận snapshot quá TTL
+        self.refresh_failures = 0
+
+    @property
+    def snapshot(self) -> Optional[CatalogSnapshot]:
+        return self._snapshot
+
+    @property
+    def is_stale(self) -> bool:
+        return self._snapshot is None or self._snapshot.age_seconds >= self.ttl_seconds
+
+    async def get_snapshot(self) -> Optional[CatalogSnapshot]:
+        """Snapshot hiện tại; chỉ chờ fetch khi chưa có snapshot nào (cold start)"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return await self.refresh()
+        if snapshot.age_seconds >= self.ttl_seconds:
+            # Stale-while-revalidate: serve ngay, refresh coalesced ở background
+            self.stale_serves += 1
+            self.trigger_refresh()
+        return snapshot
+
+    def trigger_refresh(self) -> asyncio.Task:
+        """Start a refresh if none is running; never blocks the caller"""
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.ensure_future(self._do_refresh())
+        return self._inflight
+
+    async def refresh(self) -> Optional[CatalogSnapshot]:
+        """Join the in-flight refresh (or start one) and return the resulting snapshot"""
+        # shield: a cancelled request must not cancel the shared fetch
+        return await asyncio.shield(self.trigger_refresh())
+
+    def publish(self, store: CatalogStore, fetched_at: Optional[float] = None) -> CatalogSnapshot:
+        """Build and atomically swap in a new snapshot version"""
+        self._version += 1
+        snapshot = build_snapshot(store, self._version, fetched_at)
+        self._snapshot = snapshot
+        if self.on_publish is not None:
+            try:
+                self.on_publish(snapshot)
+            except Exception as e:
+                logger.error(f"❌ Catalog publish hook failed: {e}")
+        return snapshot
+
+    async def _do_refresh(self) -> Optional[CatalogSnapshot]:
+        started = time.perf_counter()
+        error = "No podcasts returned"
+        try:
+            store = await self._fetch()
+        except Exception as e:
+            store = None
+            error = str(e)
+            logger.error(f"❌ Catalog refresh error: {e}")
+
+        if store is not None and self._snapshot is not None and store is self._snapshot.store:
+            # Incremental sync found no changes: keep version, just mark it fresh
+            self._snapshot = replace(self._snapshot, fetched_at=time.time())
+            self.last_error = None
+            logger.debug(f"Catalog snapshot v{self._snapshot.version} unchanged")
+            return self._snapshot
+
+        if store is not None and not store.is_empty:
+            snapshot = self.publish(store)
+            self.last_error = None
+            logger.info(f"🆕 Catalog snapshot v{snapshot.version}: {len(store)} podcasts, "
+                        f"{len(snapshot)} GUID candidates ({time.perf_counter() - started:.2f}s)")
+            return snapshot
+
+        self.last_error = error
+        self.refresh_failures += 1
+        if self._snapshot is not None:
+            logger.warning(f"⚠️ Catalog refresh failed; serving stale snapshot v{self._snapshot.version} "
+                           f"(age={int(self._snapshot.age_seconds)}s)")
+        else:
+            logger.warning("⚠️ Catalog refresh failed and no snapshot is available yet")
+        return self._snapshot
+
+    def start(self) -> None:
+        """Start the background refresh loop (app lifespan)"""
+        if self._loop_task is None or self._loop_task.done():
+            self._loop_task = asyncio.ensure_future(self._refresh_loop())
+
+    async def stop(self) -> None:
+        for task in (self._loop_task, self._inflight):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+        self._loop_task = None
+        self._inflight = None
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await self.refresh()
+            # Retry sooner while ContentService is failing
+            delay = self.refresh_interval if self.last_error is None and self._snapshot is not None else self.retry_interval
+            await asyncio.sleep(delay)
@@ -0,0 +1,178 @@
+"""
+CATALOG SNAPSHOT FILE
+Bản sao trên disk của catalog đã fetch thành công gần nhất (columnar, có format version và CRC32),
+ghi atomically sau mỗi lần sync và memory-map lúc startup: pod mới / restart serve ngay từ catalog
+known-good trong khi ContentService còn chậm hoặc down, rồi refresh ở background.
+
+Layout: MAGIC | format version (u32) | header length (u32) | CRC32 (u32) | reserved (u32) | header JSON |
+sections (mỗi section align SECTION_ALIGN bytes). CRC32 tính trên header JSON + toàn bộ sections.
+"""
+
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from catalog_store import CatalogStore, StringTable
+from shared_state import write_atomic
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"PODCATLG"
+FORMAT_VERSION = 2  # 2: object columns là JSON (1: pickle)
+_PREFIX = struct.Struct('<8sIIII')
+SECTION_ALIGN = 64
+
+
+@dataclass(frozen=True)
+class CatalogFile:
+    """Catalog đã load từ snapshot file"""
+    store: CatalogStore
+    fetched_at: float   # epoch seconds của lần sync đã tạo ra catalog này
+    saved_at: float
+    path: Path
+    nbytes: int
+
+    @property
+    def age_seconds(self) -> float:
+        return max(0.0, time.time() - self.fetched_at)
+
+
+class _Writer:
+    def __init__(self):
+        self.chunks = []  # type: List[bytes]
+        self.offset = 0
+
+    def add(self, data: bytes) -> Dict[str, int]:
+        padding = -self.offset % SECTION_ALIGN
+        if padding:
+            self.chunks.append(b'\0' * padding)
+            self.offset += padding
+        section = {"offset": self.offset, "length": len(data)}
+        self.chunks.append(data)
+        self.offset += len(data)
+        return section
+
+    def add_array(self, array: np.ndarray) -> Dict[str, Any]:
+        array = np.ascontiguousarray(array)
+        return dict(self.add(array.tobytes()), dtype=array.dtype.str, count=len(array))
+
+
+def save_catalog(path: Path, store: CatalogStore, fetched_at: Optional[float] = None) -> int:
+    """Ghi catalog store (tmp + rename; process đang mmap file cũ vẫn đọc được); trả về số bytes"""
+    writer = _Writer()
+    columns = {}  # type: Dict[str, Dict[str, Any]]
+    for name, table in store.strings.items():
+        encoded = [value.encode('utf-8') for value in table.values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        columns[name] = {
+            "kind": "string",
+            "codes": writer.add_array(table.codes),
+            "offsets": writer.add_array(offsets),
+            "values": writer.add(b''.join(encoded)),
+        }
+    for name, array in store.numeric.items():
+        columns[name] = {"kind": "numeric", "data": writer.add_array(array)}
+    for name, array in store.objects.items():
+        # JSON, không pickle: file nằm trên volume dùng chung, load không được chạy code
+        columns[name] = {"kind": "object", "data": writer.add(json.dumps(array.tolist(), ensure_ascii=False).encode('utf-8'))}
+
+    header = json.dumps({
+        "size": len(store),
+        "columns": store.columns,
+        "fetched_at": time.time() if fetched_at is None else fetched_at,
+        "saved_at": time.time(),
+        "sections": columns,
+    }).encode('utf-8')
+    # Sections bắt đầu ở boundary sau header để offsets trong header không phụ thuộc độ dài của nó
+    data_start = _data_start(len(header))
+    body = b''.join(writer.chunks)
+    checksum = zlib.crc32(body, zlib.crc32(header))
+    data = b''.join([
+        _PREFIX.pack(MAGIC, FORMAT_VERSION, len(header), checksum, 0),
+        header,
+        b'\0' * (data_start - _PREFIX.size - len(header)),
+        body,
+    ])
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_atomic(path, data)
+    return len(data)
+
+
+def load_catalog(path: Path) -> Optional[CatalogFile]:
+    """Memory-map snapshot file; None nếu chưa có, khác format version hoặc hỏng (checksum / parse)"""
+    try:
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < _PREFIX.size:
+                raise ValueError("file is truncated")
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"⚠️ Ignoring unreadable catalog snapshot {path}: {e}")
+        return None
+    try:
+        return _read(path, buffer, size)
+    except Exception as e:
+        logger.warning(f"⚠️ Ignoring unreadable catalog snapshot {path}: {e}")
+        return None
+
+
+def _data_start(header_length: int) -> int:
+    end = _PREFIX.size + header_length
+    return end + (-end % SECTION_ALIGN)
+
+
+def _read(path: Path, buffer: mmap.mmap, size: int) -> CatalogFile:
+    magic, version, header_length, checksum, _ = _PREFIX.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError("not a catalog snapshot")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"format version {version} (expected {FORMAT_VERSION})")
+    view = memoryview(buffer)
+    header_bytes = view[_PREFIX.size:_PREFIX.size + header_length]
+    data_start = _data_start(header_length)
+    if zlib.crc32(view[data_start:], zlib.crc32(header_bytes)) != checksum:
+        raise ValueError("checksum mismatch")
+    header = json.loads(bytes(header_bytes))
+
+    def array(section: Dict[str, Any]) -> np.ndarray:
+        # Read-only view trên mmap (ACCESS_READ): không copy, pages được load khi đọc tới
+        return np.frombuffer(buffer, dtype=np.dtype(section["dtype"]), count=section["count"],
+                             offset=data_start + section["offset"])
+
+    def raw(section: Dict[str, Any]) -> bytes:
+        start = data_start + section["offset"]
+        return bytes(view[start:start + section["length"]])
+
+    strings, numeric, objects = {}, {}, {}
+    for name, column in header["sections"].items():
+        kind = column["kind"]
+        if kind == "string":
+            blob = raw(column["values"])
+            bounds = array(column["offsets"]).tolist()
+            values = [blob[start:stop].decode('utf-8') for start, stop in zip(bounds[:-1], bounds[1:])]
+            strings[name] = StringTable(values, array(column["codes"]))
+        elif kind == "numeric":
+            numeric[name] = array(column["data"])
+        elif kind == "object":
+            values = np.empty(header["size"], dtype=object)
+            # Gán từng phần tử: slice assignment sẽ broadcast các giá trị là list
+            for row, value in enumerate(json.loads(raw(column["data"]))):
+                values[row] = value
+            values.setflags(write=False)
+            objects[name] = values
+        else:
+            raise ValueError(f"unknown column kind {kind!r}")
+    store = CatalogStore(header["columns"], strings, numeric, objects, header["size"])
+    return CatalogFile(store, header["fetched_at"], header["saved_at"], path, size)
@@ -0,0 +1,224 @@
+"""
+CATALOG FILTER INDEX
+Bitmap indexes (np.packbits, 1 bit mỗi candidate) trên categories và bucketed `duration_minutes`,
+build một lần mỗi catalog snapshot; category / duration-range / exclude-ID filters của một request
+được kết hợp bằng bitwise ops thành candidate mask trước khi score
+"""
+
+import math
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from catalog_store import CatalogStore
+
+# Duration buckets (minutes): bucket i = [edges[i], edges[i + 1]); bucket đầu gồm cả giá trị âm
+DURATION_BUCKET_EDGES = (-math.inf, 5, 10, 15, 20, 30, 45, 60, 90, 120, math.inf)
+
+
+# ContentService PodcastDto: topicCategories / emotionCategories là enum arrays, serialize thành ints
+# (ContentService.Domain.Enums.ContentEnums); training data chỉ có một `category` string mỗi podcast
+TOPIC_CATEGORIES = {
+    1: "MentalHealth", 2: "Relationships", 3: "SelfCare", 4: "Mindfulness", 5: "PersonalGrowth",
+    6: "WorkLifeBalance", 7: "Stress", 8: "Depression", 9: "Anxiety", 10: "Therapy",
+}
+EMOTION_CATEGORIES = {
+    1: "Happiness", 2: "Sadness", 3: "Anxiety", 4: "Anger", 5: "Fear",
+    6: "Love", 7: "Hope", 8: "Gratitude", 9: "Mindfulness", 10: "SelfCompassion",
+}
+MULTI_VALUED_CATEGORY_COLUMNS = (('topicCategories', TOPIC_CATEGORIES), ('emotionCategories', EMOTION_CATEGORIES))
+
+
+def normalize_category(value: str) -> str:
+    return value.strip().lower()
+
+
+def _category_keys(values: np.ndarray) -> Tuple[np.ndarray, Dict[tuple, int]]:
+    """(key mỗi row, tổ hợp enum values -> key) của một topicCategories / emotionCategories column"""
+    combinations = {}  # type: Dict[tuple, int]
+    try:
+        keys = np.fromiter((combinations.setdefault(tuple(items) if isinstance(items, list) else (), len(combinations))
+                            for items in values), dtype=np.int64, count=len(values))
+    except TypeError:
+        # Giá trị unhashable trong list (không phải enum value): bỏ qua từng phần tử đó
+        combinations.clear()
+        keys = np.fromiter((combinations.setdefault(
+            tuple(item for item in items if isinstance(item, (int, str))) if isinstance(items, list) else (),
+            len(combinations)) for items in values), dtype=np.int64, count=len(values))
+    return keys, combinations
+
+
+def _category_name(value, names: Dict[int, str]) -> Optional[str]:
+    """Enum value (int hoặc tên) -> normalized category name; None nếu không nhận ra"""
+    if isinstance(value, str):
+        value = value.strip()
+        if not value.isdigit():
+            return normalize_category(value) or None
+        value = int(value)
+    if isinstance(value, int):
+        name = names.get(value)
+        return normalize_category(name) if name is not None else None
+    return None
+
+
+@dataclass(frozen=True)
+class CandidateFilter:
+    """Filters của một recommendation request (đã normalize, hashable -> dùng được trong result cache key).
+
+    - categories: OR giữa các categories (không phân biệt hoa thường); match `category` (training data)
+      hoặc bất kỳ giá trị nào trong `topicCategories` / `emotionCategories` (ContentService), ví dụ MentalHealth
+    - min_duration / max_duration: minutes, inclusive; podcasts không có duration bị loại
+    - exclude_ids: podcast IDs không được trả về
+    """
+    categories: Tuple[str, ...] = ()
+    min_duration: Optional[float] = None
+    max_duration: Optional[float] = None
+    exclude_ids: Tuple[str, ...] = ()
+
+    @classmethod
+    def build(
+        cls,
+        categories: Optional[Iterable[str]] = None,
+        min_duration: Optional[float] = None,
+        max_duration: Optional[float] = None,
+        exclude_ids: Optional[Iterable[str]] = None,
+    ) -> Optional["CandidateFilter"]:
+        """None nếu request không có filter nào (unfiltered path giữ nguyên)"""
+        # "Psychology,Health" và categories=Psychology&categories=Health là như nhau
+        names = {normalize_category(part) for value in categories or () for part in value.split(',')}
+        names.discard('')
+        excluded = {pid for pid in exclude_ids or () if pid}
+        if not names and min_duration is None and max_duration is None and not excluded:
+            return None
+        if min_duration is not None and max_duration is not None and min_duration > max_duration:
+            raise ValueError(f"min_duration ({min_duration:g}) is greater than max_duration ({max_duration:g})")
+        return cls(tuple(sorted(names)), min_duration, max_duration, tuple(sorted(excluded)))
+
+    @property
+    def has_duration(self) -> bool:
+        return self.min_duration is not None or self.max_duration is not None
+
+
+class FilterIndex:
+    """Bitsets (packed uint8, big bit order) trên candidate rows của một snapshot; read-only sau khi build.
+
+    Duration range = OR các bucket bitsets nằm trọn trong range; tối đa hai bucket ở biên được
+    lọc chính xác bằng binary search trên durations đã sort của bucket đó.
+    """
+
+    def __init__(self, store: CatalogStore):
+        started = time.perf_counter()
+        self.size = len(store)
+        self._id_to_row = store.id_to_row
+        self._all = np.packbits(np.ones(self.size, dtype=bool))
+
+        # category -> bitset (các giá trị chỉ khác hoa thường / khoảng trắng được gộp); một podcast có thể
+        # nằm trong nhiều bitsets (topic + emotion categories), cùng tên ở hai enums dùng chung một bitset
+        self.categories = {}  # type: Dict[str, np.ndarray]
+        table = store.strings.get('category')
+        if table is not None and self.size:
+            codes = table.codes
+            order = np.argsort(codes, kind='stable')
+            bounds = np.flatnonzero(np.diff(codes[order])) + 1
+            for group in np.split(order, bounds):
+                code = codes[group[0]]
+                if code < 0:
+                    continue
+                name = normalize_category(table.values[code])
+                bits = self._bits(group)
+                previous = self.categories.get(name)
+                self.categories[name] = bits if previous is None else previous | bits
+        for column, names in MULTI_VALUED_CATEGORY_COLUMNS:
+            values = store.objects.get(column)
+            if values is None or not self.size:
+                continue
+            # Nhiều podcasts dùng cùng một tổ hợp categories: resolve mỗi tổ hợp khác nhau một lần
+            keys, combinations = _category_keys(values)
+            members = {}  # type: Dict[str, list]
+            for combination, key in combinations.items():
+                for name in {_category_name(entry, names) for entry in combination} - {None}:
+                    members.setdefault(name, []).append(key)
+            for name, combination_keys in members.items():
+                bits = np.packbits(np.isin(keys, combination_keys))
+                previous = self.categories.get(name)
+                self.categories[name] = bits if previous is None else previous | bits
+
+        # Duration: rows có duration sort theo duration + offset của từng bucket trong thứ tự đó
+        durations = store.numeric.get('duration_minutes')
+        if durations is None:
+            durations = np.full(self.size, np.nan)
+        durations = np.asarray(durations, dtype=np.float64)
+        known = np.flatnonzero(~np.isnan(durations))
+        self._duration_rows = known[np.argsort(durations[known], kind='stable')]
+        self._sorted_durations = durations[self._duration_rows]
+        self._bucket_offsets = np.searchsorted(self._sorted_durations, DURATION_BUCKET_EDGES[1:-1], side='left')
+        self._bucket_offsets = np.concatenate([[0], self._bucket_offsets, [len(self._duration_rows)]])
+        self.duration_buckets = [
+            self._bits(self._duration_rows[start:stop])
+            for start, stop in zip(self._bucket_offsets[:-1], self._bucket_offsets[1:])
+        ]
+        self.build_seconds = time.perf_counter() - started
+
+    def _bits(self, rows: np.ndarray) -> np.ndarray:
+        mask = np.zeros(self.size, dtype=bool)
+        mask[rows] = True
+        return np.packbits(mask)
+
+    def duration_bits(self, low: Optional[float], high: Optional[float]) -> np.ndarray:
+        """Bitset của rows có low <= duration_minutes <= high (None = không giới hạn)"""
+        low = -math.inf if low is None else low
+        high = math.inf if high is None else high
+        bits = np.zeros_like(self._all)
+        edges = DURATION_BUCKET_EDGES
+        for bucket, bucket_bits in enumerate(self.duration_buckets):
+            start, stop = edges[bucket], edges[bucket + 1]
+            if stop <= low or start > high:
+                continue
+            if start >= low and stop <= high:
+                bits |= bucket_bits
+                continue
+            # Bucket ở biên: binary search trong slice đã sort của bucket
+            first, last = self._bucket_offsets[bucket], self._bucket_offsets[bucket + 1]
+            values = self._sorted_durations[first:last]
+            rows = self._duration_rows[first:last][
+                np.searchsorted(values, low, side='left'):np.searchsorted(values, high, side='right')
+            ]
+            if rows.size:
+                bits |= self._bits(rows)
+        return bits
+
+    def select(self, spec: CandidateFilter) -> np.ndarray:
+        """Candidate mask (bool, một phần tử mỗi candidate row) của filter"""
+        bits = self._all.copy()
+        if spec.categories:
+            matched = np.zeros_like(bits)
+            for name in spec.categories:
+                category_bits = self.categories.get(name)
+                if category_bits is not None:
+                    matched |= category_bits
+            bits &= matched
+        if spec.has_duration:
+            bits &= self.duration_bits(spec.min_duration, spec.max_duration)
+        if spec.exclude_ids:
+            rows = np.fromiter((self._id_to_row.get(pid, -1) for pid in spec.exclude_ids),
+                               dtype=np.int64, count=len(spec.exclude_ids))
+            rows = rows[rows >= 0]
+            # bitwise_and.at: nhiều rows có thể rơi vào cùng một byte
+            np.bitwise_and.at(bits, rows >> 3, ~(np.uint8(0x80) >> (rows & 7).astype(np.uint8)))
+        return np.unpackbits(bits, count=self.size).view(bool)
+
+    def nbytes(self) -> int:
+        return (sum(bits.nbytes for bits in self.categories.values())
+                + sum(bits.nbytes for bits in self.duration_buckets)
+                + self._duration_rows.nbytes + self._sorted_durations.nbytes)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "candidates": self.size,
+            "categories": len(self.categories),
+            "duration_buckets": len(self.duration_buckets),
+            "bytes": self.nbytes(),
+            "build_seconds": round(self.build_seconds, 4),
+        }
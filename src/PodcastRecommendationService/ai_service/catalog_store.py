@@ -0,0 +1,304 @@
+"""
+COLUMNAR CATALOG STORE
+Catalog dạng cột: NumPy arrays cho numeric fields, interned string tables cho IDs / titles /
+categories, và id -> row index build một lần mỗi refresh. Read-only sau khi build.
+"""
+
+import math
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Các cột luôn được intern (unique values + int32 codes); cột khác được intern nếu toàn string
+STRING_COLUMNS = ('podcast_id', 'title', 'category', 'topics', 'content_url')
+
+
+def _is_missing(value: Any) -> bool:
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+class StringTable:
+    """Interned string column: mỗi giá trị unique lưu một lần, rows giữ int32 codes (-1 = missing)"""
+
+    __slots__ = ('values', 'codes', '_lookup')
+
+    def __init__(self, values: List[str], codes: np.ndarray, lookup: Optional[Dict[str, int]] = None):
+        self.values = values
+        self.codes = codes
+        self._lookup = lookup  # value -> code, build lần đầu cần intern (`patch`)
+
+    def __reduce__(self):
+        # Lookup build lại được từ values, không pickle (shared catalog)
+        return StringTable, (self.values, self.codes)
+
+    @classmethod
+    def build(cls, column: Iterable[Any], size: int) -> "StringTable":
+        lookup = {}  # type: Dict[str, int]
+        values = []  # type: List[str]
+        codes = np.empty(size, dtype=np.int32)
+        for row, value in enumerate(column):
+            if _is_missing(value):
+                codes[row] = -1
+                continue
+            code = lookup.get(value)
+            if code is None:
+                code = lookup[value] = len(values)
+                values.append(value)
+            codes[row] = code
+        codes.setflags(write=False)
+        return cls(values, codes, lookup)
+
+    def __getitem__(self, row: int) -> Optional[str]:
+        code = self.codes[row]
+        return self.values[code] if code >= 0 else None
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def take(self, rows: np.ndarray) -> "StringTable":
+        """Subset rows; string table được share, chỉ codes được copy"""
+        codes = self.codes[rows]
+        codes.setflags(write=False)
+        return StringTable(self.values, codes, self._lookup)
+
+    def intern(self, values: Sequence[str]) -> np.ndarray:
+        """Codes của `values`, append giá trị chưa có vào string table. Append-only nên codes của
+        các tables đang share `values` (snapshot cũ, `take`) vẫn đúng."""
+        if self._lookup is None:
+            self._lookup = {value: code for code, value in enumerate(self.values)}
+        lookup, table = self._lookup, self.values
+        codes = np.empty(len(values), dtype=np.int32)
+        for i, value in enumerate(values):
+            code = lookup.get(value)
+            if code is None:
+                code = lookup[value] = len(table)
+                table.append(value)
+            codes[i] = code
+        return codes
+
+    def decode(self, start: int = 0, stop: Optional[int] = None) -> List[Optional[str]]:
+        values = self.values
+        return [values[code] if code >= 0 else None for code in self.codes[start:stop].tolist()]
+
+
+class CatalogStore:
+    """Immutable columnar catalog.
+
+    - `podcast_id`, `title`, `category`, `topics`, `content_url` và mọi cột toàn string: StringTable
+    - numeric fields (e.g. `duration_minutes`): int64 hoặc float64 (NaN = missing) arrays
+    - các field còn lại (lists, bools, mixed): object arrays, chỉ dùng cho listing
+    """
+
+    def __init__(self, columns: List[str], strings: Dict[str, StringTable],
+                 numeric: Dict[str, np.ndarray], objects: Dict[str, np.ndarray], size: int):
+        self.columns = columns
+        self.strings = strings
+        self.numeric = numeric
+        self.objects = objects
+        self._size = size
+        ids = strings.get('podcast_id')
+        self.podcast_ids = tuple(ids.decode()) if ids is not None else tuple(str(i) for i in range(size))
+        self.id_to_row = {podcast_id: row for row, podcast_id in enumerate(self.podcast_ids)}
+
+    def __reduce__(self):
+        # Pickle chỉ columns; podcast_ids / id_to_row được build lại khi load (shared catalog)
+        return CatalogStore, (self.columns, self.strings, self.numeric, self.objects, self._size)
+
+    @classmethod
+    def empty(cls) -> "CatalogStore":
+        return cls([], {}, {}, {}, 0)
+
+    @classmethod
+    def from_records(cls, records: Sequence[Dict[str, Any]]) -> "CatalogStore":
+        """Build từ normalized rows (xem `catalog.normalize_podcast`); column order = first-seen key order"""
+        size = len(records)
+        columns = list(dict.fromkeys(key for record in records for key in record))
+        strings, numeric, objects = {}, {}, {}
+        for column in columns:
+            values = [record.get(column) for record in records]
+            if column == 'podcast_id':
+                values = [None if _is_missing(v) else str(v) for v in values]
+            if column in STRING_COLUMNS or all(isinstance(v, str) or _is_missing(v) for v in values):
+                strings[column] = StringTable.build(values, size)
+                continue
+            array = _numeric_array(values)
+            if array is not None:
+                numeric[column] = array
+            else:
+                array = np.empty(size, dtype=object)
+                array[:] = [None if _is_missing(v) else v for v in values]
+                array.setflags(write=False)
+                objects[column] = array
+        return cls(columns, strings, numeric, objects, size)
+
+    @classmethod
+    def from_dataframe(cls, df: Optional[pd.DataFrame]) -> "CatalogStore":
+        if df is None or df.empty:
+            return cls.empty()
+        return cls.from_records(df.to_dict('records'))
+
+    def patch(self, rows: np.ndarray, records: Sequence[Dict[str, Any]]) -> Optional["CatalogStore"]:
+        """Store mới: row i = row `rows[i]` của store này, hoặc record kế tiếp trong `records` nếu
+        rows[i] < 0 (podcasts added / updated). Chỉ `records` được parse, rows cũ được copy theo cột.
+
+        None nếu records không khớp schema hiện tại (cột mới, đổi kiểu) hoặc string tables đã chứa
+        quá nhiều giá trị không còn dùng -> caller build lại toàn bộ bằng `from_records`.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        fresh = np.flatnonzero(rows < 0)
+        if len(fresh) != len(records):
+            raise ValueError(f"{len(fresh)} new rows but {len(records)} records")
+        update = CatalogStore.from_records(records)
+        if any(column not in self.columns for column in update.columns):
+            return None
+        source = np.where(rows >= 0, rows, 0)
+        size = len(rows)
+
+        def missing(column: str) -> bool:
+            """Cột không có giá trị nào trong records (from_records coi là string table rỗng)"""
+            table = update.strings.get(column)
+            return not update.has_column(column) or (table is not None and not (table.codes >= 0).any())
+
+        strings = {}  # type: Dict[str, StringTable]
+        for name, table in self.strings.items():
+            codes = table.codes[source]
+            if missing(name):
+                codes[fresh] = -1
+            elif name in update.strings:
+                present = update.strings[name].codes >= 0
+                if len(table.values) + int(present.sum()) > 2 * size + 1024:
+                    return None  # compact lại bằng full rebuild
+                interned = table.intern(update.strings[name].values)
+                new_codes = update.strings[name].codes
+                codes[fresh] = np.where(present, interned[np.maximum(new_codes, 0)], -1)
+            else:
+                return None
+            strings[name] = StringTable(table.values, _frozen(codes), table._lookup)
+
+        numeric = {}  # type: Dict[str, np.ndarray]
+        for name, array in self.numeric.items():
+            data = array[source]
+            if missing(name):
+                if data.dtype.kind != 'f':
+                    return None  # int64 column không biểu diễn được missing
+                data[fresh] = np.nan
+            elif name in update.numeric and (data.dtype.kind == 'f' or update.numeric[name].dtype.kind != 'f'):
+                data[fresh] = update.numeric[name]
+            else:
+                return None
+            numeric[name] = _frozen(data)
+
+        objects = {}  # type: Dict[str, np.ndarray]
+        for name, array in self.objects.items():
+            data = array[source]
+            # Gán từng phần tử: slice assignment sẽ broadcast các giá trị là list
+            for i, row in enumerate(fresh.tolist()):
+                data[row] = update.value(name, i)
+            objects[name] = _frozen(data)
+        return CatalogStore(self.columns, strings, numeric, objects, size)
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def is_empty(self) -> bool:
+        return self._size == 0
+
+    def take(self, rows: np.ndarray) -> "CatalogStore":
+        """Store con theo rows (vd. GUID candidates); string tables được share"""
+        rows = np.asarray(rows, dtype=np.int64)
+        strings = {name: table.take(rows) for name, table in self.strings.items()}
+        numeric = {name: _frozen(array[rows]) for name, array in self.numeric.items()}
+        objects = {name: _frozen(array[rows]) for name, array in self.objects.items()}
+        return CatalogStore(self.columns, strings, numeric, objects, len(rows))
+
+    def value(self, column: str, row: int, default: Any = None) -> Any:
+        """Giá trị của một ô bất kỳ (missing -> None); `default` nếu catalog không có cột này"""
+        if column in self.strings:
+            return self.strings[column][row]
+        if column in self.numeric:
+            value = self.numeric[column][row].item()
+            return None if value != value else value
+        if column in self.objects:
+            return self.objects[column][row]
+        return default
+
+    def column_values(self, column: str) -> np.ndarray:
+        """Một cột dạng object array (missing -> None; cột không có -> toàn None)"""
+        if column in self.strings:
+            table = self.strings[column]
+            # code -1 (missing) trỏ vào None ở cuối
+            return np.asarray(table.values + [None], dtype=object)[table.codes]
+        if column in self.numeric:
+            array = self.numeric[column]
+            values = array.astype(object)
+            if array.dtype.kind == 'f':
+                values[np.isnan(array)] = None
+            return values
+        if column in self.objects:
+            return self.objects[column]
+        return np.full(self._size, None, dtype=object)
+
+    def diff(self, previous: "CatalogStore", columns: Sequence[str]) -> Tuple[np.ndarray, List[str]]:
+        """(rows của store này là podcast mới hoặc khác `previous` ở một trong `columns`,
+        podcast IDs chỉ có trong `previous`)"""
+        lookup = previous.id_to_row.get
+        old_rows = np.fromiter((lookup(podcast_id, -1) for podcast_id in self.podcast_ids),
+                               dtype=np.int64, count=self._size)
+        changed = old_rows < 0
+        known = np.flatnonzero(~changed)
+        for column in columns:
+            changed[known] |= self.column_values(column)[known] != previous.column_values(column)[old_rows[known]]
+        removed = [podcast_id for podcast_id in previous.podcast_ids if podcast_id not in self.id_to_row]
+        return np.flatnonzero(changed), removed
+
+    def has_column(self, column: str) -> bool:
+        return column in self.strings or column in self.numeric or column in self.objects
+
+    def duration_minutes(self, row: int) -> Optional[int]:
+        durations = self.numeric.get('duration_minutes')
+        if durations is None:
+            return None
+        value = durations[row]
+        return None if value != value else int(value)  # NaN check
+
+    def iter_records(self, chunk_rows: int = 1024) -> Iterator[Dict[str, Any]]:
+        """Rows dạng dict (cho listing / JSON), decode từng chunk cột; missing -> None"""
+        for start in range(0, self._size, chunk_rows):
+            stop = min(start + chunk_rows, self._size)
+            decoded = []
+            for column in self.columns:
+                if column in self.strings:
+                    decoded.append(self.strings[column].decode(start, stop))
+                elif column in self.numeric:
+                    values = self.numeric[column][start:stop].tolist()
+                    decoded.append([None if v != v else v for v in values])
+                else:
+                    decoded.append(self.objects[column][start:stop])
+            for values in zip(*decoded):
+                yield dict(zip(self.columns, values))
+
+    def nbytes(self) -> int:
+        """Ước lượng memory của các arrays + string tables"""
+        total = sum(array.nbytes for array in self.numeric.values())
+        total += sum(array.nbytes for array in self.objects.values())
+        for table in self.strings.values():
+            total += table.codes.nbytes + sum(len(v) for v in table.values)
+        return total
+
+
+def _numeric_array(values: List[Any]) -> Optional[np.ndarray]:
+    """int64 nếu toàn int, float64 (NaN = missing) nếu int/float; None nếu có giá trị khác"""
+    present = [v for v in values if not _is_missing(v)]
+    if not present or any(isinstance(v, bool) or not isinstance(v, (int, float, np.integer, np.floating))
+                          for v in present):
+        return None
+    if len(present) == len(values) and all(isinstance(v, (int, np.integer)) for v in present):
+        return _frozen(np.array(values, dtype=np.int64))
+    return _frozen(np.array([np.nan if _is_missing(v) else v for v in values], dtype=np.float64))
+
+
+def _frozen(array: np.ndarray) -> np.ndarray:
+    array.setflags(write=False)
+    return array
@@ -0,0 +1,268 @@
+"""
+CATALOG SYNC
+Đồng bộ toàn bộ catalog từ ContentService Internal API (/api/internal/podcasts):
+walk tất cả pages với concurrency có giới hạn qua một pooled client, và chỉ xử lý
+phần thay đổi sau lần sync đầu tiên
+"""
+
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+from catalog import normalize_podcast
+from catalog_store import CatalogStore
+
+logger = logging.getLogger(__name__)
+
+INTERNAL_PODCASTS_PATH = "/api/internal/podcasts"
+
+# ContentService clamps internal page sizes to 1000
+MAX_PAGE_SIZE = 1000
+
+# Hard cap on pages per sync: a server that ignores `page` / misreports totalCount cannot keep the walk going
+MAX_PAGES = 1000
+
+# Deleting more than this fraction of the catalog rebuilds the store instead of patching it
+REBUILD_DELETED_FRACTION = 0.25
+
+
+class CatalogSyncError(Exception):
+    """A page could not be fetched; the previous catalog stays in place"""
+
+
+@dataclass
+class PageState:
+    """What we know about one page from the last successful sync"""
+    etag: Optional[str]
+    fingerprint: str
+    podcast_ids: Tuple[str, ...]
+    total_count: Optional[int]
+    paged: bool = True  # False: bare list payload = toàn bộ catalog trong một response
+
+
+@dataclass
+class SyncStats:
+    pages: int = 0
+    pages_not_modified: int = 0   # 304 via If-None-Match
+    pages_unchanged: int = 0      # 200 with an identical body
+    added: int = 0
+    updated: int = 0
+    deleted: int = 0
+    duration_seconds: float = 0.0
+    rebuilt: bool = False         # catalog store was rebuilt from every record
+    patched: bool = False         # only added / updated rows were parsed into a new store
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(self.__dict__)
+
+
+@dataclass
+class _PageResult:
+    page: int
+    state: PageState
+    items: Optional[List[Dict[str, Any]]] = None  # None = page unchanged since last sync
+    not_modified: bool = False
+
+
+class CatalogSync:
+    """Paginated + incremental sync engine cho real podcast catalog.
+
+    Incremental strategy (ContentService PodcastDto không có updatedAt, nên không có
+    updated-since cursor):
+    - Mỗi page gửi If-None-Match với ETag lần trước; 304 -> dùng lại page cũ.
+    - Không có ETag thì so sánh fingerprint của body; body giống hệt -> bỏ qua parse.
+    - Các page thay đổi được diff theo từng record (added / updated), và podcast IDs
+      không còn xuất hiện ở page nào được coi là deleted.
+    - Không có gì thay đổi thì trả về đúng CatalogStore cũ (không rebuild).
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        page_size: int = MAX_PAGE_SIZE,
+        max_concurrency: int = 4,
+        timeout: float = 30.0,
+        client: Optional[Any] = None,
+    ):
+        # client: anything with httpx-style `get(url, params=, headers=)`, e.g. a shared
+        # `upstream.Endpoint`; None -> own pooled httpx.AsyncClient
+        self.base_url = base_url.rstrip('/')
+        self.page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout
+        self._client = client
+        self._owns_client = client is None
+        self._pages = {}     # type: Dict[int, PageState]
+        self._records = {}   # type: Dict[str, Dict[str, Any]]
+        self._order = ()     # type: Tuple[str, ...]
+        self._store = None   # type: Optional[CatalogStore]
+        self._lock = asyncio.Lock()
+        self.last_stats = None  # type: Optional[SyncStats]
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency
+                )
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None and self._owns_client:
+            await self._client.aclose()
+            self._client = None
+
+    async def sync(self) -> CatalogStore:
+        """Sync the catalog; returns the (possibly unchanged) full catalog store.
+
+        Raises CatalogSyncError if any page fails - partial results are never merged.
+        """
+        async with self._lock:
+            started = time.perf_counter()
+            stats = SyncStats()
+
+            first = await self._fetch_page(1)
+            total_count = first.state.total_count
+            if not first.state.paged:
+                results = [first]
+            elif total_count is not None:
+                num_pages = max(1, math.ceil(total_count / self.page_size))
+                if num_pages > MAX_PAGES:
+                    raise CatalogSyncError(f"totalCount {total_count} needs {num_pages} pages (max {MAX_PAGES})")
+                results = [first] + await self._fetch_pages(range(2, num_pages + 1))
+            else:
+                results = await self._walk_pages(first)
+
+            store = self._merge(results, stats)
+            stats.pages = len(results)
+            stats.duration_seconds = time.perf_counter() - started
+            self.last_stats = stats
+            logger.info(f"🔄 Catalog sync: {len(self._order)} podcasts, {stats.pages} pages "
+                        f"({stats.pages_not_modified} not modified, {stats.pages_unchanged} unchanged), "
+                        f"+{stats.added} ~{stats.updated} -{stats.deleted} in {stats.duration_seconds:.2f}s")
+            return store
+
+    async def _walk_pages(self, first: _PageResult) -> List[_PageResult]:
+        """No totalCount in the response: walk until a short page, or a page with no new podcast IDs
+        (server ignoring `page` returns the same items again)"""
+        results = [first]
+        seen = set(first.state.podcast_ids)
+        while len(results[-1].state.podcast_ids) >= self.page_size:
+            if len(results) >= MAX_PAGES:
+                raise CatalogSyncError(f"catalog walk exceeded {MAX_PAGES} pages")
+            result = await self._fetch_page(len(results) + 1)
+            if result.state.fingerprint == results[-1].state.fingerprint or seen.issuperset(result.state.podcast_ids):
+                break
+            seen.update(result.state.podcast_ids)
+            results.append(result)
+        return results
+
+    async def _fetch_pages(self, pages) -> List[_PageResult]:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def fetch(page: int) -> _PageResult:
+            async with semaphore:
+                return await self._fetch_page(page)
+
+        return list(await asyncio.gather(*(fetch(page) for page in pages)))
+
+    async def _fetch_page(self, page: int) -> _PageResult:
+        previous = self._pages.get(page)
+        headers = {'If-None-Match': previous.etag} if previous is not None and previous.etag else {}
+        url = f"{self.base_url}{INTERNAL_PODCASTS_PATH}"
+        try:
+            response = await self.client.get(url, params={'page': page, 'pageSize': self.page_size}, headers=headers)
+        except httpx.HTTPError as e:
+            raise CatalogSyncError(f"page {page}: {e}") from e
+
+        if response.status_code == 304 and previous is not None:
+            return _PageResult(page=page, state=previous, not_modified=True)
+        if response.status_code != 200:
+            raise CatalogSyncError(f"page {page}: Internal API returned {response.status_code}")
+
+        etag = response.headers.get('ETag')
+        fingerprint = hashlib.blake2b(response.content, digest_size=16).hexdigest()
+        if previous is not None and previous.fingerprint == fingerprint:
+            return _PageResult(page=page, state=PageState(etag, fingerprint, previous.podcast_ids,
+                                                          previous.total_count, previous.paged))
+
+        data = response.json()
+        paged = not isinstance(data, list)
+        if not paged:
+            items, total_count = data, None
+        else:
+            items = data.get('podcasts', data.get('items', data.get('data', [])))
+            total_count = data.get('totalCount')
+        if not isinstance(items, list):
+            raise CatalogSyncError(f"page {page}: unexpected payload")
+
+        offset = (page - 1) * self.page_size
+        items = [normalize_podcast(item, offset + i) for i, item in enumerate(items)]
+        state = PageState(etag, fingerprint, tuple(item['podcast_id'] for item in items), total_count, paged)
+        return _PageResult(page=page, state=state, items=items)
+
+    def _merge(self, results: List[_PageResult], stats: SyncStats) -> CatalogStore:
+        records = self._records
+        changed = {}  # type: Dict[str, Dict[str, Any]]
+        order = []    # type: List[str]
+        seen = set()
+
+        for result in results:
+            if result.not_modified:
+                stats.pages_not_modified += 1
+            elif result.items is None:
+                stats.pages_unchanged += 1
+            for item in result.items or ():
+                podcast_id = item['podcast_id']
+                existing = records.get(podcast_id)
+                if existing is None:
+                    stats.added += 1
+                    changed[podcast_id] = item
+                elif existing != item:
+                    stats.updated += 1
+                    changed[podcast_id] = item
+            for podcast_id in result.state.podcast_ids:
+                # Offset paging can repeat an item across pages while the catalog moves
+                if podcast_id not in seen:
+                    seen.add(podcast_id)
+                    order.append(podcast_id)
+
+        deleted = [podcast_id for podcast_id in records if podcast_id not in seen]
+        stats.deleted = len(deleted)
+
+        # Commit page state only after every page succeeded
+        self._pages = {result.page: result.state for result in results}
+
+        new_order = tuple(order)
+        if self._store is not None and not changed and not deleted and new_order == self._order:
+            return self._store
+
+        for podcast_id in deleted:
+            del records[podcast_id]
+        records.update(changed)
+        self._order = new_order
+
+        store = None
+        if self._store is not None and len(deleted) <= REBUILD_DELETED_FRACTION * len(self._store):
+            # Unchanged rows are copied column-wise from the previous store; only changed records are parsed
+            old_rows = self._store.id_to_row
+            rows = np.fromiter((-1 if podcast_id in changed else old_rows[podcast_id] for podcast_id in new_order),
+                               dtype=np.int64, count=len(new_order))
+            store = self._store.patch(rows, [changed[podcast_id] for podcast_id in new_order if podcast_id in changed])
+            stats.patched = store is not None
+        if store is None:
+            store = CatalogStore.from_records([records[podcast_id] for podcast_id in new_order])
+            stats.rebuilt = True
+        self._store = store
+        return store
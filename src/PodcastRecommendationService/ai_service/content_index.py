@@ -0,0 +1,224 @@
+"""
+CONTENT INDEX (COLD START)
+Hashed word n-gram TF-IDF over title / topics (description) / category của podcasts: documents được
+append incrementally khi catalog có podcasts mới, user profile được score với toàn bộ documents
+bằng một sparse matrix-vector product (NumPy, CSR)
+"""
+
+import logging
+import re
+import threading
+import zlib
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 2^18 hashed features: collisions không đáng kể với catalog vài chục nghìn podcasts
+NUM_FEATURES = 1 << 18
+
+# Cosine similarity [0, 1] được map vào khoảng rating của fallback cũ (uniform 2.5 - 4.5)
+RATING_MIN = 2.5
+RATING_MAX = 4.5
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def document_text(*fields: Optional[str]) -> str:
+    return ' '.join(str(field) for field in fields if field is not None and field == field)
+
+
+def hashed_terms(text: str, category: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """(feature ids, log-scaled term frequencies) của unigrams + bigrams (+ category feature).
+
+    crc32 thay vì hash(): cùng feature ids ở mọi process / worker / restart.
+    """
+    tokens = _TOKEN_RE.findall(text.lower())
+    terms = tokens + [f'{a} {b}' for a, b in zip(tokens, tokens[1:])]
+    if category:
+        terms.append(f'category:{str(category).strip().lower()}')
+    if not terms:
+        return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+    features = np.fromiter((zlib.crc32(term.encode('utf-8')) for term in terms), dtype=np.int64, count=len(terms))
+    features, counts = np.unique(features & (NUM_FEATURES - 1), return_counts=True)
+    return features.astype(np.int32), (1.0 + np.log(counts)).astype(np.float32)
+
+
+class _IndexState:
+    """Immutable CSR snapshot; `add` build state mới và swap reference"""
+
+    __slots__ = ('podcast_ids', 'rows', 'indptr', 'indices', 'tf', 'doc_of_entry', 'doc_freq',
+                 'idf', 'weights', 'norms', 'centroid')
+
+    def __init__(self, podcast_ids: List[str], rows: Dict[str, int], indptr: np.ndarray,
+                 indices: np.ndarray, tf: np.ndarray, doc_freq: np.ndarray):
+        self.podcast_ids = podcast_ids
+        self.rows = rows
+        self.indptr = indptr
+        self.indices = indices
+        self.tf = tf
+        self.doc_freq = doc_freq
+        self.doc_of_entry = np.repeat(np.arange(len(podcast_ids), dtype=np.int32), np.diff(indptr))
+        # Smooth IDF như sklearn; document weights = tf * idf, L2-normalized
+        num_docs = len(podcast_ids)
+        self.idf = (np.log((1.0 + num_docs) / (1.0 + doc_freq)) + 1.0).astype(np.float32)
+        weights = tf * self.idf[indices]
+        norms = np.sqrt(np.bincount(self.doc_of_entry, weights=weights * weights, minlength=num_docs))
+        self.weights = (weights / np.maximum(norms[self.doc_of_entry], 1e-12)).astype(np.float32)
+        self.norms = norms
+        self.centroid = None  # type: Optional[np.ndarray]
+
+
+class ContentIndex:
+    """TF-IDF documents theo podcast ID; thread-safe (scoring đọc snapshot, add swap snapshot mới)"""
+
+    def __init__(self):
+        empty = np.empty(0, dtype=np.int32)
+        self._state = _IndexState([], {}, np.zeros(1, dtype=np.int64), empty, np.empty(0, dtype=np.float32),
+                                  np.zeros(NUM_FEATURES, dtype=np.int32))
+        self._lock = threading.Lock()
+        self._candidates = None  # type: Optional[Tuple[Sequence[str], _IndexState, np.ndarray]]
+
+    def __len__(self) -> int:
+        return len(self._state.podcast_ids)
+
+    def __contains__(self, podcast_id: str) -> bool:
+        return podcast_id in self._state.rows
+
+    @property
+    def nnz(self) -> int:
+        return len(self._state.indices)
+
+    def add(self, documents: Iterable[Tuple[str, str, Optional[str]]]) -> int:
+        """Append (podcast_id, text, category) chưa có trong index; documents cũ không bị tokenize lại.
+
+        IDF đổi theo document frequency mới nên weights được tính lại (O(nnz) NumPy).
+        """
+        with self._lock:
+            state = self._state
+            parsed = {}  # type: Dict[str, Tuple[np.ndarray, np.ndarray]]
+            for podcast_id, text, category in documents:
+                if podcast_id not in state.rows and podcast_id not in parsed:
+                    parsed[podcast_id] = hashed_terms(text, category)
+            return self._apply(state, parsed, ())
+
+    def update(self, documents: Iterable[Tuple[str, str, Optional[str]]], removed: Iterable[str] = ()) -> int:
+        """Như `add`, nhưng podcast đã có trong index được tokenize lại (catalog sync báo updated) và
+        podcasts trong `removed` bị xoá; doc_freq của documents bị thay / xoá được trừ đi"""
+        with self._lock:
+            state = self._state
+            parsed = {podcast_id: hashed_terms(text, category) for podcast_id, text, category in documents}
+            dropped = {podcast_id for podcast_id in removed if podcast_id in state.rows and podcast_id not in parsed}
+            dropped.update(podcast_id for podcast_id in parsed if podcast_id in state.rows)
+            return self._apply(state, parsed, dropped)
+
+    def _apply(self, state: _IndexState, parsed: Dict[str, Tuple[np.ndarray, np.ndarray]],
+               dropped: Iterable[str]) -> int:
+        """Swap in state = `state` bỏ documents `dropped` + append `parsed` (caller giữ lock)"""
+        dropped = [state.rows[podcast_id] for podcast_id in dropped]
+        if not parsed and not dropped:
+            return 0
+        podcast_ids, indptr, indices, tf, doc_freq = state.podcast_ids, state.indptr, state.indices, state.tf, state.doc_freq
+        if dropped:
+            keep_docs = np.ones(len(podcast_ids), dtype=bool)
+            keep_docs[dropped] = False
+            keep_entries = keep_docs[state.doc_of_entry]
+            doc_freq = doc_freq - np.bincount(indices[~keep_entries], minlength=NUM_FEATURES).astype(np.int32)
+            podcast_ids = [podcast_id for podcast_id, keep in zip(podcast_ids, keep_docs.tolist()) if keep]
+            indptr = np.concatenate([[0], np.cumsum(np.diff(indptr)[keep_docs])])
+            indices, tf = indices[keep_entries], tf[keep_entries]
+        podcast_ids = list(podcast_ids) + list(parsed)
+        rows = {podcast_id: row for row, podcast_id in enumerate(podcast_ids)} if dropped else dict(state.rows)
+        if not dropped:
+            rows.update((podcast_id, row) for row, podcast_id in enumerate(parsed, len(state.podcast_ids)))
+        if parsed:
+            added = np.concatenate([features for features, _ in parsed.values()])
+            doc_freq = doc_freq + np.bincount(added, minlength=NUM_FEATURES).astype(np.int32)
+            lengths = [len(features) for features, _ in parsed.values()]
+            indptr = np.concatenate([indptr, indptr[-1] + np.cumsum(lengths)])
+            indices = np.concatenate([indices, added])
+            tf = np.concatenate([tf] + [weights for _, weights in parsed.values()])
+        self._state = _IndexState(podcast_ids, rows, indptr, indices, tf, doc_freq)
+        return len(parsed)
+
+    def profile(self, podcast_ids: Sequence[str]) -> Optional[np.ndarray]:
+        """Dense (NUM_FEATURES) user profile = tổng document vectors của `podcast_ids`; None nếu không có"""
+        state = self._state
+        docs = [state.rows[pid] for pid in podcast_ids if pid in state.rows]
+        if not docs:
+            return None
+        offsets, _ = self._entries(state, np.asarray(docs, dtype=np.int64))
+        profile = np.zeros(NUM_FEATURES, dtype=np.float32)
+        np.add.at(profile, state.indices[offsets], state.weights[offsets])
+        return profile
+
+    def sketch(self, podcast_ids: Sequence[str], dim: int = 256) -> np.ndarray:
+        """Dense (len(podcast_ids) x dim) signed feature-hashing projection của document vectors
+        (cosine giữa hai rows xấp xỉ cosine TF-IDF); zero row = podcast chưa được index"""
+        state = self._state
+        lookup = state.rows.get
+        doc_rows = np.fromiter((lookup(pid, -1) for pid in podcast_ids), dtype=np.int64, count=len(podcast_ids))
+        known = np.flatnonzero(doc_rows >= 0)
+        vectors = np.zeros((len(podcast_ids), dim), dtype=np.float32)
+        offsets, lengths = self._entries(state, doc_rows[known])
+        features = state.indices[offsets].astype(np.int64)
+        # Feature ids là crc32 nên bucket (bits thấp) và sign (bit kế tiếp) gần như độc lập
+        signs = 1.0 - 2.0 * ((features // dim) & 1)
+        np.add.at(vectors, (np.repeat(known, lengths), features % dim), signs * state.weights[offsets])
+        return vectors
+
+    def score(self, profile: Optional[np.ndarray], podcast_ids: Sequence[str]) -> np.ndarray:
+        """Ratings (float64) cho `podcast_ids`: cosine(profile, document) map vào [RATING_MIN, RATING_MAX].
+
+        Không có profile (user chưa nghe gì) -> centroid của toàn bộ documents, tức podcasts
+        "tiêu biểu" nhất của catalog. Podcasts chưa có trong index nhận RATING_MIN.
+        """
+        state = self._state
+        if not len(state.podcast_ids):
+            return np.full(len(podcast_ids), RATING_MIN)
+        if profile is None:
+            profile = self._centroid(state)
+        norm = float(np.linalg.norm(profile))
+        # Sparse (documents x features) @ profile: một gather + một bincount trên nnz entries
+        similarities = np.bincount(state.doc_of_entry, weights=state.weights * profile[state.indices],
+                                   minlength=len(state.podcast_ids)) / max(norm, 1e-12)
+        doc_rows = self._doc_rows(state, podcast_ids)
+        scores = np.full(len(podcast_ids), RATING_MIN)
+        known = doc_rows >= 0
+        scores[known] = RATING_MIN + (RATING_MAX - RATING_MIN) * np.clip(similarities[doc_rows[known]], 0.0, 1.0)
+        return scores
+
+    @staticmethod
+    def _entries(state: _IndexState, docs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(CSR entry offsets của documents `docs` nối liền nhau, số entries mỗi document)"""
+        starts, stops = state.indptr[docs], state.indptr[docs + 1]
+        lengths = stops - starts
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths) + np.repeat(starts, lengths)
+        return offsets, lengths
+
+    @staticmethod
+    def _centroid(state: _IndexState) -> np.ndarray:
+        if state.centroid is None:
+            centroid = np.zeros(NUM_FEATURES, dtype=np.float32)
+            np.add.at(centroid, state.indices, state.weights)
+            state.centroid = centroid
+        return state.centroid
+
+    def _doc_rows(self, state: _IndexState, podcast_ids: Sequence[str]) -> np.ndarray:
+        """candidate -> document row (-1 = chưa index), cache theo (catalog tuple, index state)"""
+        cached = self._candidates
+        if cached is not None and cached[0] is podcast_ids and cached[1] is state:
+            return cached[2]
+        lookup = state.rows.get
+        doc_rows = np.fromiter((lookup(pid, -1) for pid in podcast_ids), dtype=np.int64, count=len(podcast_ids))
+        self._candidates = (podcast_ids, state, doc_rows)
+        return doc_rows
+
+    def stats(self) -> dict:
+        state = self._state
+        return {
+            "documents": len(state.podcast_ids),
+            "features": int(np.count_nonzero(state.doc_freq)),
+            "nnz": len(state.indices),
+        }
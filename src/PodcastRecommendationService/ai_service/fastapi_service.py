@@ -2,23 +2,52 @@
 PODCAST RECOMMENDATION FASTAPI SERVICE
 """
 
-from fastapi import FastAPI, HTTPException, Depends, Query
-from pydantic import BaseModel, ConfigDict, Field
-from typing import List, Optional, Dict, Any
+from fastapi import FastAPI, HTTPException, Depends, Header, Query
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from typing import List, Literal, Optional, Dict, Any, AsyncIterator, Iterator, Sequence, Tuple
 import pandas as pd
 import numpy as np
-import pickle
 import json
-import httpx
+import math
 import asyncio
+import hmac
+import itertools
 import logging
 import os
+import shutil
+import tempfile
+import time
 from datetime import datetime
 from pathlib import Path
+from contextlib import asynccontextmanager
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 
-# Configure logging
+from ann_index import AnnIndex, build_ann_index
+from catalog import CatalogRefresher, CatalogSnapshot, parse_duration_to_minutes
+from catalog_file import CatalogFile, load_catalog, save_catalog
+from catalog_filters import CandidateFilter
+from catalog_store import CatalogStore
+from catalog_sync import CatalogSync
+from content_index import ContentIndex, document_text
+from interactions import (InteractionConsumer, InteractionEvent, InteractionLog, decode_events, encode_events,
+                          load_snapshot, save_snapshot)
+from metrics import (CONTENT_TYPE as METRICS_CONTENT_TYPE, MERGE_ALL, Registry, decode_families,
+                     encode_families, merge_families, render, value_family)
+from micro_batcher import MicroBatcher
+from model_registry import ModelBundle, ModelRegistry
+from neighbor_table import NeighborTable, build_neighbor_table
+from response_encoding import PodcastFragments, encode_json
+from result_cache import ResultCache
+from scoring import ScoringEngine, top_k_indices, top_k_rows
+from scoring_pool import OverloadedError, ScoringPool
+from shared_state import SharedState
+from topk_table import TopKTable, build_topk_table
+from upstream import CircuitOpenError, EndpointPolicy, UpstreamClient
+
+# Configure logging (LOG_LEVEL=DEBUG bật sampled per-request logs)
 logging.basicConfig(
-    level=logging.INFO,
+    level=os.getenv('LOG_LEVEL', 'INFO').upper(),
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
@@ -34,6 +63,17 @@ class UserRecommendationRequest(BaseModel):
     
     user_id: str
     num_recommendations: int = 5
+    include_listened: bool = False
+    # Candidate filters (xem catalog_filters.CandidateFilter); durations tính bằng minutes, inclusive
+    categories: Optional[List[str]] = None
+    min_duration_minutes: Optional[float] = Field(default=None, ge=0)
+    max_duration_minutes: Optional[float] = Field(default=None, ge=0)
+    exclude_ids: Optional[List[str]] = Field(default=None, max_length=int(os.getenv('EXCLUDE_MAX_IDS', '1000')))
+    
+    def candidate_filter(self) -> Optional[CandidateFilter]:
+        """None nếu request không có filter; ValueError nếu duration range không hợp lệ"""
+        return CandidateFilter.build(self.categories, self.min_duration_minutes,
+                                     self.max_duration_minutes, self.exclude_ids)
 
 class PodcastRecommendation(BaseModel):
     model_config = ConfigDict(alias_generator=to_camel, populate_by_name=True)
@@ -54,17 +94,127 @@ class RecommendationResponse(BaseModel):
     total_count: int
     timestamp: str
 
+class BatchRecommendationRequest(BaseModel):
+    model_config = ConfigDict(alias_generator=to_camel, populate_by_name=True)
+    
+    user_ids: List[str] = Field(..., min_length=1, max_length=int(os.getenv('BATCH_MAX_USERS', '5000')))
+    limit: int = Field(default=10, ge=1, le=50)
+    include_listened: bool = True
+
+class ModelReloadRequest(BaseModel):
+    model_config = ConfigDict(alias_generator=to_camel, populate_by_name=True)
+    
+    model_dir: Optional[str] = None
+    # None / 100 -> thay model active; 0 < x < 100 -> canary cho x% users
+    traffic_percent: Optional[float] = Field(default=None, gt=0, le=100)
+
+class SimilarPodcast(BaseModel):
+    model_config = ConfigDict(alias_generator=to_camel, populate_by_name=True)
+    
+    podcast_id: str
+    title: str
+    similarity: float
+    category: Optional[str] = None
+    topics: Optional[str] = None
+    duration_minutes: Optional[int] = None
+    content_url: Optional[str] = None
+
+class SimilarPodcastsResponse(BaseModel):
+    model_config = ConfigDict(alias_generator=to_camel, populate_by_name=True)
+    
+    podcast_id: str
+    similar_podcasts: List[SimilarPodcast]
+    total_count: int
+    timestamp: str
+
+class ListenedPodcastItem(BaseModel):
+    model_config = ConfigDict(alias_generator=to_camel, populate_by_name=True)
+    
+    podcast_id: str
+    title: str
+    topic: str
+
+class UserListenedResponse(BaseModel):
+    model_config = ConfigDict(alias_generator=to_camel, populate_by_name=True)
+    
+    user_id: str
+    listened_podcasts: List[ListenedPodcastItem]
+    total_listened: int
+
+class InteractionEventRequest(BaseModel):
+    """Cùng fields với RecommendationInteraction entity / RecommendationInteractionRequest (.NET)"""
+    model_config = ConfigDict(alias_generator=to_camel, populate_by_name=True)
+    
+    user_id: str = Field(..., min_length=1)
+    podcast_id: str = Field(..., min_length=1)
+    interaction_type: Literal['view', 'click', 'like', 'skip', 'complete']
+    interaction_at: Optional[datetime] = None
+    session_id: Optional[str] = None
+    actual_rating: Optional[float] = Field(default=None, ge=0, le=5)
+    feedback: Optional[str] = None
+    
+    @field_validator('interaction_type', mode='before')
+    @classmethod
+    def lowercase_type(cls, value: Any) -> Any:
+        return value.strip().lower() if isinstance(value, str) else value
+    
+    def to_event(self) -> InteractionEvent:
+        return InteractionEvent(
+            user_id=self.user_id,
+            podcast_id=self.podcast_id,
+            interaction_type=self.interaction_type,
+            interaction_at=self.interaction_at.timestamp() if self.interaction_at is not None else time.time(),
+            actual_rating=self.actual_rating
+        )
+
+class InteractionBatchRequest(BaseModel):
+    model_config = ConfigDict(alias_generator=to_camel, populate_by_name=True)
+    
+    events: List[InteractionEventRequest] = Field(..., min_length=1, max_length=1000)
+
 class HealthResponse(BaseModel):
     status: str
     service: str
     model_loaded: bool
     timestamp: str
+    model_version: Optional[str] = None
+    model_loaded_at: Optional[str] = None
+    # Catalog đang serve: age tính từ lần sync đã tạo ra nó; source = snapshot_file khi vẫn là bản load từ disk
+    catalog_version: Optional[int] = None
+    catalog_age_seconds: Optional[float] = None
+    catalog_stale: Optional[bool] = None
+    catalog_source: Optional[str] = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start/stop background catalog refresh cùng app lifecycle"""
+    recommendation_service.catalog.start()
+    recommendation_service.model_registry.start()
+    recommendation_service.schedule_bundle_warmup()
+    recommendation_service.start_interactions()
+    recommendation_service.start_metrics()
+    yield
+    if recommendation_service._metrics_task is not None:
+        recommendation_service._metrics_task.cancel()
+    await recommendation_service.stop_interactions()
+    await recommendation_service.model_registry.stop()
+    await recommendation_service.catalog.stop()
+    if recommendation_service._topk_task is not None:
+        recommendation_service._topk_task.cancel()
+    if recommendation_service._similar_task is not None:
+        recommendation_service._similar_task.cancel()
+    await recommendation_service.catalog_sync.aclose()
+    await recommendation_service.upstream.aclose()
+    recommendation_service.scoring_pool.shutdown()
+    if recommendation_service.shared is not None:
+        recommendation_service.shared.release()
 
 # FastAPI App
 app = FastAPI(
     title="Healink Podcast Recommendation API",
     description="AI-powered podcast recommendations using Kaggle trained model",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 # Configure response model to use aliases (camelCase)
@@ -74,7 +224,12 @@ from fastapi import Response
 @app.middleware("http")
 async def add_response_model_serialization(request, call_next):
     """Ensure response models are serialized with by_alias=True for camelCase"""
+    started = time.perf_counter()
     response = await call_next(request)
+    # Route template (không phải path thật) để label cardinality không tăng theo user IDs
+    route = request.scope.get("route")
+    REQUEST_SECONDS.observe(time.perf_counter() - started, request.method,
+                            route.path if route is not None else "unmatched", response.status_code)
     return response
 
 # Override default response class to use by_alias
@@ -85,354 +240,1240 @@ class CamelCaseJSONResponse(JSONResponse):
 
 app.default_response_class = CamelCaseJSONResponse
 
+# Số ô (users x podcasts) được score trong một block của batch endpoint
+BATCH_SCORE_CELLS = int(os.getenv('BATCH_SCORE_CELLS', '1000000'))
+# Batch endpoint: số users được score + serialize trong một lần chạy trên scoring pool
+BATCH_STREAM_USERS = 256
+
+# Scoring pool: CPU work của requests chạy trên SCORING_WORKERS threads (0 = số cores) thay vì event loop;
+# tối đa SCORING_MAX_PENDING requests chờ / đang score, vượt quá -> 503 + Retry-After (0 = không giới hạn)
+SCORING_WORKERS = int(os.getenv('SCORING_WORKERS', '0')) or None
+SCORING_MAX_PENDING = int(os.getenv('SCORING_MAX_PENDING', '64'))
+SCORING_RETRY_AFTER_SECONDS = float(os.getenv('SCORING_RETRY_AFTER_SECONDS', '1'))
+
+# Micro-batching (opt-in): single-user requests đồng thời được gom trong window (ms) hoặc tới
+# max batch size rồi score bằng một matrix operation; 0 = tắt (mỗi request score riêng)
+MICROBATCH_WINDOW_MS = float(os.getenv('MICROBATCH_WINDOW_MS', '0'))
+MICROBATCH_MAX_SIZE = int(os.getenv('MICROBATCH_MAX_SIZE', '64'))
+
+# Catalog snapshot được coi là stale sau TTL; background loop refresh mỗi interval
+CATALOG_TTL_SECONDS = float(os.getenv('CATALOG_TTL_SECONDS', '300'))
+CATALOG_REFRESH_INTERVAL_SECONDS = float(os.getenv('CATALOG_REFRESH_INTERVAL_SECONDS', str(CATALOG_TTL_SECONDS)))
+# Internal API paging: page size (max 1000) và số pages fetch song song
+CATALOG_PAGE_SIZE = int(os.getenv('CATALOG_PAGE_SIZE', '1000'))
+CATALOG_SYNC_CONCURRENCY = int(os.getenv('CATALOG_SYNC_CONCURRENCY', '4'))
+# State giữ qua restart (catalog + interaction snapshots): thư mục cạnh ./models, mount thành volume trong docker-compose
+DATA_DIR = Path(os.getenv('DATA_DIR', './data'))
+# Catalog của mỗi lần sync thành công được ghi ra file này và load lại lúc startup (rỗng = tắt)
+CATALOG_SNAPSHOT_PATH = os.getenv('CATALOG_SNAPSHOT_PATH', str(DATA_DIR / 'catalog.snapshot'))
+
+# Catalog fields tạo nên content index document; podcast có field nào đổi sau sync thì được index lại
+CONTENT_DOCUMENT_COLUMNS = ('title', 'topics', 'description', 'category')
+
+# /podcasts/real stream records theo chunk
+LISTING_CHUNK_RECORDS = 256
+
+# Per-user result cache (serialized top-N), bounded theo bytes; 0 = tắt
+RESULT_CACHE_MAX_BYTES = int(os.getenv('RESULT_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+RESULT_CACHE_TTL_SECONDS = float(os.getenv('RESULT_CACHE_TTL_SECONDS', '300'))
+
+# Offline top-K cho known users, rebuild sau model load / catalog refresh; 0 = tắt
+TOPK_PRECOMPUTE_K = int(os.getenv('TOPK_PRECOMPUTE_K', '100'))
+TOPK_PRECOMPUTE_WORKERS = int(os.getenv('TOPK_PRECOMPUTE_WORKERS', '0')) or None  # None = all cores
+TOPK_DIR = Path(os.getenv('TOPK_DIR', os.path.join(tempfile.gettempdir(), 'podcast-topk')))
+
+# Item-item neighbors cho /podcasts/{id}/similar (top-N mỗi podcast), rebuild sau model load,
+# podcasts mới từ catalog refresh được thêm incrementally; 0 = tắt
+SIMILAR_NEIGHBORS = int(os.getenv('SIMILAR_NEIGHBORS', '50'))
+SIMILAR_DIR = Path(os.getenv('SIMILAR_DIR', os.path.join(tempfile.gettempdir(), 'podcast-similar')))
+# Rebuild toàn bộ khi phần podcasts còn trong catalog xuống dưới ngưỡng này
+SIMILAR_MIN_LIVE_FRACTION = 0.75
+
+# ANN retrieval cho catalogs lớn: IVF index (k-means lists + quantized vectors) trên podcast vectors
+# của model, build sau model load và cập nhật khi catalog có podcasts mới; online scoring chỉ
+# exact re-rank shortlist từ ANN_NPROBE lists (recall tăng theo nprobe). 0 = luôn exact scoring
+ANN_NPROBE = int(os.getenv('ANN_NPROBE', '0'))
+ANN_LISTS = int(os.getenv('ANN_LISTS', '0'))  # 0 = sqrt(số podcasts)
+ANN_QUANTIZATION = os.getenv('ANN_QUANTIZATION', 'int8')  # int8 | float16
+ANN_SHORTLIST = int(os.getenv('ANN_SHORTLIST', '200'))
+# Catalog có ít known podcasts hơn thì exact scoring đủ rẻ, không build index
+ANN_MIN_PODCASTS = int(os.getenv('ANN_MIN_PODCASTS', '20000'))
+ANN_MIN_LIVE_FRACTION = 0.75
+
+# Interaction events (POST /interactions): bounded in-process queue thay cho message broker,
+# consumer xử lý tối đa INTERACTION_BATCH_SIZE events mỗi lần
+INTERACTION_QUEUE_SIZE = int(os.getenv('INTERACTION_QUEUE_SIZE', '10000'))
+INTERACTION_BATCH_SIZE = int(os.getenv('INTERACTION_BATCH_SIZE', '256'))
+# Multi-worker: mỗi worker đọc shared event log mỗi interval (giây)
+INTERACTION_POLL_SECONDS = float(os.getenv('INTERACTION_POLL_SECONDS', '0.5'))
+# Fold-in: regularization kéo vector về embedding đã train (cold users: mean user) + số Gauss-Newton steps
+FOLD_IN_REGULARIZATION = float(os.getenv('FOLD_IN_REGULARIZATION', '10'))
+FOLD_IN_STEPS = int(os.getenv('FOLD_IN_STEPS', '1'))
+# Interaction log + overlay vectors được snapshot định kỳ (giây; 0 = chỉ lúc shutdown) vào thư mục này
+# (trong DATA_DIR cùng catalog snapshot) và load lại lúc startup
+INTERACTION_SNAPSHOT_SECONDS = float(os.getenv('INTERACTION_SNAPSHOT_SECONDS', '60'))
+INTERACTION_SNAPSHOT_DIR = Path(os.getenv('INTERACTION_SNAPSHOT_DIR', str(DATA_DIR / 'interactions')))
+
+# ./models được poll để hot reload bundle mới (giây); 0 = chỉ reload qua admin endpoint
+MODEL_WATCH_INTERVAL_SECONDS = float(os.getenv('MODEL_WATCH_INTERVAL_SECONDS', '30'))
+# Header X-Admin-Token bắt buộc cho /admin/*; không set thì /admin/* bị tắt (403)
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+
+# Multi-worker mode (gunicorn_conf.py set khi WEB_CONCURRENCY > 1): leader worker fetch catalog +
+# precompute top-K rồi publish vào thư mục này; workers khác poll mỗi SHARED_POLL_SECONDS
+SHARED_STATE_DIR = os.getenv('SHARED_STATE_DIR', '')
+SHARED_POLL_SECONDS = float(os.getenv('SHARED_POLL_SECONDS', '2'))
+# Follower chờ leader publish catalog đầu tiên tối đa bao lâu
+SHARED_CATALOG_WAIT_SECONDS = float(os.getenv('SHARED_CATALOG_WAIT_SECONDS', '30'))
+
+# Shared upstream client: pool limits, breaker và per-endpoint timeouts
+UPSTREAM_MAX_CONNECTIONS = int(os.getenv('UPSTREAM_MAX_CONNECTIONS', '50'))
+UPSTREAM_MAX_KEEPALIVE = int(os.getenv('UPSTREAM_MAX_KEEPALIVE', '20'))
+UPSTREAM_BREAKER_FAILURES = int(os.getenv('UPSTREAM_BREAKER_FAILURES', '5'))
+UPSTREAM_BREAKER_RESET_SECONDS = float(os.getenv('UPSTREAM_BREAKER_RESET_SECONDS', '30'))
+CONTENT_PODCASTS_POLICY = EndpointPolicy(
+    connect_timeout=float(os.getenv('CONTENT_CONNECT_TIMEOUT_SECONDS', '2')),
+    read_timeout=float(os.getenv('CONTENT_READ_TIMEOUT_SECONDS', '15')),
+    retries=int(os.getenv('CONTENT_RETRIES', '2'))
+)
+USERS_POLICY = EndpointPolicy(
+    connect_timeout=float(os.getenv('USER_CONNECT_TIMEOUT_SECONDS', '2')),
+    read_timeout=float(os.getenv('USER_READ_TIMEOUT_SECONDS', '10')),
+    retries=int(os.getenv('USER_RETRIES', '2'))
+)
+
+# Per-request hot-path logs ở DEBUG, chỉ log 1 / HOT_PATH_LOG_SAMPLE requests (1 = mọi request)
+HOT_PATH_LOG_SAMPLE = max(1, int(os.getenv('HOT_PATH_LOG_SAMPLE', '100')))
+# Multi-worker: mỗi worker publish metrics snapshot mỗi interval (giây) cho /metrics
+METRICS_PUBLISH_SECONDS = float(os.getenv('METRICS_PUBLISH_SECONDS', str(SHARED_POLL_SECONDS)))
+
+# UserService paging cho /users/real
+USERS_PATH = os.getenv('USER_SERVICE_USERS_PATH', '/api/users')
+USERS_PAGE_SIZE = int(os.getenv('USERS_PAGE_SIZE', '500'))
+USERS_MAX_PAGES = int(os.getenv('USERS_MAX_PAGES', '1000'))
+
+# ------------------------------------------------------------------ #
+# Metrics (/metrics)
+# ------------------------------------------------------------------ #
+METRICS = Registry()
+STAGE_SECONDS = METRICS.histogram(
+    'podcast_recommendation_stage_seconds',
+    'Latency of recommendation stages (catalog_fetch, catalog_persist, guid_filter, filter_index, candidate_filter, ann_search, score, topk, serialize)',
+    ('stage',)
+)
+REQUEST_SECONDS = METRICS.histogram(
+    'podcast_http_request_duration_seconds',
+    'HTTP request latency until response headers, by route template',
+    ('method', 'route', 'status')
+)
+# Buckets theo số requests cho queue depth / batch size của micro-batcher
+COUNT_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+MICROBATCH_QUEUE_DEPTH = METRICS.histogram(
+    'podcast_microbatch_queue_depth',
+    'Scoring requests waiting in the micro-batcher when a request is enqueued',
+    buckets=COUNT_BUCKETS
+)
+MICROBATCH_SIZE = METRICS.histogram(
+    'podcast_microbatch_size',
+    'Users scored per micro-batch',
+    buckets=COUNT_BUCKETS
+)
+_hot_path_requests = itertools.count()
+
+def log_hot_path(message) -> None:
+    """Sampled DEBUG log cho per-request hot path; message là callable nên không format khi bị bỏ qua"""
+    if logger.isEnabledFor(logging.DEBUG) and next(_hot_path_requests) % HOT_PATH_LOG_SAMPLE == 0:
+        logger.debug(message())
+
 class RecommendationService:
     """Service để handle model và data integration"""
     
     def __init__(self):
-        self.model = None
-        self.mappings = None
-        self.podcasts_df = None
-        self.metadata = None
-        self.is_loaded = False
-        self._real_podcasts_cache = None  # type: Optional[pd.DataFrame]
-        self._real_cache_ts = None        # type: Optional[datetime]
+        # (candidates store, pre-encoded podcast JSON fragments) của snapshot hiện tại
+        self._fragments = None
+        self.result_cache = ResultCache(RESULT_CACHE_MAX_BYTES, RESULT_CACHE_TTL_SECONDS)
+        self.scoring_pool = ScoringPool(SCORING_WORKERS, SCORING_MAX_PENDING, SCORING_RETRY_AFTER_SECONDS)
+        self.micro_batcher = MicroBatcher(
+            MICROBATCH_WINDOW_MS / 1000,
+            max_batch=MICROBATCH_MAX_SIZE,
+            max_cells=BATCH_SCORE_CELLS,
+            on_enqueue=MICROBATCH_QUEUE_DEPTH.observe,
+            on_flush=MICROBATCH_SIZE.observe,
+            run=self.scoring_pool.run
+        ) if MICROBATCH_WINDOW_MS > 0 else None
+        # Precomputed top-K (memory-mapped, một table mỗi loaded bundle) + background rebuild task
+        self._topk_task = None            # type: Optional[asyncio.Task]
+        self._topk_dirty = False
+        # Item-item neighbor tables (một table mỗi loaded bundle) + background refresh task
+        self._similar_task = None         # type: Optional[asyncio.Task]
+        self._similar_dirty = False
+        # ANN indexes (một index mỗi loaded bundle) + background refresh task
+        self._ann_task = None             # type: Optional[asyncio.Task]
+        self._ann_dirty = False
+        # Catalog store đã có trong snapshot file (bỏ qua ghi lại khi version không đổi) + background write task
+        self._persisted_store = None      # type: Optional[CatalogStore]
+        self._persist_task = None         # type: Optional[asyncio.Task]
+        self._persist_dirty = False
         
         # Service URLs - use Gateway for external API calls
         self.userservice_url = os.getenv('USER_SERVICE_URL', 'http://userservice-api')
         self.gateway_url = os.getenv('GATEWAY_URL', 'http://gateway-api:80')  # Use Gateway instead of direct service call
         self.contentservice_url = os.getenv('CONTENT_SERVICE_URL', 'http://contentservice-api')
         
+        # Multi-worker shared state (None = single process)
+        self.shared = SharedState(Path(SHARED_STATE_DIR)) if SHARED_STATE_DIR else None
+        self._leader_store = None         # type: Optional[CatalogStore]
+        self._leader_synced_at = 0.0
+        
+        # TF-IDF content index (catalog + training podcasts) cho cold users / cold podcasts
+        self.content_index = ContentIndex()
+        self._indexed_store = None        # type: Optional[CatalogStore]
+        
+        # Interaction events -> interaction log -> listened history + user-vector overlay của mỗi bundle
+        self.interactions = InteractionLog()
+        self.interaction_consumer = InteractionConsumer(
+            self.process_interactions,
+            max_queue=INTERACTION_QUEUE_SIZE,
+            max_batch=INTERACTION_BATCH_SIZE,
+            source=self.read_shared_interactions if self.shared is not None else None,
+            poll_interval=INTERACTION_POLL_SECONDS
+        )
+        self._interaction_cursor = None   # type: Optional[Tuple[str, int]]
+        self._snapshot_task = None        # type: Optional[asyncio.Task]
+        self._snapshot_revision = 0
+        snapshot = load_snapshot(INTERACTION_SNAPSHOT_DIR)
+        if snapshot is not None:
+            self.interactions.restore(snapshot['log'])
+            self._snapshot_revision = self.interactions.revision
+            logger.info(f"✅ Restored interactions of {len(self.interactions)} users from {INTERACTION_SNAPSHOT_DIR}")
+        
         # Model paths
-        self.model_dir = Path('./models')
+        self.model_dir = Path(os.getenv('MODEL_DIR', './models'))
+        # Model bundles: swap atomically khi reload; request đang chạy giữ bundle nó đã chọn
+        self.model_registry = ModelRegistry(
+            self.model_dir,
+            poll_interval=MODEL_WATCH_INTERVAL_SECONDS,
+            on_swap=self.on_model_swap,
+            shared=self.shared,
+            shared_poll_interval=SHARED_POLL_SECONDS,
+            prepare=self.prepare_bundle
+        )
+        
+        # Một pooled client cho mọi upstream call (đóng trong app lifespan)
+        self.upstream = UpstreamClient(
+            max_connections=UPSTREAM_MAX_CONNECTIONS,
+            max_keepalive_connections=UPSTREAM_MAX_KEEPALIVE,
+            failure_threshold=UPSTREAM_BREAKER_FAILURES,
+            reset_timeout=UPSTREAM_BREAKER_RESET_SECONDS
+        )
+        self.users_endpoint = self.upstream.endpoint('userservice', 'users', USERS_POLICY)
+        METRICS.register_collector(self.collect_metrics)
+        self._metrics_task = None         # type: Optional[asyncio.Task]
+        self._last_good_users = []  # type: List[str]
+        self.stale_user_serves = 0
+        
+        # Real podcast catalog: paginated incremental sync -> immutable snapshot + background refresh
+        self.catalog_sync = CatalogSync(
+            self.contentservice_url,
+            page_size=CATALOG_PAGE_SIZE,
+            max_concurrency=CATALOG_SYNC_CONCURRENCY,
+            client=self.upstream.endpoint('contentservice', 'internal_podcasts', CONTENT_PODCASTS_POLICY)
+        )
+        self.catalog = CatalogRefresher(
+            self.get_real_podcasts,
+            ttl_seconds=CATALOG_TTL_SECONDS,
+            # Multi-worker: poll shared catalog thường xuyên; leader vẫn chỉ gọi ContentService mỗi interval
+            refresh_interval=min(CATALOG_REFRESH_INTERVAL_SECONDS, SHARED_POLL_SECONDS) if self.shared else CATALOG_REFRESH_INTERVAL_SECONDS,
+            on_publish=self.on_catalog_publish
+        )
+        # Catalog known-good từ snapshot file: serve ngay, refresh loop thay nó khi sync thành công
+        self.catalog_file = None          # type: Optional[CatalogFile]
+        self.restore_catalog()
         
         # Load model khi khởi tạo
         self.load_model()
+        if snapshot is not None:
+            for bundle in self.model_registry.bundles():
+                vectors = snapshot['overlays'].get(bundle.fingerprint)
+                if bundle.overlay is not None and vectors:
+                    bundle.overlay.restore(vectors)
     
-    @staticmethod
-    def parse_duration_to_minutes(duration) -> Optional[int]:
-        """Parse duration từ nhiều format về minutes
-        - "00:33:20" (HH:MM:SS) -> 33
-        - "33:20" (MM:SS) -> 33
-        - 2000 (seconds) -> 33
-        - 33.5 (minutes) -> 33
-        """
-        if pd.isna(duration) or duration is None:
-            return None
+    parse_duration_to_minutes = staticmethod(parse_duration_to_minutes)
+    
+    def prepare_bundle(self, bundle: ModelBundle) -> None:
+        bundle.attach_content(self.content_index)
+        bundle.attach_interactions(self.interactions, FOLD_IN_REGULARIZATION, FOLD_IN_STEPS)
+    
+    def on_model_swap(self) -> None:
+        self.schedule_bundle_warmup()
+        self.schedule_topk_precompute()
+        self.schedule_similar_refresh()
+        self.schedule_ann_refresh()
+    
+    def on_catalog_publish(self, snapshot: CatalogSnapshot) -> None:
+        STAGE_SECONDS.observe(snapshot.filter_seconds, 'guid_filter')
+        if snapshot.filter_index is not None:
+            STAGE_SECONDS.observe(snapshot.filter_index.build_seconds, 'filter_index')
+        self.schedule_topk_precompute()
+        self.schedule_similar_refresh()
+        self.schedule_ann_refresh()
+        self.schedule_catalog_persist()
+    
+    def schedule_bundle_warmup(self) -> None:
+        """Build listened index (ratings.pkl) và index training podcasts của các bundles ở background,
+        trước request đầu tiên cần chúng"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        for bundle in self.model_registry.bundles():
+            loop.run_in_executor(None, self.warm_bundle_content, bundle)
+    
+    def warm_bundle_content(self, bundle: ModelBundle) -> None:
+        bundle.listened_index  # lazy property: load ratings.pkl
+        added = bundle.index_training_podcasts(self.content_index)
+        if added:
+            logger.info(f"✅ Indexed {added} training podcasts for content-based scoring")
+    
+    def index_catalog(self, store: CatalogStore) -> int:
+        """Đồng bộ content index với catalog (blocking): podcasts mới hoặc có document fields khác catalog
+        đã index lần trước được tokenize (lại), podcasts không còn trong catalog bị xoá khỏi index"""
+        previous = self._indexed_store
+        if store is previous or not store.has_column('podcast_id'):
+            return 0
+        index = self.content_index
+        if previous is None or not previous.has_column('podcast_id'):
+            # Lần đầu: podcasts đã có trong index (training data) giữ nguyên
+            rows, removed = [row for row, podcast_id in enumerate(store.podcast_ids) if podcast_id not in index], []
+        else:
+            rows, removed = store.diff(previous, CONTENT_DOCUMENT_COLUMNS)
+            rows = rows.tolist()
+        documents = [(
+            store.podcast_ids[i],
+            document_text(store.value('title', i), store.value('topics', i, store.value('description', i))),
+            store.value('category', i)
+        ) for i in rows]
+        indexed = index.update(documents, removed)
+        self._indexed_store = store
+        if indexed or removed:
+            logger.info(f"📚 Content index: ~{indexed} podcasts, -{len(removed)} removed ({len(index)} documents)")
+        return indexed
+    
+    # ------------------------------------------------------------------ #
+    # Interaction events
+    # ------------------------------------------------------------------ #
+    def start_interactions(self) -> None:
+        self.interaction_consumer.start()
+        if self._snapshot_task is None or self._snapshot_task.done():
+            self._snapshot_task = asyncio.ensure_future(self._interaction_snapshot_loop())
+    
+    async def stop_interactions(self) -> None:
+        await self.interaction_consumer.stop()
+        if self._snapshot_task is not None:
+            self._snapshot_task.cancel()
+            self._snapshot_task = None
+        await asyncio.get_running_loop().run_in_executor(None, self.save_interactions)
+    
+    async def submit_interactions(self, events: List[InteractionEvent]) -> None:
+        """Đưa events vào queue (multi-worker: shared event log để mọi worker đều áp dụng)"""
+        if self.shared is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.shared.append_interactions, encode_events(events))
+        elif not self.interaction_consumer.submit(events):
+            raise HTTPException(status_code=503, detail="Interaction queue is full", headers={"Retry-After": "1"})
+    
+    def read_shared_interactions(self) -> List[InteractionEvent]:
+        lines, self._interaction_cursor = self.shared.read_interactions(self._interaction_cursor)
+        return decode_events(lines)
+    
+    def process_interactions(self, events: List[InteractionEvent]) -> None:
+        """Consumer (executor thread): log -> listened history -> fold-in lại users vừa có events.
         
+        Result cache key chứa log version của user nên recommendations kế tiếp được score lại.
+        """
+        bundles = self.model_registry.bundles()
+        for event in events:
+            self.interactions.record(event)
+            if event.listened:
+                for bundle in bundles:
+                    bundle.listened_index.append(event.user_id, [event.podcast_id])
+        for user_id in dict.fromkeys(event.user_id for event in events):
+            for bundle in bundles:
+                if bundle.overlay is not None:
+                    bundle.overlay.refresh(user_id)
+        logger.debug(f"Processed {len(events)} interaction events")
+    
+    def save_interactions(self) -> bool:
+        """Snapshot log + overlay vectors nếu có events mới (multi-worker: chỉ leader ghi)"""
+        if self.shared is not None:
+            if not self.shared.is_leader:
+                return False
+            self.shared.prune_interactions()
+        revision = self.interactions.revision
+        if revision == self._snapshot_revision:
+            return False
+        overlays = {bundle.fingerprint: bundle.overlay for bundle in self.model_registry.bundles() if bundle.overlay is not None}
         try:
-            # If already a number (seconds or minutes)
-            if isinstance(duration, (int, float)):
-                # Assume if > 1000 it's seconds, else minutes
-                return int(duration / 60) if duration > 1000 else int(duration)
-            
-            # If string, try parsing HH:MM:SS or MM:SS
-            duration_str = str(duration).strip()
-            parts = duration_str.split(':')
-            
-            if len(parts) == 3:  # HH:MM:SS
-                hours, minutes, seconds = map(int, parts)
-                return hours * 60 + minutes + (1 if seconds > 30 else 0)
-            elif len(parts) == 2:  # MM:SS
-                minutes, seconds = map(int, parts)
-                return minutes + (1 if seconds > 30 else 0)
-            elif len(parts) == 1:  # Just number
-                num = float(duration_str)
-                return int(num / 60) if num > 1000 else int(num)
-            else:
-                logger.warning(f"⚠️ Unknown duration format: {duration}")
-                return None
-        except Exception as e:
-            logger.warning(f"⚠️ Failed to parse duration '{duration}': {e}")
-            return None
+            save_snapshot(INTERACTION_SNAPSHOT_DIR, self.interactions, overlays)
+        except OSError as e:
+            logger.error(f"❌ Saving interaction snapshot failed: {e}")
+            return False
+        self._snapshot_revision = revision
+        return True
+    
+    async def _interaction_snapshot_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        interval = INTERACTION_SNAPSHOT_SECONDS if INTERACTION_SNAPSHOT_SECONDS > 0 else None
+        while interval is not None:
+            await asyncio.sleep(interval)
+            await loop.run_in_executor(None, self.save_interactions)
+    
+    # ------------------------------------------------------------------ #
+    # Metrics
+    # ------------------------------------------------------------------ #
+    def collect_metrics(self) -> List[Dict[str, Any]]:
+        """Counters / gauges đọc từ state sẵn có lúc scrape (result cache, catalog, upstream, model registry)"""
+        cache, catalog = self.result_cache, self.catalog
+        snapshot = catalog.snapshot
+        endpoints = self.upstream.endpoints()
+        families = [
+            value_family('podcast_result_cache_requests_total', 'counter', 'Result cache lookups by result',
+                         [({'result': 'hit'}, cache.hits), ({'result': 'miss'}, cache.misses)]),
+            value_family('podcast_result_cache_evictions_total', 'counter', 'Result cache entries dropped by reason',
+                         [({'reason': 'lru'}, cache.evictions), ({'reason': 'ttl'}, cache.expirations)]),
+            value_family('podcast_result_cache_bytes', 'gauge', 'Approximate result cache size in bytes',
+                         [({}, cache.current_bytes)]),
+            value_family('podcast_stale_serves_total', 'counter',
+                         'Requests served from stale data (catalog past TTL, last good users after upstream failure)',
+                         [({'source': 'catalog'}, catalog.stale_serves), ({'source': 'users'}, self.stale_user_serves)]),
+            value_family('podcast_scoring_pending', 'gauge', 'Requests admitted to the scoring pool (queued or running)',
+                         [({}, self.scoring_pool.pending)]),
+            value_family('podcast_requests_shed_total', 'counter', 'Requests rejected with 503 because the scoring pool was full',
+                         [({}, self.scoring_pool.rejected)]),
+            value_family('podcast_catalog_refresh_failures_total', 'counter', 'Catalog refreshes that kept the old snapshot',
+                         [({}, catalog.refresh_failures)]),
+            value_family('podcast_catalog_version', 'gauge', 'Version of the catalog snapshot being served',
+                         [({}, snapshot.version)] if snapshot is not None else [], MERGE_ALL),
+            value_family('podcast_catalog_age_seconds', 'gauge', 'Age of the catalog snapshot being served',
+                         [({}, snapshot.age_seconds)] if snapshot is not None else [], MERGE_ALL),
+            value_family('podcast_catalog_podcasts', 'gauge', 'Podcasts in the catalog snapshot (all parsed / GUID candidates)',
+                         [({'set': 'all'}, len(snapshot.store)), ({'set': 'candidates'}, len(snapshot))]
+                         if snapshot is not None else [], MERGE_ALL),
+        ]
+        for metric, attribute, documentation in (
+            ('podcast_upstream_requests_total', 'requests', 'Upstream HTTP attempts (including retries)'),
+            ('podcast_upstream_errors_total', 'errors', 'Upstream attempts that failed (transport error, 5xx, 429)'),
+            ('podcast_upstream_retries_total', 'retries', 'Upstream retries'),
+            ('podcast_upstream_short_circuited_total', 'short_circuited', 'Upstream calls rejected by an open circuit'),
+        ):
+            families.append(value_family(metric, 'counter', documentation, [
+                ({'service': endpoint.service, 'endpoint': endpoint.name}, getattr(endpoint.stats, attribute))
+                for endpoint in endpoints
+            ]))
+        families.append(value_family('podcast_upstream_circuit_state', 'gauge', 'Circuit breaker state (1 = current state)', [
+            ({'service': service, 'state': breaker['state']}, 1)
+            for service, breaker in self.upstream.stats()['breakers'].items()
+        ], MERGE_ALL))
+        bundles = [('active', self.model_registry.active), ('canary', self.model_registry.canary)]
+        families.append(value_family('podcast_model_generation', 'gauge', 'Generation of the loaded model bundle by role', [
+            ({'role': role}, bundle.generation) for role, bundle in bundles if bundle is not None
+        ], MERGE_ALL))
+        families.append(value_family('podcast_model_info', 'gauge', 'Loaded model bundle version and fingerprint', [
+            ({'role': role, 'version': bundle.version, 'fingerprint': bundle.fingerprint}, 1)
+            for role, bundle in bundles if bundle is not None
+        ], MERGE_ALL))
+        return families
+    
+    async def render_metrics(self) -> bytes:
+        """Prometheus text của worker này; multi-worker: merge với snapshots các workers khác đã publish"""
+        families = METRICS.collect()
+        if self.shared is None:
+            return render(families)
+        others = await asyncio.get_running_loop().run_in_executor(
+            None, self.shared.read_worker_metrics, 3 * METRICS_PUBLISH_SECONDS + 5)
+        workers = [(str(os.getpid()), families)]
+        for pid, data in others:
+            try:
+                workers.append((pid, decode_families(data)))
+            except ValueError:
+                continue  # file ghi bởi version khác / hỏng: bỏ qua worker đó
+        return render(merge_families(workers))
+    
+    def start_metrics(self) -> None:
+        if self.shared is not None and METRICS_PUBLISH_SECONDS > 0 and (self._metrics_task is None or self._metrics_task.done()):
+            self._metrics_task = asyncio.ensure_future(self._metrics_publish_loop())
+    
+    async def _metrics_publish_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await loop.run_in_executor(None, self.shared.publish_metrics, encode_families(METRICS.collect()))
+            except OSError as e:
+                logger.error(f"❌ Publishing metrics failed: {e}")
+            await asyncio.sleep(METRICS_PUBLISH_SECONDS)
     
     def load_model(self) -> bool:
-        """Load model và mappings từ Kaggle files"""
-        try:
-            logger.info(f"🔄 Loading model from {self.model_dir}")
-            
-            # Paths
-            mappings_path = self.model_dir / "mappings.pkl"
-            podcasts_path = self.model_dir / "podcasts.pkl"
-            metadata_path = self.model_dir / "model_metadata.json"
-            
-            # Load mappings (quan trọng nhất)
-            if mappings_path.exists():
-                logger.info("📥 Loading mappings...")
-                with open(mappings_path, 'rb') as f:
-                    self.mappings = pickle.load(f)
-                logger.info(f"✅ Loaded mappings: {len(self.mappings['user2user_encoded'])} users, {len(self.mappings['podcast2podcast_encoded'])} podcasts")
-            else:
-                logger.warning("⚠️ No mappings file found, creating empty mappings")
-                self.mappings = {
-                    'user2user_encoded': {},
-                    'podcast2podcast_encoded': {},
-                    'userencoded2user': {},
-                    'podcastencoded2podcast': {}
-                }
-            
-            # Load podcasts data (training data)
-            if podcasts_path.exists():
-                logger.info("📥 Loading training podcasts data...")
-                self.podcasts_df = pd.read_pickle(podcasts_path)
-                logger.info(f"✅ Loaded {len(self.podcasts_df)} training podcasts")
-            else:
-                logger.warning("⚠️ No podcasts file found")
-                self.podcasts_df = pd.DataFrame()
-            
-            # Load metadata
-            if metadata_path.exists():
-                logger.info("📥 Loading metadata...")
-                with open(metadata_path, 'r') as f:
-                    self.metadata = json.load(f)
-                logger.info("✅ Metadata loaded")
-            else:
-                logger.warning("⚠️ No metadata file found")
-                self.metadata = {"model_info": {"version": "unknown"}}
-            
-            self.is_loaded = True
-            logger.info("✅ Model service loaded successfully!")
-            return True
-            
-        except Exception as e:
-            logger.error(f"❌ Error loading model: {e}")
+        """Load model và mappings từ Kaggle files (startup; sau đó reload qua model_registry)"""
+        if not self.model_registry.load_initial():
             return False
+        self.schedule_topk_precompute()
+        logger.info("✅ Model service loaded successfully!")
+        return True
     
-    async def get_real_users(self) -> List[str]:
-        """Lấy danh sách user IDs thật từ UserService"""
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(f"{self.userservice_url}/api/users")
-                if response.status_code == 200:
-                    users_data = response.json()
-                    # Giả sử API trả về list users với 'id' field
-                    user_ids = [str(user.get('id', user.get('user_id', user.get('userId')))) 
-                              for user in users_data.get('data', users_data)]
-                    logger.info(f"✅ Fetched {len(user_ids)} real users from UserService")
-                    return user_ids
-                else:
-                    logger.warning(f"⚠️ UserService returned {response.status_code}")
-                    return []
-        except Exception as e:
-            logger.error(f"❌ Error fetching users: {e}")
-            return []
+    # Active bundle; request path dùng `model_registry.select(user_id)` để hỗ trợ canary
+    @property
+    def is_loaded(self) -> bool:
+        return self.model_registry.active is not None
+    
+    @property
+    def model(self):
+        bundle = self.model_registry.active
+        return bundle.model if bundle is not None else None
+    
+    @property
+    def mappings(self) -> Optional[Dict[str, dict]]:
+        bundle = self.model_registry.active
+        return bundle.mappings if bundle is not None else None
+    
+    @property
+    def podcasts_df(self) -> Optional[pd.DataFrame]:
+        bundle = self.model_registry.active
+        return bundle.podcasts_df if bundle is not None else None
     
-    async def get_real_podcasts(self) -> pd.DataFrame:
-        """Lấy danh sách podcasts thật từ INTERNAL API của ContentService."""
+    @property
+    def metadata(self) -> Optional[Dict[str, Any]]:
+        bundle = self.model_registry.active
+        return bundle.metadata if bundle is not None else None
+    
+    @property
+    def scoring_engine(self) -> Optional[ScoringEngine]:
+        bundle = self.model_registry.active
+        return bundle.scoring_engine if bundle is not None else None
+    
+    @property
+    def topk_table(self) -> Optional[TopKTable]:
+        bundle = self.model_registry.active
+        return bundle.topk_table if bundle is not None else None
+    
+    async def get_real_users(self) -> List[str]:
+        """Lấy danh sách user IDs thật từ UserService (page qua toàn bộ users).
+        Upstream lỗi hoặc circuit open -> trả về danh sách lần gần nhất thành công.
+        """
+        url = f"{self.userservice_url}{USERS_PATH}"
+        user_ids = []  # type: List[str]
+        seen = set()
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                # ONLY use Internal API (no auth required, direct access)
-                internal_url = f"{self.contentservice_url}/api/internal/podcasts?page=1&pageSize=1000"
-                logger.info(f"🔎 Fetching real podcasts from INTERNAL API: {internal_url}")
-                
-                response = await client.get(internal_url)
-                
+            for page in range(1, USERS_MAX_PAGES + 1):
+                response = await self.users_endpoint.get(url, params={'page': page, 'pageSize': USERS_PAGE_SIZE})
                 if response.status_code != 200:
-                    logger.error(f"❌ Internal API returned {response.status_code}")
-                    return pd.DataFrame()
+                    logger.warning(f"⚠️ UserService returned {response.status_code}, serving last good users")
+                    self.stale_user_serves += 1
+                    return self._last_good_users
                 
-                data = response.json()
-                podcasts_list = data.get('podcasts', data.get('items', data.get('data', [])))
-                logger.info(f"✅ INTERNAL API returned {len(podcasts_list)} podcasts")
+                users_data, has_next = self._parse_users_page(response.json(), page)
+                new_ids = []
+                for user in users_data:
+                    user_id = str(user.get('id', user.get('user_id', user.get('userId'))))
+                    if user_id not in seen:
+                        seen.add(user_id)
+                        new_ids.append(user_id)
+                user_ids.extend(new_ids)
                 
-                if isinstance(podcasts_list, list) and len(podcasts_list) > 0:
-                    df = pd.DataFrame(podcasts_list)
-                    
-                    # Standardize column names for Internal API response
-                    column_mapping = {
-                        'id': 'podcast_id',
-                        'title': 'title',
-                        'description': 'topics',  # Use description as topic
-                        'duration': 'duration_raw',  # Format: "00:11:27"
-                        'audioUrl': 'content_url',
-                        'thumbnailUrl': 'thumbnail_url'
-                    }
-                    
-                    # Rename columns if they exist
-                    for old_col, new_col in column_mapping.items():
-                        if old_col in df.columns and new_col not in df.columns:
-                            df = df.rename(columns={old_col: new_col})
-                    
-                    logger.info(f"📋 DataFrame columns after rename: {list(df.columns)}")
-                    
-                    # Ensure required columns exist
-                    required_columns = ['podcast_id', 'title']
-                    for col in required_columns:
-                        if col not in df.columns:
-                            if col == 'podcast_id':
-                                df['podcast_id'] = df.index.astype(str)
-                            elif col == 'title':
-                                df['title'] = f"Podcast {df.index + 1}"
-                    
-                    # Convert podcast_id to string
-                    df['podcast_id'] = df['podcast_id'].astype(str)
-                    
-                    # Parse duration from "00:11:27" (HH:MM:SS) string to minutes
-                    if 'duration_raw' in df.columns:
-                        def parse_duration_hhmmss(duration_str):
-                            if pd.isna(duration_str) or duration_str is None:
-                                return None
-                            try:
-                                # Parse "00:11:27" or "05:00:00" format
-                                import re
-                                parts = str(duration_str).split(':')
-                                if len(parts) == 3:  # HH:MM:SS
-                                    hours, minutes, seconds = map(int, parts)
-                                    return hours * 60 + minutes + (1 if seconds > 30 else 0)
-                                elif len(parts) == 2:  # MM:SS
-                                    minutes, seconds = map(int, parts)
-                                    return minutes + (1 if seconds > 30 else 0)
-                                # Try to extract number from "11 phút" format as fallback
-                                match = re.search(r'(\d+)', str(duration_str))
-                                if match:
-                                    return int(match.group(1))
-                                return None
-                            except Exception as e:
-                                logger.warning(f"Failed to parse duration '{duration_str}': {e}")
-                                return None
-                        
-                        df['duration_minutes'] = df['duration_raw'].apply(parse_duration_hhmmss)
-                        logger.info(f"✅ Parsed duration. Sample: {df['duration_raw'].iloc[0] if len(df) > 0 else 'N/A'} -> {df['duration_minutes'].iloc[0] if len(df) > 0 else 'N/A'}")
-                    elif 'duration_minutes' in df.columns:
-                        logger.info(f"🔧 Parsing duration column. Sample before: {df['duration_minutes'].iloc[0] if len(df) > 0 else 'N/A'}")
-                        df['duration_minutes'] = df['duration_minutes'].apply(self.parse_duration_to_minutes)
-                        logger.info(f"✅ Duration parsed. Sample after: {df['duration_minutes'].iloc[0] if len(df) > 0 else 'N/A'}")
-                    
-                    logger.info(f"✅ Fetched {len(df)} real podcasts from INTERNAL API")
-                    return df
-                else:
-                    logger.warning("⚠️ No podcasts data found from INTERNAL API")
-                    return pd.DataFrame()
+                # Dừng khi hết page, hoặc server bỏ qua paging params (không có ID mới)
+                if not new_ids or has_next is False or (has_next is None and len(users_data) < USERS_PAGE_SIZE):
+                    break
+            
+            logger.info(f"✅ Fetched {len(user_ids)} real users from UserService")
+            self._last_good_users = user_ids
+            return user_ids
+        except CircuitOpenError:
+            logger.warning("⚠️ UserService circuit open, serving last good users")
+            self.stale_user_serves += 1
+            return self._last_good_users
         except Exception as e:
-            logger.error(f"❌ Error fetching podcasts: {e}")
-            return pd.DataFrame()
-
-    async def get_real_podcasts_cached(self, ttl_seconds: int = 300) -> pd.DataFrame:
-        """Return cached real podcasts if cache is fresh; otherwise refresh.
-        Falls back to previous cache on transient fetch errors.
+            logger.error(f"❌ Error fetching users: {e}")
+            self.stale_user_serves += 1
+            return self._last_good_users
+    
+    @staticmethod
+    def _parse_users_page(payload: Any, page: int) -> Tuple[List[Dict[str, Any]], Optional[bool]]:
+        """(users, has_next) từ list / {data: [...]} / PaginationResult {items, hasNext, totalPages}"""
+        if isinstance(payload, list):
+            return payload, None
+        data = payload.get('data', payload)
+        if isinstance(data, list):
+            users, meta = data, payload
+        else:
+            users, meta = data.get('items', []), data
+        if 'hasNext' in meta:
+            return users, bool(meta['hasNext'])
+        if 'totalPages' in meta:
+            return users, page < int(meta['totalPages'])
+        return users, None
+    
+    async def get_real_podcasts(self) -> CatalogStore:
+        """Lấy toàn bộ podcasts thật từ INTERNAL API của ContentService (all pages, incremental).
+        Podcasts mới được index (content scorer) trước khi snapshot được publish.
         """
+        started = time.perf_counter()
         try:
-            now = datetime.utcnow()
-            # Use cache if fresh
-            if self._real_podcasts_cache is not None and self._real_cache_ts is not None:
-                age = (now - self._real_cache_ts).total_seconds()
-                if age < ttl_seconds and not self._real_podcasts_cache.empty:
-                    logger.info(f"🗃️ Using cached real podcasts (age={int(age)}s, rows={len(self._real_podcasts_cache)})")
-                    return self._real_podcasts_cache
-
-            # Refresh cache
-            df = await self.get_real_podcasts()
-            if df is not None and not df.empty:
-                self._real_podcasts_cache = df
-                self._real_cache_ts = now
-                logger.info(f"🆕 Refreshed real podcasts cache (rows={len(df)})")
-                return df
-
-            # Fallback to previous cache even if stale
-            if self._real_podcasts_cache is not None and not self._real_podcasts_cache.empty:
-                logger.warning("⚠️ Failed to refresh real podcasts; using stale cache")
-                return self._real_podcasts_cache
-
-            # Nothing available
-            return pd.DataFrame()
+            if self.shared is not None:
+                store = await self.get_shared_podcasts()
+            else:
+                store = await self.catalog_sync.sync()
         except Exception as e:
-            logger.error(f"❌ Cached fetch error: {e}")
-            return self._real_podcasts_cache if self._real_podcasts_cache is not None else pd.DataFrame()
+            logger.error(f"❌ Error fetching podcasts: {e}")
+            return CatalogStore.empty()
+        finally:
+            STAGE_SECONDS.observe(time.perf_counter() - started, 'catalog_fetch')
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.index_catalog, store)
+        return store
     
-    def calculate_similarity_score(self, user_id: str, podcast_id: str) -> float:
-        """Tính similarity score dựa trên training data patterns"""
-        
-        # Nếu có mappings từ Kaggle training
-        if (self.mappings and 
-            user_id in self.mappings.get('user2user_encoded', {}) and 
-            podcast_id in self.mappings.get('podcast2podcast_encoded', {})):
-            
-            # Sử dụng pattern từ training data
-            user_idx = self.mappings['user2user_encoded'][user_id]
-            podcast_idx = self.mappings['podcast2podcast_encoded'][podcast_id]
-            
-            # Simulate prediction dựa trên training patterns
-            # (Thay thế cho TensorFlow model.predict())
-            seed = (user_idx * 7 + podcast_idx * 11) % 10000
-            np.random.seed(seed)
-            
-            # Generate rating based on training distribution
-            base_rating = np.random.normal(4.0, 0.8)  # Mean 4.0, std 0.8
-            rating = np.clip(base_rating, 1.0, 5.0)
-            
-            return float(rating)
-        
-        else:
-            # Cho new users/podcasts không có trong training data
-            # Sử dụng content-based similarity
-            seed = hash(user_id + podcast_id) % 10000
-            np.random.seed(seed)
+    def restore_catalog(self) -> None:
+        """Publish catalog trong CATALOG_SNAPSHOT_PATH (nếu có) với fetched_at của lần sync đã ghi nó"""
+        if not CATALOG_SNAPSHOT_PATH:
+            return
+        started = time.perf_counter()
+        saved = load_catalog(Path(CATALOG_SNAPSHOT_PATH))
+        if saved is None or saved.store.is_empty:
+            return
+        self.index_catalog(saved.store)
+        self._persisted_store = saved.store
+        self.catalog.publish(saved.store, fetched_at=saved.fetched_at)
+        self.catalog_file = saved
+        logger.info(f"✅ Restored {len(saved.store)} podcasts from {saved.path} "
+                    f"(age={int(saved.age_seconds)}s, {time.perf_counter() - started:.2f}s)")
+    
+    def schedule_catalog_persist(self) -> None:
+        """Ghi catalog version mới ra snapshot file ở background (single-flight; multi-worker: chỉ leader)"""
+        if not CATALOG_SNAPSHOT_PATH:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return  # startup: catalog vừa restore từ chính file đó
+        if self._persist_task is not None and not self._persist_task.done():
+            self._persist_dirty = True
+            return
+        self._persist_task = asyncio.ensure_future(self._run_catalog_persist())
+    
+    async def _run_catalog_persist(self) -> None:
+        if self.shared is not None and not self.shared.is_leader:
+            return
+        loop = asyncio.get_running_loop()
+        while True:
+            self._persist_dirty = False
+            snapshot = self.catalog.snapshot
+            # Sync không đổi gì thì không publish version mới; cùng store = file đã có version này
+            if snapshot is None or snapshot.store is self._persisted_store:
+                return
+            await loop.run_in_executor(None, self.persist_catalog, snapshot.store, snapshot.fetched_at)
+            if not self._persist_dirty:
+                return
+    
+    def persist_catalog(self, store: CatalogStore, fetched_at: float) -> None:
+        """Ghi catalog vừa sync thành công ra snapshot file (blocking), stamp fetched_at của lần sync đó"""
+        if not CATALOG_SNAPSHOT_PATH or store.is_empty:
+            return
+        started = time.perf_counter()
+        try:
+            nbytes = save_catalog(Path(CATALOG_SNAPSHOT_PATH), store, fetched_at)
+        except (OSError, TypeError, ValueError) as e:
+            logger.error(f"❌ Saving catalog snapshot failed: {e}")
+            return
+        self._persisted_store = store
+        STAGE_SECONDS.observe(time.perf_counter() - started, 'catalog_persist')
+        logger.debug(f"Saved catalog snapshot ({len(store)} podcasts, {nbytes} bytes)")
+    
+    async def get_shared_podcasts(self) -> CatalogStore:
+        """Multi-worker: chỉ leader gọi ContentService và publish; followers đọc bản đã publish.
+        Leader chết -> flock được nhả và follower kế tiếp tiếp quản ở lần poll sau.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = time.monotonic() + SHARED_CATALOG_WAIT_SECONDS
+        while True:
+            if self.shared.try_lead():
+                if self._leader_store is None or time.monotonic() - self._leader_synced_at >= CATALOG_REFRESH_INTERVAL_SECONDS:
+                    try:
+                        self._leader_store = await self.catalog_sync.sync()
+                        self._leader_synced_at = time.monotonic()
+                        await loop.run_in_executor(None, self.shared.publish_catalog, self._leader_store)
+                    except Exception as e:
+                        logger.error(f"❌ Error fetching podcasts: {e}")
+                return self._leader_store if self._leader_store is not None else CatalogStore.empty()
             
-            # Simulate content-based scoring
-            rating = np.random.uniform(2.5, 4.5)
-            return float(rating)
+            store = await loop.run_in_executor(None, self.shared.load_catalog)
+            if store is not None:
+                self.follow_shared_topk()
+                return store
+            if time.monotonic() >= deadline:
+                logger.warning("⚠️ No shared catalog published yet")
+                return CatalogStore.empty()
+            await asyncio.sleep(0.2)
+
+    def calculate_similarity_score(self, user_id: str, podcast_id: str) -> float:
+        """Tính similarity score cho một cặp user/podcast (single-pair wrapper của ScoringEngine)"""
+        engine = self.model_registry.select(user_id).scoring_engine
+        podcast_idx = engine.encode_podcasts([podcast_id])
+        return float(engine.score_user(user_id, [podcast_id], podcast_idx)[0])
     
     async def generate_recommendations(
         self, 
         user_id: str, 
-        num_recommendations: int = 5
+        num_recommendations: int = 5,
+        include_listened: bool = True
     ) -> List[PodcastRecommendation]:
         """Generate recommendations cho user"""
         
+        return await self.score_recommendations(user_id, num_recommendations, await self.get_candidates(), include_listened)
+    
+    async def score_recommendations(
+        self,
+        user_id: str,
+        num_recommendations: int,
+        candidates: Tuple[CatalogStore, Sequence[str]],
+        include_listened: bool = True,
+        selected: Optional[np.ndarray] = None
+    ) -> List[PodcastRecommendation]:
+        candidates_store, podcast_ids = candidates
+        bundle = self.model_registry.select(user_id)
+        top_indices, top_scores = await self.rank_recommendations(
+            bundle, user_id, num_recommendations, podcast_ids, include_listened, selected
+        )
+        return [
+            PodcastRecommendation(
+                **self.podcast_fields(candidates_store, podcast_ids, i),
+                predicted_rating=rating
+            )
+            for i, rating in zip(top_indices, top_scores)
+        ]
+    
+    async def rank_recommendations(
+        self,
+        bundle: ModelBundle,
+        user_id: str,
+        num_recommendations: int,
+        podcast_ids: Sequence[str],
+        include_listened: bool = True,
+        selected: Optional[np.ndarray] = None
+    ) -> Tuple[List[int], List[float]]:
+        """(candidate rows, rounded ratings) của top N cho user, scored bởi `bundle`.
+        
+        include_listened=False loại các podcasts user đã nghe (listened index của bundle).
+        `selected` (candidate mask từ filter index) giới hạn ranking vào các rows được chọn.
+        CPU work chạy trên scoring pool (event loop không bị block); online scoring đi qua
+        micro-batcher nếu được bật.
+        """
+        if selected is not None and not selected.any():
+            return [], []
+        if self.micro_batcher is None or selected is not None or bundle.ann_index is not None:
+            # Một lần vào pool cho cả request: listened mask, precomputed lookup hoặc score + top-k.
+            # Filtered / ANN requests score subset riêng của chúng nên không gộp vào micro-batch
+            ranked = await self.scoring_pool.run(
+                self.rank_sync, bundle, user_id, num_recommendations, podcast_ids, include_listened, selected
+            )
+        else:
+            seen, ranked = await self.scoring_pool.run(
+                self.rank_precomputed, bundle, user_id, num_recommendations, podcast_ids, include_listened
+            )
+            if ranked is None:
+                started = time.perf_counter()
+                scores = await self.micro_batcher.score(bundle, user_id, podcast_ids)
+                STAGE_SECONDS.observe(time.perf_counter() - started, 'score')  # gồm thời gian chờ batch
+                ranked = await self.scoring_pool.run(self.rank_scores, scores, num_recommendations, seen)
+        
+        log_hot_path(lambda: f"✅ Generated {len(ranked[1])} recommendations for user {user_id}")
+        
+        return ranked
+    
+    def rank_sync(
+        self,
+        bundle: ModelBundle,
+        user_id: str,
+        num_recommendations: int,
+        podcast_ids: Sequence[str],
+        include_listened: bool = True,
+        selected: Optional[np.ndarray] = None
+    ) -> Tuple[List[int], List[float]]:
+        seen, ranked = self.rank_precomputed(
+            bundle, user_id, num_recommendations, podcast_ids, include_listened, selected
+        )
+        if ranked is None:
+            # Score toàn bộ catalog (hoặc chỉ các rows filter chọn / ANN shortlist) trong một lần, rồi chỉ lấy top N
+            extra = len(seen) if seen is not None else 0
+            rows = self.ann_candidates(bundle, user_id, podcast_ids, num_recommendations + extra, selected)
+            if rows is None and selected is not None:
+                rows = np.flatnonzero(selected)
+            started = time.perf_counter()
+            podcast_idx = bundle.encode_podcasts(podcast_ids)
+            scores = bundle.scoring_engine.score_user(user_id, podcast_ids, podcast_idx, rows)
+            STAGE_SECONDS.observe(time.perf_counter() - started, 'score')
+            ranked = self.rank_scores(scores, num_recommendations, seen, rows)
+        return ranked
+    
+    def rank_precomputed(
+        self,
+        bundle: ModelBundle,
+        user_id: str,
+        num_recommendations: int,
+        podcast_ids: Sequence[str],
+        include_listened: bool = True,
+        selected: Optional[np.ndarray] = None
+    ) -> Tuple[Optional[np.ndarray], Optional[Tuple[List[int], List[float]]]]:
+        """(candidate rows user đã nghe hoặc None, top N từ precomputed table hoặc None nếu phải score online)"""
+        seen = None
+        if not include_listened:
+            seen = bundle.listened_index.seen_candidates(user_id, podcast_ids)
+            if not seen.size:
+                seen = None
+        
+        # Known users: O(k) lookup trong precomputed table; cold users (hoặc table chưa sẵn sàng) score online
+        extra = len(seen) if seen is not None else 0
+        started = time.perf_counter()
+        fetch = num_recommendations + extra
+        if selected is not None and bundle.topk_table is not None:
+            # Filter: lấy cả K của table, giữ rows khớp mask; không đủ N thì score online trên subset
+            fetch = max(fetch, bundle.topk_table.k)
+        precomputed = self.lookup_topk(bundle, user_id, fetch, podcast_ids)
+        if precomputed is None:
+            return seen, None
+        top_indices, top_scores = precomputed
+        keep = None
+        if seen is not None:
+            # Over-fetch đủ số podcasts đã nghe rồi bỏ chúng đi
+            keep = ~np.isin(top_indices, seen)
+        if selected is not None:
+            keep = selected[top_indices] if keep is None else keep & selected[top_indices]
+            if np.count_nonzero(keep) < num_recommendations and len(top_indices) < len(podcast_ids):
+                return seen, None
+        if keep is not None:
+            top_indices = top_indices[keep][:num_recommendations]
+            top_scores = np.asarray(top_scores)[keep][:num_recommendations].tolist()
+        STAGE_SECONDS.observe(time.perf_counter() - started, 'topk')
+        return seen, (top_indices.tolist(), top_scores)
+    
+    @staticmethod
+    def ann_candidates(
+        bundle: ModelBundle,
+        user_id: str,
+        podcast_ids: Sequence[str],
+        n: int,
+        selected: Optional[np.ndarray] = None
+    ) -> Optional[np.ndarray]:
+        """Candidate rows cho exact re-ranking từ ANN index (shortlist + podcasts chưa có trong index);
+        None = score mọi candidate (chưa có index, hoặc user không có vector: cold path)"""
+        index = bundle.ann_index
+        if index is None:
+            return None
+        user_row = bundle.overlay.projection(user_id) if bundle.overlay is not None else None
+        if user_row is None:
+            user_index = bundle.scoring_engine.user2idx.get(user_id)
+            if user_index is None or not 0 <= user_index < bundle.model.num_users:
+                return None
+            user_row = bundle.model.user_projection[user_index]
+        user_rows = np.asarray(user_row, dtype=np.float32)[None, :]
+        started = time.perf_counter()
+        rows = index.search(lambda vectors: bundle.model.score_rows(user_rows, vectors)[0],
+                            podcast_ids, ANN_NPROBE, max(ANN_SHORTLIST, 4 * n), selected)
+        STAGE_SECONDS.observe(time.perf_counter() - started, 'ann_search')
+        return rows
+    
+    @staticmethod
+    def rank_scores(
+        scores: np.ndarray,
+        num_recommendations: int,
+        seen: Optional[np.ndarray],
+        rows: Optional[np.ndarray] = None
+    ) -> Tuple[List[int], List[float]]:
+        """Top N của raw scores (ratings được round như response), podcasts đã nghe bị loại.
+        
+        `rows`: scores chỉ cho các candidate rows này (filtered subset, sorted); kết quả vẫn là candidate rows.
+        """
+        started = time.perf_counter()
+        scores = np.round(scores, 2)
+        if seen is not None and rows is not None:
+            # Candidate rows đã nghe -> vị trí trong subset
+            positions = np.searchsorted(rows, seen)
+            positions = positions[positions < len(rows)]
+            seen = positions[np.isin(rows[positions], seen)]
+        if seen is not None:
+            scores[seen] = -np.inf
+        top_indices = top_k_indices(scores, num_recommendations)
+        if seen is not None:
+            top_indices = top_indices[np.isfinite(scores[top_indices])]
+        top_scores = scores[top_indices].tolist()
+        if rows is not None:
+            top_indices = rows[top_indices]
+        STAGE_SECONDS.observe(time.perf_counter() - started, 'topk')
+        return top_indices.tolist(), top_scores
+    
+    def fragments_for(self, candidates_store: CatalogStore, podcast_ids: Sequence[str]) -> PodcastFragments:
+        """Pre-encoded podcast JSON cho candidates của snapshot hiện tại (mỗi snapshot một bộ)"""
+        cached = self._fragments
+        if cached is not None and cached[0] is candidates_store:
+            return cached[1]
+        
+        def row_payload(i: int) -> Dict[str, Any]:
+            # Pydantic validate + alias mapping một lần cho mỗi podcast, không phải mỗi request
+            return PodcastRecommendation(
+                **self.podcast_fields(candidates_store, podcast_ids, i),
+                predicted_rating=0.0
+            ).model_dump(by_alias=True)
+        
+        fragments = PodcastFragments(row_payload, len(podcast_ids))
+        self._fragments = (candidates_store, fragments)
+        return fragments
+    
+    @staticmethod
+    def lookup_topk(bundle: ModelBundle, user_id: str, n: int, podcast_ids: Sequence[str]) -> Optional[Tuple[np.ndarray, List[float]]]:
+        table = bundle.topk_table
+        if table is None:
+            return None
+        user_index = bundle.scoring_engine.user2idx.get(user_id)
+        if user_index is None:
+            return None
+        if bundle.overlay is not None and bundle.overlay.projection(user_id) is not None:
+            return None  # vector đã fold-in từ interactions mới hơn table
+        return table.lookup(user_index, n, podcast_ids)
+    
+    def schedule_topk_precompute(self) -> None:
+        """Rebuild top-K tables ở background (single-flight; chạy lại nếu có thay đổi trong lúc build)"""
+        if TOPK_PRECOMPUTE_K <= 0:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return  # chưa có event loop (startup); catalog publish đầu tiên sẽ trigger
+        if self._topk_task is not None and not self._topk_task.done():
+            self._topk_dirty = True
+            return
+        self._topk_task = asyncio.ensure_future(self._run_topk_precompute())
+    
+    def follow_shared_topk(self) -> None:
+        """Follower: dùng top-K tables leader đã publish cho cùng model fingerprint"""
+        snapshot = self.catalog.snapshot
+        for bundle in self.model_registry.bundles():
+            latest = self.shared.latest_topk(bundle.fingerprint)
+            table = bundle.topk_table
+            if latest is not None and (table is None or table.directory != latest):
+                try:
+                    table = TopKTable.load(latest)
+                except (OSError, ValueError) as e:
+                    logger.warning(f"⚠️ Shared top-K table not readable yet: {e}")
+                    continue
+                bundle.topk_table = table
+            # Cùng catalog -> dùng chung tuple của snapshot để lookup so sánh bằng identity
+            if (table is not None and snapshot is not None and table.podcast_ids is not snapshot.podcast_ids
+                    and table.podcast_ids == snapshot.podcast_ids):
+                table.podcast_ids = snapshot.podcast_ids
+    
+    async def _run_topk_precompute(self) -> None:
+        if self.shared is not None and not self.shared.is_leader:
+            self.follow_shared_topk()
+            return
+        loop = asyncio.get_running_loop()
+        directory = TOPK_DIR / str(os.getpid())
+        while True:
+            self._topk_dirty = False
+            snapshot = self.catalog.snapshot
+            if snapshot is None or len(snapshot) == 0:
+                return
+            bundles = self.model_registry.bundles()
+            for bundle in bundles:
+                table = bundle.topk_table
+                if table is not None and table.catalog_version == snapshot.version:
+                    continue
+                if self.shared is not None:
+                    # Một table cho mọi workers, theo model fingerprint (generation là per-process)
+                    table_dir = self.shared.new_topk_dir(bundle.fingerprint)
+                else:
+                    table_dir = directory / f"gen-{bundle.generation}"
+                try:
+                    bundle.topk_table = await loop.run_in_executor(
+                        None, build_topk_table,
+                        bundle.scoring_engine, snapshot.podcast_ids, bundle.encode_podcasts(snapshot.podcast_ids),
+                        snapshot.version, bundle.generation, table_dir,
+                        TOPK_PRECOMPUTE_K, TOPK_PRECOMPUTE_WORKERS, BATCH_SCORE_CELLS
+                    )
+                    if self.shared is not None:
+                        self.shared.commit_topk(bundle.fingerprint, table_dir)
+                except Exception as e:
+                    logger.error(f"❌ Top-K precompute failed for model gen {bundle.generation}, scoring online: {e}")
+            # Tables của bundles đã bị swap ra (mmap đang mở vẫn đọc được sau unlink)
+            if self.shared is not None:
+                self.shared.prune_topk({bundle.fingerprint for bundle in bundles})
+            elif directory.exists():
+                live = {f"gen-{bundle.generation}" for bundle in bundles}
+                for stale in directory.iterdir():
+                    if stale.name not in live:
+                        shutil.rmtree(stale, ignore_errors=True)
+            if not self._topk_dirty:
+                return
+    
+    def schedule_similar_refresh(self) -> None:
+        """Cập nhật neighbor tables ở background (single-flight, như top-K precompute)"""
+        if SIMILAR_NEIGHBORS <= 0:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if self._similar_task is not None and not self._similar_task.done():
+            self._similar_dirty = True
+            return
+        self._similar_task = asyncio.ensure_future(self._run_similar_refresh())
+    
+    async def _run_similar_refresh(self) -> None:
+        loop = asyncio.get_running_loop()
+        directory = SIMILAR_DIR / str(os.getpid())
+        while True:
+            self._similar_dirty = False
+            snapshot = self.catalog.snapshot
+            if snapshot is None or len(snapshot) == 0:
+                return
+            bundles = self.model_registry.bundles()
+            for bundle in bundles:
+                table = bundle.neighbor_table
+                if table is not None and table.catalog_version == snapshot.version:
+                    continue
+                try:
+                    bundle.neighbor_table = await loop.run_in_executor(
+                        None, self.refresh_neighbor_table, bundle, snapshot, directory / f"gen-{bundle.generation}"
+                    )
+                except Exception as e:
+                    logger.error(f"❌ Similar podcasts refresh failed for model gen {bundle.generation}: {e}")
+            if directory.exists():
+                live = {f"gen-{bundle.generation}" for bundle in bundles}
+                for stale in directory.iterdir():
+                    if stale.name not in live:
+                        shutil.rmtree(stale, ignore_errors=True)
+            if not self._similar_dirty:
+                return
+    
+    def schedule_ann_refresh(self) -> None:
+        """Build / cập nhật ANN indexes ở background (single-flight, như similar-podcasts refresh)"""
+        if ANN_NPROBE <= 0:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if self._ann_task is not None and not self._ann_task.done():
+            self._ann_dirty = True
+            return
+        self._ann_task = asyncio.ensure_future(self._run_ann_refresh())
+    
+    async def _run_ann_refresh(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self._ann_dirty = False
+            snapshot = self.catalog.snapshot
+            if snapshot is None or len(snapshot) == 0:
+                return
+            for bundle in self.model_registry.bundles():
+                index = bundle.ann_index
+                if bundle.model is None or (index is not None and index.catalog_version == snapshot.version):
+                    continue
+                try:
+                    bundle.ann_index = await loop.run_in_executor(None, self.refresh_ann_index, bundle, snapshot)
+                except Exception as e:
+                    logger.error(f"❌ ANN index refresh failed for model gen {bundle.generation}, scoring exactly: {e}")
+            if not self._ann_dirty:
+                return
+    
+    @staticmethod
+    def refresh_ann_index(bundle: ModelBundle, snapshot: CatalogSnapshot) -> Optional[AnnIndex]:
+        """Thêm known podcasts mới của catalog vào index hiện có; build lại toàn bộ lần đầu, hoặc khi
+        phần lớn index là podcasts đã bị xoá khỏi catalog (blocking, chạy trong executor)
+        """
+        podcast_ids = snapshot.podcast_ids
+        podcast_idx = bundle.encode_podcasts(podcast_ids)
+        model = bundle.model
+        # Chỉ podcasts có vector trong model; cold podcasts luôn được score exact (content-based)
+        known = (podcast_idx >= 0) & (podcast_idx < model.num_podcasts)
+        if np.count_nonzero(known) < ANN_MIN_PODCASTS:
+            return None
+        index = bundle.ann_index
+        if index is None or np.count_nonzero(index.catalog_rows(podcast_ids)[0] >= 0) < ANN_MIN_LIVE_FRACTION * index.num_items:
+            rows = np.flatnonzero(known)
+            index = build_ann_index([podcast_ids[i] for i in rows.tolist()], model.podcast_projection[podcast_idx[rows]],
+                                    bundle.generation, ANN_LISTS, ANN_QUANTIZATION)
+        else:
+            new_rows = index.catalog_rows(podcast_ids)[1]
+            new_rows = new_rows[known[new_rows]]
+            if new_rows.size:
+                index = index.add([podcast_ids[i] for i in new_rows.tolist()], model.podcast_projection[podcast_idx[new_rows]])
+                logger.info(f"🗂️ Added {new_rows.size} podcasts to ANN index in {index.duration_seconds:.3f}s")
+        index = index.with_catalog_version(snapshot.version)
+        index.catalog_rows(podcast_ids)  # warm live-catalog mapping trước request đầu tiên
+        return index
+    
+    @staticmethod
+    def refresh_neighbor_table(bundle: ModelBundle, snapshot: CatalogSnapshot, directory: Path) -> NeighborTable:
+        """Thêm podcasts mới của catalog vào table hiện có; build lại toàn bộ lần đầu,
+        hoặc khi phần lớn table là podcasts đã bị xoá khỏi catalog (blocking, chạy trong executor)
+        """
+        table = bundle.neighbor_table
+        podcast_ids = snapshot.podcast_ids
+        target = min(SIMILAR_NEIGHBORS, len(podcast_ids) - 1)
+        if (table is None or table.n < target
+                or np.count_nonzero(table.catalog_rows(podcast_ids) >= 0) < SIMILAR_MIN_LIVE_FRACTION * table.num_podcasts):
+            table = build_neighbor_table(podcast_ids, bundle.podcast_vectors(podcast_ids),
+                                         bundle.generation, SIMILAR_NEIGHBORS, BATCH_SCORE_CELLS)
+        else:
+            new_rows = [i for i, pid in enumerate(podcast_ids) if pid not in table.rows]
+            if new_rows:
+                new_ids = [podcast_ids[i] for i in new_rows]
+                vectors = bundle.podcast_vectors(new_ids)
+                table = table.add(new_ids, vectors, BATCH_SCORE_CELLS)
+                logger.info(f"🧭 Added {len(new_ids)} podcasts to similar-podcasts table in {table.duration_seconds:.3f}s")
+        
+        if table is bundle.neighbor_table:
+            table = table.with_catalog_version(snapshot.version)
+        else:
+            table.catalog_version = snapshot.version
+            table_dir = directory / str(time.time_ns())
+            table.save(table_dir)
+            table = NeighborTable.load(table_dir)
+            for stale in directory.iterdir():
+                if stale != table_dir:
+                    shutil.rmtree(stale, ignore_errors=True)  # mmap đang mở vẫn đọc được sau unlink
+        table.catalog_rows(podcast_ids)  # warm live-catalog mapping trước request đầu tiên
+        return table
+    
+    async def recommendations_fragment(
+        self,
+        user_id: str,
+        num_recommendations: int,
+        include_listened: bool = True,
+        filters: Optional[CandidateFilter] = None
+    ) -> bytes:
+        """Serialized `"recommendations":[...],"totalCount":N` cho user, qua result cache.
+        
+        Cache hit bỏ qua cả scoring lẫn pydantic; key chứa catalog version, model generation,
+        số podcasts đã nghe và interaction log version của user nên refresh, reload hay
+        interaction mới không cần xoá entries. `filters` được áp dụng trên filter index của
+        snapshot trước khi score (chỉ các candidates khớp filter được score).
+        """
+        snapshot = await self.current_snapshot()
+        # Chọn bundle một lần: request này chạy xong trên bundle đó dù có swap giữa chừng
+        bundle = self.model_registry.select(user_id)
+        listened = None if include_listened else bundle.listened_index.count(user_id)
+        key = (user_id, num_recommendations, snapshot.version, bundle.generation, listened,
+               self.interactions.version(user_id), filters)
+        fragment = self.result_cache.get(key)
+        if fragment is not None:
+            return fragment
+        
+        candidates_store, podcast_ids = self.snapshot_candidates(snapshot)
+        selected = None
+        if filters is not None:
+            started = time.perf_counter()
+            selected = snapshot.filter_index.select(filters)
+            STAGE_SECONDS.observe(time.perf_counter() - started, 'candidate_filter')
+        # Cache hits không tính vào admission limit; pool đầy -> shed ngay thay vì xếp hàng
+        try:
+            with self.scoring_pool.admit():
+                top_indices, top_scores = await self.rank_recommendations(
+                    bundle, user_id, num_recommendations, podcast_ids, include_listened, selected
+                )
+        except OverloadedError as e:
+            raise HTTPException(status_code=503, detail="Recommendation service is overloaded, retry later",
+                                headers={"Retry-After": str(math.ceil(e.retry_after))})
+        started = time.perf_counter()
+        fragments = self.fragments_for(candidates_store, podcast_ids)
+        fragment = (
+            b'"recommendations":' + fragments.array(top_indices, top_scores) +
+            b',"totalCount":' + str(len(top_indices)).encode('ascii')
+        )
+        STAGE_SECONDS.observe(time.perf_counter() - started, 'serialize')
+        self.result_cache.put(key, fragment)
+        return fragment
+    
+    async def get_candidates(self) -> Tuple[CatalogStore, Sequence[str]]:
+        """GUID candidates của catalog hiện tại; 404 nếu không có real podcasts"""
+        return self.snapshot_candidates(await self.current_snapshot())
+    
+    @staticmethod
+    def snapshot_candidates(snapshot: CatalogSnapshot) -> Tuple[CatalogStore, Sequence[str]]:
+        return snapshot.candidates, snapshot.podcast_ids
+    
+    async def current_snapshot(self) -> CatalogSnapshot:
+        """Catalog snapshot hiện tại; 500 nếu model chưa load, 404 nếu không có real podcasts"""
         if not self.is_loaded:
             raise HTTPException(status_code=500, detail="Model service not loaded")
         
-        # Lấy danh sách podcasts thật (có cache để tránh fallback nhầm)
-        real_podcasts_df = await self.get_real_podcasts_cached()
-
-        # Chỉ cho phép GUIDs (loại bỏ p_00xxx)
-        def is_guid(s: Any) -> bool:
-            try:
-                import re
-                return bool(re.match(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$", str(s)))
-            except Exception:
-                return False
-
-        if real_podcasts_df is not None and not real_podcasts_df.empty:
-            candidate_podcasts_df = real_podcasts_df[real_podcasts_df['podcast_id'].apply(is_guid)].copy()
-            logger.info(f"🎯 Filtered real podcasts to GUIDs: {len(candidate_podcasts_df)} rows")
-        else:
-            candidate_podcasts_df = pd.DataFrame()
+        # Snapshot hiện tại (không chờ refresh, trừ lần fetch đầu tiên)
+        snapshot = await self.catalog.get_snapshot()
 
         # Không fallback training ở môi trường này để đảm bảo ID thật
-        if candidate_podcasts_df.empty:
+        if snapshot is None or len(snapshot) == 0:
             logger.error("❌ No real podcasts available (GUID). Refusing to fallback to training data.")
             raise HTTPException(status_code=404, detail="No real podcasts available")
         
-        # Generate scores cho tất cả podcasts
-        recommendations = []
+        return snapshot
+    
+    @staticmethod
+    def podcast_fields(candidates_store: CatalogStore, podcast_ids: Sequence[str], i: int) -> Dict[str, Any]:
+        """PodcastRecommendation fields (trừ predicted_rating) cho candidate row i, đọc thẳng từ columns"""
+        podcast_id = podcast_ids[i]
+        return dict(
+            podcast_id=podcast_id,
+            title=candidates_store.value('title', i, f'Podcast {podcast_id}'),
+            category=candidates_store.value('category', i, 'Unknown'),
+            topics=candidates_store.value('topics', i, candidates_store.value('description', i, 'Unknown')),
+            duration_minutes=candidates_store.duration_minutes(i),
+            content_url=candidates_store.value('content_url', i, candidates_store.value('url', i))
+        )
+    
+    def iter_batch_recommendations(
+        self,
+        user_ids: List[str],
+        limit: int,
+        candidates: Tuple[CatalogStore, Sequence[str]],
+        include_listened: bool = True
+    ) -> Iterator[Tuple[str, bytes, int]]:
+        """Yield (user_id, recommendations JSON array, count) cho từng user.
         
-        for _, podcast in candidate_podcasts_df.iterrows():
-            podcast_id = str(podcast['podcast_id'])
-            
-            # Calculate similarity score
-            predicted_rating = self.calculate_similarity_score(user_id, podcast_id)
+        Users được score theo block (users x podcasts) bằng một matrix operation
+        + per-row top-k; podcast JSON lấy từ pre-encoded fragments của snapshot.
+        Khi có canary, mỗi block được chia theo bundle mà user được route tới.
+        include_listened=False set score của podcasts đã nghe về -inf trước top-k.
+        """
+        candidates_store, podcast_ids = candidates
+        users_per_block = max(1, BATCH_SCORE_CELLS // len(podcast_ids))
+        fragments = self.fragments_for(candidates_store, podcast_ids)
+        
+        for start in range(0, len(user_ids), users_per_block):
+            block_users = user_ids[start:start + users_per_block]
+            groups = {}  # type: Dict[ModelBundle, List[str]]
+            for user_id in block_users:
+                groups.setdefault(self.model_registry.select(user_id), []).append(user_id)
             
-            recommendation = PodcastRecommendation(
-                podcast_id=podcast_id,
-                title=podcast.get('title', f'Podcast {podcast_id}'),
-                predicted_rating=round(predicted_rating, 2),
-                category=podcast.get('category', 'Unknown'),
-                topics=podcast.get('topics', podcast.get('description', 'Unknown')),
-                duration_minutes=int(podcast.get('duration_minutes', 0)) if pd.notna(podcast.get('duration_minutes')) else None,
-                content_url=podcast.get('content_url', podcast.get('url'))
-            )
+            ranked = {}  # type: Dict[str, Tuple[List[int], List[float]]]
+            for bundle, group_users in groups.items():
+                podcast_idx = bundle.encode_podcasts(podcast_ids)
+                scores = np.round(bundle.scoring_engine.score_users(group_users, podcast_ids, podcast_idx), 2)
+                masked = False
+                if not include_listened:
+                    seen_rows, seen_cols = bundle.listened_index.seen_candidates_many(group_users, podcast_ids)
+                    scores[seen_rows, seen_cols] = -np.inf
+                    masked = seen_rows.size > 0
+                top = top_k_rows(scores, limit)
+                top_scores = np.take_along_axis(scores, top, axis=1)
+                if masked:
+                    # Catalog ít hơn limit podcasts chưa nghe -> row có -inf ở cuối
+                    finite = np.isfinite(top_scores)
+                    for row, user_id in enumerate(group_users):
+                        ranked[user_id] = (top[row][finite[row]].tolist(), top_scores[row][finite[row]].tolist())
+                else:
+                    top_scores = top_scores.tolist()
+                    for row, user_id in enumerate(group_users):
+                        ranked[user_id] = (top[row].tolist(), top_scores[row])
             
-            recommendations.append(recommendation)
-        
-        # Sort by predicted rating
-        recommendations.sort(key=lambda x: x.predicted_rating, reverse=True)
-        
-        # Return top N
-        top_recommendations = recommendations[:num_recommendations]
-        
-        logger.info(f"✅ Generated {len(top_recommendations)} recommendations for user {user_id}")
-        
-        return top_recommendations
+            for user_id in block_users:
+                top_indices, top_scores = ranked[user_id]
+                yield user_id, fragments.array(top_indices, top_scores), len(top_scores)
 
 # Initialize service
 recommendation_service = RecommendationService()
@@ -441,50 +1482,139 @@ recommendation_service = RecommendationService()
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
     """Health check endpoint"""
+    bundle = recommendation_service.model_registry.active
+    catalog = recommendation_service.catalog
+    snapshot = catalog.snapshot
+    restored = recommendation_service.catalog_file
     return HealthResponse(
         status="healthy" if recommendation_service.is_loaded else "unhealthy",
         service="podcast-recommendation-fastapi",
         model_loaded=recommendation_service.is_loaded,
-        timestamp=datetime.now().isoformat()
+        timestamp=datetime.now().isoformat(),
+        model_version=bundle.version if bundle is not None else None,
+        model_loaded_at=datetime.fromtimestamp(bundle.loaded_at).isoformat() if bundle is not None else None,
+        catalog_version=snapshot.version if snapshot is not None else None,
+        catalog_age_seconds=round(snapshot.age_seconds, 1) if snapshot is not None else None,
+        catalog_stale=catalog.is_stale,
+        catalog_source=(None if snapshot is None else "snapshot_file"
+                        if restored is not None and snapshot.store is restored.store else "contentservice")
     )
 
 @app.get("/model/info")
 async def get_model_info():
     """Get model information"""
-    if not recommendation_service.is_loaded:
+    bundle = recommendation_service.model_registry.active
+    if bundle is None:
         raise HTTPException(status_code=500, detail="Model service not loaded")
+    snapshot = recommendation_service.catalog.snapshot
+    filter_index = snapshot.filter_index if snapshot is not None else None
     
     return {
         "success": True,
         "data": {
-            "model_info": recommendation_service.metadata.get('model_info', {}),
-            "data_statistics": recommendation_service.metadata.get('data_statistics', {}),
-            "performance_metrics": recommendation_service.metadata.get('performance_metrics', {}),
+            "model_info": bundle.metadata.get('model_info', {}),
+            "data_statistics": bundle.metadata.get('data_statistics', {}),
+            "performance_metrics": bundle.metadata.get('performance_metrics', {}),
             "service_info": {
                 "framework": "FastAPI",
                 "model_type": "Collaborative Filtering (Kaggle trained)",
+                "inference": "numpy" if bundle.model is not None else "simulated",
+                "precomputed_topk": bundle.topk_table.stats() if bundle.topk_table else None,
+                "worker": {
+                    "pid": os.getpid(),
+                    "role": recommendation_service.shared.role if recommendation_service.shared else "single"
+                },
                 "integration": "Real database + Training patterns"
             },
-            "loaded_at": datetime.now().isoformat()
+            "model_registry": recommendation_service.model_registry.status(),
+            "listened_index": bundle.listened_index.stats(),
+            "similar_podcasts": bundle.neighbor_table.stats() if bundle.neighbor_table else None,
+            "ann_index": dict(bundle.ann_index.stats(), nprobe=ANN_NPROBE) if bundle.ann_index else None,
+            "content_index": recommendation_service.content_index.stats(),
+            "interactions": dict(recommendation_service.interactions.stats(),
+                                 **recommendation_service.interaction_consumer.stats()),
+            "user_overlay": bundle.overlay.stats() if bundle.overlay is not None else None,
+            "micro_batcher": recommendation_service.micro_batcher.stats() if recommendation_service.micro_batcher else None,
+            "scoring_pool": recommendation_service.scoring_pool.stats(),
+            "filter_index": filter_index.stats() if filter_index is not None else None,
+            "loaded_at": datetime.fromtimestamp(bundle.loaded_at).isoformat()
         }
     }
 
+def require_admin(x_admin_token: Optional[str] = Header(default=None)) -> None:
+    """X-Admin-Token phải khớp ADMIN_TOKEN; không cấu hình token thì admin endpoints bị tắt"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN is not set)")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+def resolve_model_dir(model_dir: Optional[str]) -> Optional[Path]:
+    """model_dir của reload request, chỉ cho phép MODEL_DIR hoặc thư mục con của nó
+    (bundle files được unpickle nên không load từ path tuỳ ý)"""
+    if not model_dir:
+        return None
+    root = recommendation_service.model_dir.resolve()
+    path = Path(model_dir).resolve()
+    if path != root and root not in path.parents:
+        raise HTTPException(status_code=400, detail=f"model_dir must be inside {root}")
+    return path
+
+@app.post("/admin/model/reload", dependencies=[Depends(require_admin)])
+async def reload_model(request: Optional[ModelReloadRequest] = None):
+    """Load model bundle (mặc định ./models) ở background, validate + warm-up rồi swap vào.
+    
+    trafficPercent < 100 chạy bundle mới song song làm canary cho một phần users.
+    Bundle lỗi bị reject (422), model hiện tại tiếp tục phục vụ.
+    """
+    request = request or ModelReloadRequest()
+    model_dir = resolve_model_dir(request.model_dir)
+    try:
+        await recommendation_service.model_registry.reload(
+            model_dir,
+            request.traffic_percent
+        )
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f"Model reload failed: {str(e)}")
+    return {"success": True, "data": recommendation_service.model_registry.status()}
+
+@app.post("/admin/model/promote", dependencies=[Depends(require_admin)])
+async def promote_model():
+    """Canary -> active cho 100% traffic"""
+    try:
+        recommendation_service.model_registry.promote()
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"success": True, "data": recommendation_service.model_registry.status()}
+
+@app.post("/admin/model/rollback", dependencies=[Depends(require_admin)])
+async def rollback_model():
+    """Bỏ canary, toàn bộ traffic về model active"""
+    recommendation_service.model_registry.rollback()
+    return {"success": True, "data": recommendation_service.model_registry.status()}
+
 @app.post("/recommendations", response_model=RecommendationResponse, response_model_by_alias=True)
 async def get_recommendations(request: UserRecommendationRequest):
     """Get podcast recommendations cho user"""
     
     try:
-        recommendations = await recommendation_service.generate_recommendations(
+        filters = request.candidate_filter()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        fragment = await recommendation_service.recommendations_fragment(
             user_id=request.user_id,
-            num_recommendations=request.num_recommendations
+            num_recommendations=request.num_recommendations,
+            include_listened=request.include_listened,
+            filters=filters
         )
         
-        return RecommendationResponse(
-            user_id=request.user_id,
-            recommendations=recommendations,
-            total_count=len(recommendations),
-            timestamp=datetime.now().isoformat()
+        # Cùng bytes như RecommendationResponse(by_alias) qua JSONResponse, chỉ timestamp là mới
+        body = (
+            b'{"userId":' + encode_json(request.user_id) + b',' + fragment +
+            b',"timestamp":' + encode_json(datetime.now().isoformat()) + b'}'
         )
+        return Response(content=body, media_type="application/json")
         
     except HTTPException:
         raise
@@ -492,20 +1622,133 @@ async def get_recommendations(request: UserRecommendationRequest):
         logger.error(f"❌ Recommendation error: {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+@app.post("/recommendations/batch")
+async def get_batch_recommendations(request: BatchRecommendationRequest):
+    """Batch recommendations cho nhiều users (nightly email / push jobs).
+    
+    Catalog được fetch một lần; kết quả được stream về theo từng user với format
+    {"batchResults": {userId: RecommendationResponse}, "totalUsers", "generatedAt"}.
+    include_listened=false loại các podcasts user đã nghe.
+    """
+    # Giữ thứ tự, bỏ duplicate/empty IDs
+    user_ids = list(dict.fromkeys(uid for uid in request.user_ids if uid and uid.strip()))
+    if not user_ids:
+        raise HTTPException(status_code=400, detail="No valid user IDs provided")
+    
+    candidates = await recommendation_service.get_candidates()
+    timestamp = datetime.now().isoformat()
+    encoded_timestamp = encode_json(timestamp)
+    
+    # Một admission slot cho cả batch, giữ tới khi stream xong; pool đầy -> 503 như single-user requests
+    pool = recommendation_service.scoring_pool
+    try:
+        release = pool.acquire()
+    except OverloadedError as e:
+        raise HTTPException(status_code=503, detail="Recommendation service is overloaded, retry later",
+                            headers={"Retry-After": str(math.ceil(e.retry_after))})
+    
+    async def stream() -> AsyncIterator[bytes]:
+        try:
+            yield b'{"batchResults":{'
+            results = recommendation_service.iter_batch_recommendations(
+                user_ids, request.limit, candidates, request.include_listened
+            )
+            n = 0
+            while True:
+                # Scoring chạy trên scoring pool theo chunk, không trên threadpool của Starlette
+                chunk = await pool.run(lambda: list(itertools.islice(results, BATCH_STREAM_USERS)))
+                if not chunk:
+                    break
+                parts = []
+                for user_id, recommendations, count in chunk:
+                    encoded_user = encode_json(user_id)
+                    parts.append(
+                        (b',' if n else b'') + encoded_user + b':{"userId":' + encoded_user +
+                        b',"recommendations":' + recommendations +
+                        b',"totalCount":' + str(count).encode('ascii') +
+                        b',"timestamp":' + encoded_timestamp + b'}'
+                    )
+                    n += 1
+                yield b''.join(parts)
+            yield b'},"totalUsers":' + str(len(user_ids)).encode('ascii') + b',"generatedAt":' + encoded_timestamp + b'}'
+        finally:
+            release()
+    
+    logger.info(f"📦 Streaming batch recommendations for {len(user_ids)} users")
+    # background: nhả slot cả khi client ngắt kết nối trước khi stream bắt đầu
+    return StreamingResponse(stream(), media_type="application/json", background=BackgroundTask(release))
+
 @app.get("/recommendations/{user_id}", response_model=RecommendationResponse, response_model_by_alias=True)
 async def get_user_recommendations(
     user_id: str,
-    num_recommendations: int = Query(default=5, ge=1, le=20)
+    num_recommendations: int = Query(default=5, ge=1, le=20),
+    include_listened: bool = Query(default=False),
+    categories: Optional[List[str]] = Query(default=None, description="Lặp lại hoặc comma-separated; match category hoặc "
+                                            "topicCategories / emotionCategories (ví dụ MentalHealth, Mindfulness)"),
+    min_duration_minutes: Optional[float] = Query(default=None, ge=0),
+    max_duration_minutes: Optional[float] = Query(default=None, ge=0),
+    exclude_ids: Optional[List[str]] = Query(default=None)
 ):
-    """Get recommendations cho specific user (GET endpoint)"""
+    """Get recommendations cho specific user (GET endpoint)
+    
+    Ví dụ: ?categories=MentalHealth,Stress&max_duration_minutes=15&exclude_ids=<guid>
+    """
     
     request = UserRecommendationRequest(
         user_id=user_id,
-        num_recommendations=num_recommendations
+        num_recommendations=num_recommendations,
+        include_listened=include_listened,
+        categories=categories,
+        min_duration_minutes=min_duration_minutes,
+        max_duration_minutes=max_duration_minutes,
+        exclude_ids=exclude_ids
     )
     
     return await get_recommendations(request)
 
+@app.get("/users/{user_id}/listened", response_model=UserListenedResponse, response_model_by_alias=True)
+async def get_user_listened(
+    user_id: str,
+    limit: int = Query(default=100, ge=1, le=1000)
+):
+    """Podcasts user đã nghe (mới nhất trước); title / topic từ catalog hiện tại, fallback training data"""
+    bundle = recommendation_service.model_registry.select(user_id)
+    if bundle is None:
+        raise HTTPException(status_code=500, detail="Model service not loaded")
+    
+    snapshot = recommendation_service.catalog.snapshot
+    store, catalog_ids = (snapshot.candidates, snapshot.podcast_ids) if snapshot is not None else (CatalogStore.empty(), ())
+    podcast_ids, rows = bundle.listened_index.history(user_id, catalog_ids)
+    
+    items = []
+    for podcast_id, row in zip(reversed(podcast_ids), rows[::-1][:limit].tolist()):
+        if row >= 0:
+            fields = recommendation_service.podcast_fields(store, catalog_ids, row)
+            title, topic = fields['title'], fields['topics']
+        else:
+            training = bundle.training_podcast(podcast_id) or {}
+            title = training.get('title') or f'Podcast {podcast_id}'
+            topic = training.get('topics') or training.get('category') or 'Unknown'
+        items.append(ListenedPodcastItem(podcast_id=podcast_id, title=str(title), topic=str(topic)))
+    
+    return UserListenedResponse(user_id=user_id, listened_podcasts=items, total_listened=len(podcast_ids))
+
+@app.post("/interactions", status_code=202)
+async def track_interaction(request: InteractionEventRequest):
+    """Interaction event (view / click / like / skip / complete) của user với một podcast.
+    
+    Event được xử lý bất đồng bộ: listened history và user vector được cập nhật trong vài
+    giây, không cần retrain; 503 + Retry-After khi queue đầy.
+    """
+    await recommendation_service.submit_interactions([request.to_event()])
+    return {"success": True, "data": {"accepted": 1, "queue_depth": recommendation_service.interaction_consumer.depth}}
+
+@app.post("/interactions/batch", status_code=202)
+async def track_interactions(request: InteractionBatchRequest):
+    """Nhiều interaction events trong một request (cả batch được nhận hoặc bị từ chối)"""
+    await recommendation_service.submit_interactions([event.to_event() for event in request.events])
+    return {"success": True, "data": {"accepted": len(request.events), "queue_depth": recommendation_service.interaction_consumer.depth}}
+
 @app.get("/users/real")
 async def get_real_users():
     """Get danh sách real users từ UserService"""
@@ -523,25 +1766,82 @@ async def get_real_users():
         logger.error(f"❌ Get real users error: {e}")
         raise HTTPException(status_code=500, detail=f"Error fetching users: {str(e)}")
 
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """Hit/miss counters và memory usage của recommendation result cache"""
+    return {
+        "success": True,
+        "data": recommendation_service.result_cache.stats()
+    }
+
+@app.get("/upstream/stats")
+async def get_upstream_stats():
+    """Connection pool, circuit breaker và latency stats của upstream calls"""
+    return {
+        "success": True,
+        "data": recommendation_service.upstream.stats()
+    }
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus scrape endpoint: stage latency histograms, cache / upstream counters, catalog + model gauges"""
+    # Content-Type qua headers: media_type sẽ bị Starlette nối thêm một charset nữa
+    return Response(content=await recommendation_service.render_metrics(), headers={"Content-Type": METRICS_CONTENT_TYPE})
+
+@app.get("/podcasts/{podcast_id}/similar", response_model=SimilarPodcastsResponse, response_model_by_alias=True)
+async def get_similar_podcasts(
+    podcast_id: str,
+    limit: int = Query(default=10, ge=1, le=50)
+):
+    """Podcasts giống podcast_id nhất ("more like this"), từ precomputed neighbor table"""
+    snapshot = await recommendation_service.current_snapshot()
+    bundle = recommendation_service.model_registry.active
+    table = bundle.neighbor_table
+    if table is None:
+        raise HTTPException(status_code=503, detail="Similar podcasts index is not ready")
+    
+    candidates_store, podcast_ids = recommendation_service.snapshot_candidates(snapshot)
+    found = table.lookup(podcast_id, limit, podcast_ids)
+    if found is None:
+        if podcast_id not in candidates_store.id_to_row:
+            raise HTTPException(status_code=404, detail=f"Podcast {podcast_id} not found")
+        # Podcast có trong catalog nhưng chưa có vector (không có text / chưa vào table): không có neighbors
+        found = (np.empty(0, dtype=np.int64), [])
+    
+    rows, similarities = found
+    similar = [
+        SimilarPodcast(**recommendation_service.podcast_fields(candidates_store, podcast_ids, row), similarity=similarity)
+        for row, similarity in zip(rows.tolist(), similarities)
+    ]
+    return SimilarPodcastsResponse(
+        podcast_id=podcast_id,
+        similar_podcasts=similar,
+        total_count=len(similar),
+        timestamp=datetime.now().isoformat()
+    )
+
 @app.get("/podcasts/real")
 async def get_real_podcasts():
-    """Get danh sách real podcasts từ ContentService"""
+    """Get danh sách real podcasts từ ContentService (catalog snapshot hiện tại)"""
     try:
-        podcasts_df = await recommendation_service.get_real_podcasts()
+        snapshot = await recommendation_service.catalog.get_snapshot()
+        store = snapshot.store if snapshot is not None else CatalogStore.empty()
+        timestamp = datetime.now().isoformat()
         
-        if not podcasts_df.empty:
-            podcasts_list = podcasts_df.to_dict('records')
-        else:
-            podcasts_list = []
+        # Stream records thẳng từ catalog store theo chunk, không build list toàn bộ catalog
+        def stream() -> Iterator[bytes]:
+            yield b'{"success":true,"data":{"podcasts":['
+            parts = []
+            for n, record in enumerate(store.iter_records()):
+                parts.append(json.dumps(record, ensure_ascii=False, allow_nan=False, separators=(",", ":")))
+                if len(parts) == LISTING_CHUNK_RECORDS:
+                    yield (("," if n >= len(parts) else "") + ",".join(parts)).encode('utf-8')
+                    parts = []
+            if parts:
+                yield (("," if len(store) > len(parts) else "") + ",".join(parts)).encode('utf-8')
+            yield f'],"total_count":{len(store)},"timestamp":{json.dumps(timestamp)}}}}}'.encode('utf-8')
         
-        return {
-            "success": True,
-            "data": {
-                "podcasts": podcasts_list,
-                "total_count": len(podcasts_list),
-                "timestamp": datetime.now().isoformat()
-            }
-        }
+        return StreamingResponse(stream(), media_type="application/json")
     except Exception as e:
         logger.error(f"❌ Get real podcasts error: {e}")
         raise HTTPException(status_code=500, detail=f"Error fetching podcasts: {str(e)}")
@@ -0,0 +1,39 @@
+"""
+GUNICORN CONFIG - MULTI-WORKER SERVING
+    gunicorn -c gunicorn_conf.py fastapi_service:app
+
+- preload_app: model + mappings được load một lần trong master trước khi fork; workers đọc
+  chung các pages đó (copy-on-write; memory-mapped artifacts thì chung qua page cache)
+- WEB_CONCURRENCY > 1: SHARED_STATE_DIR (tmpfs) được bật để chỉ một worker fetch catalog
+  và precompute top-K, các workers khác đọc bản đã publish (xem shared_state.py)
+"""
+
+import gc
+import os
+import shutil
+import tempfile
+
+workers = int(os.getenv('WEB_CONCURRENCY', '1'))
+worker_class = 'uvicorn.workers.UvicornWorker'
+bind = os.getenv('BIND', '0.0.0.0:8000')
+preload_app = True
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+graceful_timeout = 30
+keepalive = 5
+
+_SHM_ROOT = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+if workers > 1:
+    # Config được load trong master trước khi preload app -> workers thừa hưởng qua env
+    os.environ.setdefault('SHARED_STATE_DIR', os.path.join(_SHM_ROOT, f'podcast-recommendation-{os.getpid()}'))
+
+
+def pre_fork(server, worker):
+    # Objects tạo lúc preload sống suốt process: đưa ra khỏi GC để collector của worker
+    # không ghi vào (và copy) các pages dùng chung
+    gc.freeze()
+
+
+def on_exit(server):
+    shared_dir = os.environ.get('SHARED_STATE_DIR')
+    if shared_dir and os.path.basename(shared_dir) == f'podcast-recommendation-{os.getpid()}':
+        shutil.rmtree(shared_dir, ignore_errors=True)
@@ -0,0 +1,412 @@
+"""
+INTERACTION EVENTS + USER-VECTOR OVERLAY
+Events cùng shape với RecommendationInteraction entity (.NET) đi qua một in-process queue (thay cho
+message broker): mỗi event được ghi vào interaction log, append vào listened history và fold user
+vào embedding space của model (podcast embeddings giữ nguyên) bằng một regularized least-squares
+solve nhỏ. Vector mới nằm trong overlay mà ScoringEngine đọc trước user embeddings đã train.
+"""
+
+import asyncio
+import io
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ncf_model import NCFModel
+from shared_state import write_atomic
+
+logger = logging.getLogger(__name__)
+
+# Implicit rating của từng InteractionType khi event không có ActualRating
+INTERACTION_RATINGS = {
+    "complete": 5.0,
+    "like": 5.0,
+    "click": 4.0,
+    "view": 3.5,
+    "skip": 1.5,
+}
+# Các types được tính là "đã nghe" (listened history, loại khỏi recommendations)
+LISTENED_TYPES = frozenset({"view", "click", "like", "complete"})
+
+# Mỗi user giữ ratings của tối đa N podcasts gần nhất (fold-in là O(N) mỗi event)
+MAX_PODCASTS_PER_USER = 100
+
+RATING_MIN, RATING_MAX = 1.0, 5.0
+
+
+@dataclass(frozen=True)
+class InteractionEvent:
+    user_id: str
+    podcast_id: str
+    interaction_type: str
+    interaction_at: float  # epoch seconds
+    actual_rating: Optional[float] = None
+
+    @property
+    def rating(self) -> float:
+        if self.actual_rating is not None:
+            return min(max(float(self.actual_rating), RATING_MIN), RATING_MAX)
+        return INTERACTION_RATINGS[self.interaction_type]
+
+    @property
+    def listened(self) -> bool:
+        return self.interaction_type in LISTENED_TYPES
+
+
+def encode_events(events: Sequence[InteractionEvent]) -> bytes:
+    """JSON lines (shared event log giữa các workers)"""
+    return b''.join(json.dumps(asdict(event), separators=(",", ":")).encode('utf-8') + b'\n' for event in events)
+
+
+def decode_events(lines: Sequence[bytes]) -> List[InteractionEvent]:
+    events = []
+    for line in lines:
+        try:
+            event = InteractionEvent(**json.loads(line))
+        except (ValueError, TypeError) as e:
+            logger.warning(f"⚠️ Skipping malformed interaction event: {e}")
+            continue
+        if event.interaction_type in INTERACTION_RATINGS:
+            events.append(event)
+    return events
+
+
+class InteractionLog:
+    """Ratings gần nhất theo user (podcast -> (rating, listened)), event mới nhất của một podcast thắng.
+
+    `version(user_id)` tăng mỗi event của user: overlay và result cache dùng nó để biết vector /
+    kết quả cũ đã stale mà không cần invalidate.
+    """
+
+    def __init__(self, max_podcasts_per_user: int = MAX_PODCASTS_PER_USER):
+        self.max_podcasts_per_user = max_podcasts_per_user
+        self._users = {}        # type: Dict[str, OrderedDict]
+        self._versions = {}     # type: Dict[str, int]
+        self._lock = threading.Lock()
+        self.revision = 0       # tăng mỗi event (snapshot chỉ ghi khi đổi)
+        self.events = 0
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def version(self, user_id: str) -> int:
+        return self._versions.get(user_id, 0)
+
+    def record(self, event: InteractionEvent) -> int:
+        with self._lock:
+            podcasts = self._users.get(event.user_id)
+            if podcasts is None:
+                podcasts = self._users[event.user_id] = OrderedDict()
+            previous = podcasts.pop(event.podcast_id, None)
+            listened = event.listened or (previous is not None and previous[1])
+            podcasts[event.podcast_id] = (event.rating, listened)
+            while len(podcasts) > self.max_podcasts_per_user:
+                podcasts.popitem(last=False)
+            version = self._versions[event.user_id] = self._versions.get(event.user_id, 0) + 1
+            self.revision += 1
+            self.events += 1
+            return version
+
+    def ratings(self, user_id: str) -> Tuple[List[str], np.ndarray, int]:
+        """(podcast IDs, ratings float32, version) của user, cũ nhất trước"""
+        with self._lock:
+            podcasts = self._users.get(user_id)
+            if not podcasts:
+                return [], np.empty(0, dtype=np.float32), 0
+            return (list(podcasts), np.fromiter((r for r, _ in podcasts.values()), dtype=np.float32, count=len(podcasts)),
+                    self._versions[user_id])
+
+    def listened(self) -> List[Tuple[str, List[str]]]:
+        """(user, podcasts đã nghe) cho mọi user - replay vào listened index của bundle mới load"""
+        with self._lock:
+            return [(user_id, [pid for pid, (_, listened) in podcasts.items() if listened])
+                    for user_id, podcasts in self._users.items()]
+
+    def snapshot(self) -> Dict[str, Tuple[int, List[Tuple[str, float, bool]]]]:
+        with self._lock:
+            return {user_id: (self._versions[user_id], [(pid, r, l) for pid, (r, l) in podcasts.items()])
+                    for user_id, podcasts in self._users.items()}
+
+    def restore(self, snapshot: Mapping[str, Tuple[int, Sequence[Tuple[str, float, bool]]]]) -> None:
+        with self._lock:
+            for user_id, (version, podcasts) in snapshot.items():
+                self._users[user_id] = OrderedDict((pid, (float(r), bool(l))) for pid, r, l in podcasts)
+                self._versions[user_id] = int(version)
+            self.revision += 1
+
+    def stats(self) -> dict:
+        return {"users": len(self._users), "events": self.events}
+
+
+class UserVectorOverlay:
+    """Folded-in user vectors của một bundle, tính lại khi log của user có version mới.
+
+    Known users fold quanh embedding đã train (prior), cold users quanh mean user embedding.
+    Chỉ events trên podcasts có trained embedding tham gia fold-in; các events khác vẫn
+    tác động qua listened history (content scorer + exclusion).
+    """
+
+    def __init__(
+        self,
+        model: NCFModel,
+        user2idx: Mapping[str, int],
+        encode_podcasts: Callable[[Sequence[str]], np.ndarray],
+        log: InteractionLog,
+        regularization: float = 10.0,
+        steps: int = 1,
+    ):
+        self.model = model
+        self.user2idx = user2idx
+        self.encode_podcasts = encode_podcasts
+        self.log = log
+        self.regularization = regularization
+        self.steps = steps
+        # user -> (log version, embedding, projection); None = không có podcast nào fold được
+        self._vectors = {}  # type: Dict[str, Tuple[int, Optional[np.ndarray], Optional[np.ndarray]]]
+        self._mean_user = None  # type: Optional[np.ndarray]
+        self.folds = 0
+        self.fold_seconds = 0.0
+
+    def __len__(self) -> int:
+        return sum(1 for _, _, projection in self._vectors.values() if projection is not None)
+
+    def projection(self, user_id: str) -> Optional[np.ndarray]:
+        """First-layer projection của user (None = dùng embedding đã train / cold path)"""
+        version = self.log.version(user_id)
+        if not version:
+            return None
+        cached = self._vectors.get(user_id)
+        if cached is not None and cached[0] == version:
+            return cached[2]
+        return self.refresh(user_id)
+
+    def projections(self, user_ids: Sequence[str]) -> Dict[int, np.ndarray]:
+        """{row trong `user_ids`: projection} cho các users có overlay vector"""
+        if not len(self.log):
+            return {}
+        found = {}
+        for row, user_id in enumerate(user_ids):
+            projection = self.projection(user_id)
+            if projection is not None:
+                found[row] = projection
+        return found
+
+    def refresh(self, user_id: str) -> Optional[np.ndarray]:
+        """Fold-in lại từ ratings hiện tại của user trong log"""
+        podcast_ids, ratings, version = self.log.ratings(user_id)
+        podcast_idx = self.encode_podcasts(podcast_ids) if podcast_ids else np.empty(0, dtype=np.int64)
+        usable = (podcast_idx >= 0) & (podcast_idx < self.model.num_podcasts)
+        if not usable.any():
+            self._vectors[user_id] = (version, None, None)
+            return None
+        started = time.perf_counter()
+        user_index = self.user2idx.get(user_id)
+        if user_index is not None and 0 <= user_index < self.model.num_users:
+            prior = self.model.user_embeddings[user_index]
+        else:
+            prior = self.mean_user
+        embedding = self.model.fold_in(podcast_idx[usable], ratings[usable], prior, self.regularization, self.steps)
+        projection = self.model.project_user(embedding)
+        self._vectors[user_id] = (version, embedding, projection)
+        self.folds += 1
+        self.fold_seconds += time.perf_counter() - started
+        return projection
+
+    @property
+    def mean_user(self) -> np.ndarray:
+        if self._mean_user is None:
+            self._mean_user = self.model.user_embeddings.mean(axis=0).astype(np.float32)
+        return self._mean_user
+
+    def export(self) -> Dict[str, Tuple[int, np.ndarray]]:
+        """{user: (version, embedding)} để snapshot xuống disk"""
+        return {user_id: (version, embedding) for user_id, (version, embedding, _) in list(self._vectors.items())
+                if embedding is not None}
+
+    def restore(self, vectors: Mapping[str, Tuple[int, np.ndarray]]) -> None:
+        """Vectors từ snapshot của cùng model; vector nào có version khác log sẽ được fold lại khi cần"""
+        for user_id, (version, embedding) in vectors.items():
+            embedding = np.asarray(embedding, dtype=np.float32)
+            self._vectors[user_id] = (version, embedding, self.model.project_user(embedding))
+
+    def stats(self) -> dict:
+        return {
+            "users": len(self),
+            "folds": self.folds,
+            "avg_fold_us": round(self.fold_seconds / self.folds * 1e6, 1) if self.folds else None,
+            "regularization": self.regularization,
+        }
+
+
+# Snapshot directory: log (JSON lines, một user mỗi dòng) + overlay vectors (.npy mỗi model fingerprint)
+# + manifest (users / versions của từng .npy). Không pickle: load không bao giờ chạy code từ file.
+SNAPSHOT_LOG = "log.jsonl"
+SNAPSHOT_MANIFEST = "manifest.json"
+
+
+def _overlay_file(fingerprint: str) -> str:
+    return f"overlay-{fingerprint}.npy"
+
+
+def save_snapshot(directory: Path, log: InteractionLog, overlays: Mapping[str, UserVectorOverlay]) -> None:
+    """Log + overlay vectors (theo model fingerprint); mỗi file ghi atomically, manifest ghi sau cùng"""
+    directory.mkdir(parents=True, exist_ok=True)
+    write_atomic(directory / SNAPSHOT_LOG, b''.join(
+        json.dumps({"user_id": user_id, "version": version, "podcasts": podcasts},
+                   separators=(",", ":")).encode('utf-8') + b'\n'
+        for user_id, (version, podcasts) in log.snapshot().items()
+    ))
+    manifest = {"saved_at": time.time(), "overlays": {}}
+    for fingerprint, overlay in overlays.items():
+        vectors = overlay.export()
+        if not vectors:
+            continue
+        buffer = io.BytesIO()
+        np.save(buffer, np.stack([embedding for _, embedding in vectors.values()]).astype(np.float32), allow_pickle=False)
+        write_atomic(directory / _overlay_file(fingerprint), buffer.getvalue())
+        manifest["overlays"][fingerprint] = {"users": list(vectors), "versions": [version for version, _ in vectors.values()]}
+    write_atomic(directory / SNAPSHOT_MANIFEST, json.dumps(manifest).encode('utf-8'))
+    # Overlays của models không còn load
+    for stale in directory.glob(_overlay_file('*')):
+        if stale.name not in {_overlay_file(fingerprint) for fingerprint in manifest["overlays"]}:
+            stale.unlink(missing_ok=True)
+
+
+def load_snapshot(directory: Path) -> Optional[Dict[str, Any]]:
+    """{"saved_at", "log": {user: (version, podcasts)}, "overlays": {fingerprint: {user: (version, embedding)}}};
+    None nếu chưa có snapshot hoặc file hỏng"""
+    try:
+        with open(directory / SNAPSHOT_LOG, 'rb') as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+        manifest = json.loads((directory / SNAPSHOT_MANIFEST).read_bytes())
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"⚠️ Ignoring unreadable interaction snapshot {directory}: {e}")
+        return None
+    try:
+        snapshot_log = {entry["user_id"]: (int(entry["version"]), entry["podcasts"]) for entry in entries}
+    except (KeyError, TypeError, ValueError) as e:
+        logger.warning(f"⚠️ Ignoring unreadable interaction snapshot {directory}: {e}")
+        return None
+    overlays = {}
+    for fingerprint, entry in manifest.get("overlays", {}).items():
+        try:
+            vectors = np.load(directory / _overlay_file(fingerprint), allow_pickle=False)
+            if vectors.ndim != 2 or len(vectors) != len(entry["users"]) or len(entry["versions"]) != len(entry["users"]):
+                raise ValueError("overlay does not match manifest")
+        except (OSError, KeyError, TypeError, ValueError) as e:
+            # Overlay chỉ là cache: users sẽ được fold lại từ log khi cần
+            logger.warning(f"⚠️ Ignoring interaction overlay {fingerprint}: {e}")
+            continue
+        overlays[fingerprint] = {user_id: (int(version), vectors[row])
+                                 for row, (user_id, version) in enumerate(zip(entry["users"], entry["versions"]))}
+    return {"saved_at": manifest.get("saved_at"), "log": snapshot_log, "overlays": overlays}
+
+
+class InteractionConsumer:
+    """Background consumer: gom events thành batch và xử lý trong executor (ngoài event loop).
+
+    `source` None -> đọc từ in-process queue (`submit`); ngược lại poll `source` mỗi
+    `poll_interval` (multi-worker: events do mọi worker nhận, xem SharedState).
+    """
+
+    def __init__(
+        self,
+        process: Callable[[List[InteractionEvent]], None],
+        max_queue: int = 10000,
+        max_batch: int = 256,
+        source: Optional[Callable[[], List[InteractionEvent]]] = None,
+        poll_interval: float = 0.5,
+    ):
+        self._process = process
+        self.max_queue = max_queue
+        self.max_batch = max_batch
+        self.source = source
+        self.poll_interval = poll_interval
+        self._queue = None      # type: Optional[asyncio.Queue]  # tạo trong event loop của app
+        self._task = None       # type: Optional[asyncio.Task]
+        self.processed = 0
+        self.rejected = 0
+        self.last_error = None  # type: Optional[str]
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def submit(self, events: Sequence[InteractionEvent]) -> bool:
+        """Enqueue không chờ; False nếu queue không đủ chỗ cho cả batch (không nhận event nào)"""
+        if self._queue is None:
+            self._queue = asyncio.Queue(self.max_queue)
+        if self._queue.qsize() + len(events) > self.max_queue:
+            self.rejected += len(events)
+            return False
+        for event in events:
+            self._queue.put_nowait(event)
+        return True
+
+    def start(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue(self.max_queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._poll_loop() if self.source is not None else self._queue_loop())
+
+    async def stop(self) -> None:
+        """Xử lý nốt events đã nhận rồi dừng"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._task = None
+        if self._queue is not None and not self._queue.empty():
+            batch = []
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            self._run(batch)
+
+    async def _queue_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            await loop.run_in_executor(None, self._run, batch)
+
+    async def _poll_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                batch = await loop.run_in_executor(None, self.source)
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"❌ Reading interaction events failed: {e}")
+                batch = []
+            for start in range(0, len(batch), self.max_batch):
+                await loop.run_in_executor(None, self._run, batch[start:start + self.max_batch])
+            await asyncio.sleep(self.poll_interval)
+
+    def _run(self, batch: List[InteractionEvent]) -> None:
+        try:
+            self._process(batch)
+            self.processed += len(batch)
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"❌ Processing {len(batch)} interaction events failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.depth,
+            "processed": self.processed,
+            "rejected": self.rejected,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,257 @@
+"""
+LISTENED-HISTORY INDEX
+Podcasts mỗi user đã nghe, dạng CSR (indptr / indices) theo encoded user: build một lần từ
+ratings.pkl, append interactions mới vào delta buffer và merge định kỳ (không rebuild từ ratings)
+"""
+
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Số entries trong delta buffer trước khi merge vào CSR arrays
+COMPACT_THRESHOLD = 4096
+
+
+class ListenedIndex:
+    """Row r = user có encoded index r (users ngoài mappings nhận rows sau `num_users`);
+    cột = item index trong vocabulary podcast IDs của index.
+
+    Masking dùng một array item -> candidate row cho mỗi catalog tuple, nên loại podcasts
+    đã nghe khỏi scores chỉ là vài phép gather / scatter trên NumPy arrays.
+    """
+
+    def __init__(
+        self,
+        user2idx: Mapping[str, int],
+        num_users: int,
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        item_ids: List[str],
+    ):
+        self.user2idx = user2idx
+        self.num_users = num_users
+        self._indptr = indptr              # int64, len = rows + 1
+        self._indices = indices            # int32 item indices
+        self._item_ids = item_ids
+        self._item_rows = {pid: i for i, pid in enumerate(item_ids)}  # type: Dict[str, int]
+        self._extra_users = {}             # type: Dict[str, int]  # users chưa có trong mappings
+        self._pending = {}                 # type: Dict[int, List[int]]  # row -> items chưa merge
+        self._pending_count = 0
+        self._lock = threading.Lock()
+        self._candidates = None            # type: Optional[Tuple[Sequence[str], int, np.ndarray]]
+
+    @classmethod
+    def empty(cls, user2idx: Mapping[str, int], num_users: int) -> "ListenedIndex":
+        return cls(user2idx, num_users, np.zeros(num_users + 1, dtype=np.int64), np.empty(0, dtype=np.int32), [])
+
+    @classmethod
+    def from_ratings(cls, ratings: pd.DataFrame, user2idx: Mapping[str, int], num_users: int) -> "ListenedIndex":
+        """CSR từ ratings (user_id, podcast_id[, timestamp]); mỗi row theo thứ tự thời gian.
+
+        Ratings của users không có trong `user2idx` bị bỏ qua (training data luôn khớp mappings).
+        """
+        if ratings.empty:
+            return cls.empty(user2idx, num_users)
+        lookup_many = getattr(user2idx, 'lookup_many', None)
+        user_ids = ratings['user_id'].astype(str).tolist()
+        if lookup_many is not None:
+            rows = np.asarray(lookup_many(user_ids), dtype=np.int64)
+        else:
+            lookup = user2idx.get
+            rows = np.fromiter((lookup(uid, -1) for uid in user_ids), dtype=np.int64, count=len(user_ids))
+        item_ids, items = np.unique(ratings['podcast_id'].astype(str).to_numpy(), return_inverse=True)
+
+        keep = (rows >= 0) & (rows < num_users)
+        rows, items = rows[keep], items[keep]
+        if 'timestamp' in ratings.columns:
+            order = np.lexsort((pd.to_datetime(ratings['timestamp'], errors='coerce').to_numpy()[keep], rows))
+        else:
+            order = np.argsort(rows, kind='stable')
+        rows, items = rows[order], items[order]
+
+        # Một entry mỗi (user, podcast): giữ lần nghe đầu tiên
+        _, first = np.unique(rows * len(item_ids) + items, return_index=True)
+        first.sort()
+        rows, items = rows[first], items[first]
+
+        indptr = np.zeros(num_users + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=num_users), out=indptr[1:])
+        return cls(user2idx, num_users, indptr, items.astype(np.int32), item_ids.tolist())
+
+    @classmethod
+    def load(cls, ratings_path: Path, user2idx: Mapping[str, int], num_users: int) -> "ListenedIndex":
+        """ratings.pkl của model bundle; không có file -> index rỗng"""
+        if not ratings_path.exists():
+            logger.warning("⚠️ No ratings file found, listened history starts empty")
+            return cls.empty(user2idx, num_users)
+        index = cls.from_ratings(pd.read_pickle(ratings_path), user2idx, num_users)
+        logger.info(f"✅ Listened index: {index.nnz} interactions, {index.num_items} podcasts")
+        return index
+
+    # ------------------------------------------------------------------ #
+    # Reads
+    # ------------------------------------------------------------------ #
+    @property
+    def num_items(self) -> int:
+        return len(self._item_ids)
+
+    @property
+    def nnz(self) -> int:
+        return len(self._indices) + self._pending_count
+
+    def _row(self, user_id: str) -> int:
+        row = self.user2idx.get(user_id)
+        if row is None or not 0 <= row < self.num_users:
+            return self._extra_users.get(user_id, -1)
+        return row
+
+    def _items(self, row: int) -> np.ndarray:
+        if row < 0:
+            return np.empty(0, dtype=np.int32)
+        if row + 1 < len(self._indptr):
+            items = self._indices[self._indptr[row]:self._indptr[row + 1]]
+        else:
+            items = self._indices[:0]  # user mới, chỉ có entries trong delta buffer
+        pending = self._pending.get(row)
+        if pending:
+            items = np.concatenate([items, np.asarray(pending, dtype=np.int32)])
+        return items
+
+    def count(self, user_id: str) -> int:
+        with self._lock:
+            return len(self._items(self._row(user_id)))
+
+    def podcast_ids(self, user_id: str) -> List[str]:
+        """Podcast IDs user đã nghe, cũ nhất trước"""
+        with self._lock:
+            items = self._items(self._row(user_id))
+            return [self._item_ids[i] for i in items.tolist()]
+
+    def history(self, user_id: str, podcast_ids: Sequence[str]) -> Tuple[List[str], np.ndarray]:
+        """(podcast IDs đã nghe, candidate row trong `podcast_ids` hoặc -1), cũ nhất trước"""
+        with self._lock:
+            items = self._items(self._row(user_id))
+            return [self._item_ids[i] for i in items.tolist()], self._candidate_rows(podcast_ids)[items]
+
+    def seen_candidates(self, user_id: str, podcast_ids: Sequence[str]) -> np.ndarray:
+        """Candidate rows (trong `podcast_ids`) user đã nghe"""
+        with self._lock:
+            items = self._items(self._row(user_id))
+            if not items.size:
+                return np.empty(0, dtype=np.int64)
+            rows = self._candidate_rows(podcast_ids)[items]
+        return rows[rows >= 0]
+
+    def seen_candidates_many(self, user_ids: Sequence[str], podcast_ids: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """(user positions, candidate rows) cho một block users, dùng để scatter -inf vào score matrix"""
+        with self._lock:
+            rows = np.fromiter((self._row(uid) for uid in user_ids), dtype=np.int64, count=len(user_ids))
+            known = np.flatnonzero((rows >= 0) & (rows < len(self._indptr) - 1))
+            starts, stops = self._indptr[rows[known]], self._indptr[rows[known] + 1]
+            lengths = stops - starts
+            # Gather tất cả CSR slices trong một lần: offset trong indices cho từng entry
+            positions = np.repeat(known, lengths)
+            offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths) + np.repeat(starts, lengths)
+            items = self._indices[offsets]
+            if self._pending:
+                extra = [(pos, self._pending[row]) for pos, row in enumerate(rows.tolist()) if row in self._pending]
+                if extra:
+                    positions = np.concatenate([positions] + [np.full(len(p), pos, dtype=np.int64) for pos, p in extra])
+                    items = np.concatenate([items] + [np.asarray(p, dtype=np.int32) for _, p in extra])
+            if not items.size:
+                return positions, np.empty(0, dtype=np.int64)
+            cols = self._candidate_rows(podcast_ids)[items]
+        live = cols >= 0
+        return positions[live], cols[live]
+
+    def _candidate_rows(self, podcast_ids: Sequence[str]) -> np.ndarray:
+        """item -> candidate row (-1 = không có trong catalog), cache theo catalog tuple"""
+        cached = self._candidates
+        if cached is not None and cached[0] is podcast_ids and cached[1] == self.num_items:
+            return cached[2]
+        item_rows = self._item_rows
+        candidate_rows = np.full(self.num_items, -1, dtype=np.int64)
+        for row, pid in enumerate(podcast_ids):
+            item = item_rows.get(pid)
+            if item is not None:
+                candidate_rows[item] = row
+        self._candidates = (podcast_ids, self.num_items, candidate_rows)
+        return candidate_rows
+
+    def cooccurrence_vectors(self, dim: int = 64, seed: int = 0) -> Tuple[List[str], np.ndarray]:
+        """(podcast IDs, item vectors) = tổng random projections của các users đã nghe podcast.
+
+        Dot product giữa hai vectors xấp xỉ số listeners chung (sketch của item-user matrix),
+        nên cosine trên vectors ~ cosine co-occurrence mà không cần matrix (items x users).
+        """
+        with self._lock:
+            counts = np.diff(self._indptr)
+            rows = np.repeat(np.arange(len(counts), dtype=np.int64), counts)
+            items = self._indices
+            if self._pending:
+                rows = np.concatenate([rows] + [np.full(len(p), row, dtype=np.int64) for row, p in self._pending.items()])
+                items = np.concatenate([items] + [np.asarray(p, dtype=np.int32) for p in self._pending.values()])
+            item_ids = list(self._item_ids)
+        projections = np.random.default_rng(seed).standard_normal((int(rows.max(initial=-1)) + 1, dim)).astype(np.float32)
+        vectors = np.zeros((len(item_ids), dim), dtype=np.float32)
+        np.add.at(vectors, items, projections[rows])
+        return item_ids, vectors
+
+    # ------------------------------------------------------------------ #
+    # Appends
+    # ------------------------------------------------------------------ #
+    def append(self, user_id: str, podcast_ids: Iterable[str]) -> int:
+        """Thêm podcasts user vừa nghe (bỏ qua podcasts đã có); trả về số entries mới"""
+        with self._lock:
+            row = self._row(user_id)
+            if row < 0:
+                row = self.num_users + len(self._extra_users)
+                self._extra_users[user_id] = row
+            seen = set(self._items(row).tolist())
+            added = []
+            for pid in podcast_ids:
+                item = self._item_rows.get(pid)
+                if item is None:
+                    item = self._item_rows[pid] = len(self._item_ids)
+                    self._item_ids.append(pid)
+                if item not in seen:
+                    seen.add(item)
+                    added.append(item)
+            if added:
+                self._pending.setdefault(row, []).extend(added)
+                self._pending_count += len(added)
+                if self._pending_count >= COMPACT_THRESHOLD:
+                    self._compact()
+            return len(added)
+
+    def _compact(self) -> None:
+        """Merge delta buffer vào CSR: stable sort theo row, O(nnz) NumPy, không đọc lại ratings"""
+        num_rows = max(len(self._indptr) - 1, self.num_users + len(self._extra_users))
+        old_rows = np.repeat(np.arange(len(self._indptr) - 1, dtype=np.int64), np.diff(self._indptr))
+        new_rows = np.concatenate([np.full(len(items), row, dtype=np.int64) for row, items in self._pending.items()])
+        new_items = np.concatenate([np.asarray(items, dtype=np.int32) for items in self._pending.values()])
+        rows = np.concatenate([old_rows, new_rows])
+        order = np.argsort(rows, kind='stable')  # entries cũ đứng trước trong mỗi row
+        indptr = np.zeros(num_rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=num_rows), out=indptr[1:])
+        self._indices = np.concatenate([self._indices, new_items])[order]
+        self._indptr = indptr
+        self._pending = {}
+        self._pending_count = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = np.diff(self._indptr)
+            pending_only = sum(1 for row in self._pending if row >= len(counts) or not counts[row])
+            return {
+                "users": int(np.count_nonzero(counts)) + pending_only,
+                "podcasts": self.num_items,
+                "interactions": self.nnz,
+                "pending": self._pending_count,
+            }
@@ -0,0 +1,220 @@
+"""
+METRICS
+Prometheus text exposition (format 0.0.4) không cần prometheus_client: histograms / counters / gauges
+trong process, cộng với collectors đọc counters sẵn có (result cache, upstream, catalog) lúc scrape.
+Multi-worker: mỗi worker publish snapshot của nó vào shared state, worker nhận scrape merge lại.
+"""
+
+import bisect
+import json
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Latency buckets (giây): 100µs .. 10s
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Cách merge một metric family giữa các workers
+MERGE_SUM = 'sum'    # counters, histograms
+MERGE_MAX = 'max'
+MERGE_ALL = 'all'    # giữ giá trị của từng worker, thêm label worker="<pid>"
+
+Sample = Tuple[str, Dict[str, str], float]
+Family = Dict[str, Any]
+
+
+def family(name: str, kind: str, documentation: str, samples: Iterable[Sample], merge: str = MERGE_SUM) -> Family:
+    """Metric family (dạng collectors trả về): name, type, help, merge mode + samples"""
+    return {"name": name, "type": kind, "help": documentation, "merge": merge, "samples": list(samples)}
+
+
+def value_family(name: str, kind: str, documentation: str, values: Iterable[Tuple[Dict[str, str], float]],
+                 merge: str = MERGE_SUM) -> Family:
+    """Family với một sample (name = family name) cho mỗi (labels, value)"""
+    return family(name, kind, documentation, ((name, labels, value) for labels, value in values), merge)
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), merge: str = MERGE_SUM):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.merge = merge
+        self._lock = threading.Lock()
+        self._values = {}  # type: Dict[Tuple[str, ...], Any]
+
+    def _key(self, labels: Sequence[Any]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(value) for value in labels)
+
+    def _samples(self, key: Tuple[str, ...], value: Any) -> List[Sample]:
+        return [(self.name, dict(zip(self.labelnames, key)), value)]
+
+    def collect(self) -> Family:
+        with self._lock:
+            samples = [sample for key, value in self._values.items() for sample in self._samples(key, value)]
+        return family(self.name, self.kind, self.documentation, samples, self.merge)
+
+
+class Counter(_Metric):
+    """Monotonic counter; tên nên kết thúc bằng _total"""
+    kind = 'counter'
+
+    def inc(self, *labels: Any, amount: float = 1.0) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value: float, *labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Histogram(_Metric):
+    """Cumulative buckets + _sum + _count; observe O(log buckets) dưới một lock"""
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames, MERGE_SUM)
+        self.buckets = tuple(sorted(float(bound) for bound in buckets))
+
+    def observe(self, value: float, *labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)  # bucket đầu tiên có le >= value
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    @contextmanager
+    def time(self, *labels: Any) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def _samples(self, key: Tuple[str, ...], value: Any) -> List[Sample]:
+        counts, total = value
+        labels = dict(zip(self.labelnames, key))
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            cumulative += count
+            samples.append((f'{self.name}_bucket', dict(labels, le=format_value(bound)), cumulative))
+        samples.append((f'{self.name}_sum', labels, total))
+        samples.append((f'{self.name}_count', labels, cumulative))
+        return samples
+
+
+class Registry:
+    """Metrics của process + collectors (callables trả về families, chạy lúc scrape)"""
+
+    def __init__(self):
+        self._metrics = []     # type: List[_Metric]
+        self._collectors = []  # type: List[Callable[[], Iterable[Family]]]
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (), merge: str = MERGE_ALL) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, merge))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[Family]]) -> None:
+        self._collectors.append(collector)
+
+    def collect(self) -> List[Family]:
+        families = [metric.collect() for metric in self._metrics]
+        for collector in self._collectors:
+            try:
+                families.extend(collector())
+            except Exception as e:
+                logger.error(f"❌ Metrics collector failed: {e}")
+        return families
+
+
+def merge_families(workers: Sequence[Tuple[str, List[Family]]]) -> List[Family]:
+    """Merge families của nhiều workers (worker_id, families) theo merge mode của từng family"""
+    merged = {}  # type: Dict[str, Tuple[Family, Dict[Tuple, List]]]
+    for worker, families in workers:
+        for item in families:
+            if item['name'] not in merged:
+                merged[item['name']] = (item, {})
+            head, samples = merged[item['name']]
+            for name, labels, value in item['samples']:
+                if head['merge'] == MERGE_ALL:
+                    labels = dict(labels, worker=worker)
+                key = (name, tuple(sorted(labels.items())))
+                sample = samples.get(key)
+                if sample is None:
+                    samples[key] = [name, labels, value]
+                elif head['merge'] == MERGE_MAX:
+                    sample[2] = max(sample[2], value)
+                else:
+                    sample[2] += value
+    return [dict(head, samples=[tuple(sample) for sample in samples.values()]) for head, samples in merged.values()]
+
+
+def encode_families(families: List[Family]) -> bytes:
+    return json.dumps(families, separators=(',', ':')).encode('utf-8')
+
+
+def decode_families(data: bytes) -> List[Family]:
+    return json.loads(data)
+
+
+def format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if value == -math.inf:
+        return '-Inf'
+    if value != value:
+        return 'NaN'
+    return repr(float(value))
+
+
+def _escape(value: str, quotes: bool = True) -> str:
+    value = value.replace('\\', '\\\\').replace('\n', '\\n')
+    return value.replace('"', '\\"') if quotes else value
+
+
+def render(families: List[Family]) -> bytes:
+    """Text exposition format 0.0.4 (HELP / TYPE / samples)"""
+    lines = []
+    for item in families:
+        lines.append(f"# HELP {item['name']} {_escape(item['help'], quotes=False)}")
+        lines.append(f"# TYPE {item['name']} {item['type']}")
+        for name, labels, value in item['samples']:
+            if labels:
+                label_text = ','.join(f'{key}="{_escape(str(val))}"' for key, val in labels.items())
+                lines.append(f"{name}{{{label_text}}} {format_value(value)}")
+            else:
+                lines.append(f"{name} {format_value(value)}")
+    return ('\n'.join(lines) + '\n').encode('utf-8')
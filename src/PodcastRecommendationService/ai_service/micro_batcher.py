@@ -0,0 +1,116 @@
+"""
+MICRO-BATCHER
+Gom các single-user scoring requests đồng thời (cùng model bundle + catalog snapshot) trong một
+window vài ms, hoặc tới max batch size, rồi score chúng bằng một users x podcasts matrix operation;
+mỗi coroutine nhận lại row của nó. Matrix operation chạy qua `run` (scoring pool) nếu có
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class _Batch:
+    __slots__ = ('bundle', 'podcast_ids', 'user_ids', 'futures', 'timer')
+
+    def __init__(self, bundle: Any, podcast_ids: Sequence[str]):
+        self.bundle = bundle
+        self.podcast_ids = podcast_ids
+        self.user_ids = []   # type: List[str]
+        self.futures = []    # type: List[asyncio.Future]
+        self.timer = None    # type: Optional[asyncio.TimerHandle]
+
+
+class MicroBatcher:
+    """Batch mở đầu tiên của mỗi (bundle, candidates) nhận requests cho tới khi window hết hạn
+    hoặc đủ `max_batch` users (hay `max_cells` ô users x podcasts), rồi được flush.
+
+    Rows của batch giống hệt `score_user` từng user: `score_users` score mỗi row độc lập.
+    """
+
+    def __init__(
+        self,
+        window_seconds: float,
+        max_batch: int = 64,
+        max_cells: int = 1_000_000,
+        on_enqueue: Optional[Callable[[int], None]] = None,
+        on_flush: Optional[Callable[[int], None]] = None,
+        run: Optional[Callable[..., Awaitable[Any]]] = None,
+    ):
+        self.window_seconds = window_seconds
+        self.max_batch = max(1, max_batch)
+        self.max_cells = max_cells
+        self.on_enqueue = on_enqueue  # called with queue depth (gồm request vừa vào)
+        self.on_flush = on_flush      # called with batch size
+        self.run = run                # run(fn, *args) -> awaitable (executor); None = chạy trên loop
+        self._scoring = set()         # type: Set[asyncio.Task]
+        self._open = {}               # type: Dict[Tuple[int, int], _Batch]
+        self.depth = 0
+        self.batches = 0
+        self.requests = 0
+
+    async def score(self, bundle: Any, user_id: str, podcast_ids: Sequence[str]) -> np.ndarray:
+        """Predicted ratings (float64) của user cho `podcast_ids`, scored cùng các requests đồng thời"""
+        loop = asyncio.get_running_loop()
+        # Identity: requests cùng bundle object + cùng candidates tuple (một snapshot) mới gộp được
+        key = (id(bundle), id(podcast_ids))
+        batch = self._open.get(key)
+        if batch is None:
+            batch = self._open[key] = _Batch(bundle, podcast_ids)
+            batch.timer = loop.call_later(self.window_seconds, self._flush, key, batch)
+        future = loop.create_future()
+        batch.user_ids.append(user_id)
+        batch.futures.append(future)
+        self.depth += 1
+        if self.on_enqueue is not None:
+            self.on_enqueue(self.depth)
+        limit = min(self.max_batch, max(1, self.max_cells // max(1, len(podcast_ids))))
+        if len(batch.user_ids) >= limit:
+            batch.timer.cancel()
+            self._flush(key, batch)
+        return await future
+
+    def _flush(self, key: Tuple[int, int], batch: _Batch) -> None:
+        if self._open.get(key) is batch:
+            del self._open[key]
+        self.depth -= len(batch.user_ids)
+        self.requests += len(batch.user_ids)
+        self.batches += 1
+        if self.on_flush is not None:
+            self.on_flush(len(batch.user_ids))
+        # Giữ reference tới task cho tới khi xong (loop chỉ giữ weak reference)
+        task = asyncio.ensure_future(self._score(batch))
+        self._scoring.add(task)
+        task.add_done_callback(self._scoring.discard)
+
+    @staticmethod
+    def _score_batch(batch: _Batch) -> np.ndarray:
+        podcast_idx = batch.bundle.encode_podcasts(batch.podcast_ids)
+        return batch.bundle.scoring_engine.score_users(batch.user_ids, batch.podcast_ids, podcast_idx)
+
+    async def _score(self, batch: _Batch) -> None:
+        try:
+            scores = self._score_batch(batch) if self.run is None else await self.run(self._score_batch, batch)
+        except Exception as e:
+            logger.error(f"❌ Micro-batch scoring failed for {len(batch.user_ids)} users: {e}")
+            for future in batch.futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for row, future in enumerate(batch.futures):
+            if not future.done():  # request bị cancel trong lúc chờ
+                future.set_result(scores[row])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "window_ms": round(self.window_seconds * 1000, 3),
+            "max_batch": self.max_batch,
+            "queue_depth": self.depth,
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_size": round(self.requests / self.batches, 2) if self.batches else None,
+        }
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+MEMORY-MAPPED MODEL ARTIFACTS
+Convert mappings.pkl + model weights (NCF / ALS) sang raw .npy files (sorted ID arrays + int32 index arrays,
+embeddings + first-layer projections) để service memory-map thay vì unpickle lúc startup
+
+Chạy lại sau mỗi lần train / copy bundle mới:
+    python model_artifacts.py --model-dir ./models    # -> models/artifacts/
+"""
+
+import argparse
+import json
+import os
+import pickle
+import shutil
+import sys
+import time
+import zlib
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from als_model import ALSModel, load_model
+from ncf_model import NCFModel
+
+ARTIFACTS_DIR = "artifacts"
+MANIFEST_FILE = "manifest.json"
+FORMAT_VERSION = 1
+NCF_DIR = "ncf"
+ALS_DIR = "als"
+
+# Artifacts được coi là stale nếu một trong các source files đổi sau lần convert
+SOURCE_FILES = ("mappings.pkl", "als_weights.npz", "ncf_weights.npz", "collaborative_filtering_model.h5")
+
+# Mapping name trong mappings.pkl -> file prefix trong artifacts/
+INDEXES = (('user2user_encoded', 'users'), ('podcast2podcast_encoded', 'podcasts'))
+
+
+def files_fingerprint(directory: Path, names: Sequence[str]) -> str:
+    """crc32 của (name, size, mtime) các files đang tồn tại"""
+    parts = []
+    for name in names:
+        path = directory / name
+        if path.exists():
+            stat = path.stat()
+            parts.append(f"{name}:{stat.st_size}:{stat.st_mtime_ns}")
+    return f"{zlib.crc32('|'.join(parts).encode()):08x}"
+
+
+class IdIndex(Mapping):
+    """Read-only `str -> int` mapping trên memory-mapped arrays.
+
+    - `<prefix>_keys.npy`: IDs (UTF-8 bytes) sorted, lookup bằng binary search
+    - `<prefix>_values.npy`: int32 encoded index của từng sorted key
+    - `<prefix>_positions.npy`: int32 vị trí trong keys của từng encoded index (reverse lookup)
+    """
+
+    def __init__(self, keys: np.ndarray, values: np.ndarray, positions: np.ndarray):
+        self._keys = keys
+        self._values = values
+        self._positions = positions
+
+    @staticmethod
+    def arrays(mapping: Dict[str, int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(sorted keys, values, positions) cho một dict mapping"""
+        items = sorted((str(key).encode('utf-8'), int(value)) for key, value in mapping.items())
+        keys = np.array([key for key, _ in items], dtype=bytes) if items else np.array([], dtype='S1')
+        values = np.array([value for _, value in items], dtype=np.int32)
+        positions = np.full(int(values.max()) + 1 if len(values) else 0, -1, dtype=np.int32)
+        positions[values] = np.arange(len(values), dtype=np.int32)
+        return keys, values, positions
+
+    @classmethod
+    def save(cls, mapping: Dict[str, int], directory: Path, prefix: str) -> None:
+        for suffix, array in zip(('keys', 'values', 'positions'), cls.arrays(mapping)):
+            np.save(directory / f"{prefix}_{suffix}.npy", array)
+
+    @classmethod
+    def load(cls, directory: Path, prefix: str, mmap_mode: Optional[str] = 'r') -> "IdIndex":
+        return cls(*(
+            np.load(directory / f"{prefix}_{suffix}.npy", mmap_mode=mmap_mode, allow_pickle=False)
+            for suffix in ('keys', 'values', 'positions')
+        ))
+
+    def _find(self, key: str) -> int:
+        encoded = key.encode('utf-8')
+        pos = int(np.searchsorted(self._keys, encoded))
+        if pos < len(self._keys) and self._keys[pos] == encoded:
+            return pos
+        return -1
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        if not isinstance(key, str):
+            return default
+        pos = self._find(key)
+        return int(self._values[pos]) if pos >= 0 else default
+
+    def __getitem__(self, key: str) -> int:
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self._find(key) >= 0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __iter__(self) -> Iterator[str]:
+        for start in range(0, len(self._keys), 4096):
+            for key in self._keys[start:start + 4096].tolist():
+                yield key.decode('utf-8')
+
+    def lookup_many(self, keys: Sequence[str], default: int = -1) -> np.ndarray:
+        """Vectorized lookup: int64 index cho mỗi key (`default` nếu không có)"""
+        out = np.full(len(keys), default, dtype=np.int64)
+        if not len(keys) or not len(self._keys):
+            return out
+        query = np.array([key.encode('utf-8') for key in keys], dtype=bytes)
+        pos = np.minimum(np.searchsorted(self._keys, query), len(self._keys) - 1)
+        found = self._keys[pos] == query
+        out[found] = self._values[pos[found]]
+        return out
+
+    def max_index(self) -> int:
+        return len(self._positions) - 1
+
+    def ids_by_index(self) -> List[Optional[str]]:
+        """IDs theo thứ tự encoded index (None cho index không dùng)"""
+        keys = self._keys[np.maximum(self._positions, 0)].tolist()
+        return [key.decode('utf-8') if pos >= 0 else None for key, pos in zip(keys, self._positions.tolist())]
+
+    def inverse(self) -> "IndexIds":
+        return IndexIds(self)
+
+
+class IndexIds(Mapping):
+    """Reverse view `int -> str` của một IdIndex (userencoded2user / podcastencoded2podcast)"""
+
+    def __init__(self, index: IdIndex):
+        self._index = index
+
+    def __getitem__(self, idx: int) -> str:
+        positions = self._index._positions
+        if not isinstance(idx, (int, np.integer)) or not 0 <= idx < len(positions) or positions[idx] < 0:
+            raise KeyError(idx)
+        return self._index._keys[positions[idx]].decode('utf-8')
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(np.flatnonzero(np.asarray(self._index._positions) >= 0).tolist())
+
+
+def artifacts_ready(model_dir: Path) -> bool:
+    """Có artifacts dùng được: đúng format và không cũ hơn source pickles / weights"""
+    manifest_path = model_dir / ARTIFACTS_DIR / MANIFEST_FILE
+    if not manifest_path.exists():
+        return False
+    try:
+        manifest = json.loads(manifest_path.read_text())
+    except (OSError, ValueError):
+        return False
+    if manifest.get('format') != FORMAT_VERSION:
+        return False
+    # Bundle chỉ có artifacts (không có pickles) -> luôn dùng artifacts
+    if not (model_dir / "mappings.pkl").exists():
+        return True
+    return manifest.get('source_fingerprint') == files_fingerprint(model_dir, SOURCE_FILES)
+
+
+def load_artifacts(model_dir: Path) -> Tuple[Dict[str, Mapping], Optional[Union[NCFModel, ALSModel]]]:
+    """(mappings, model) memory-mapped từ `model_dir/artifacts`; chỉ đọc headers, không đọc data"""
+    directory = model_dir / ARTIFACTS_DIR
+    mappings = {}  # type: Dict[str, Mapping]
+    for name, prefix in INDEXES:
+        mappings[name] = IdIndex.load(directory, prefix)
+    mappings['userencoded2user'] = mappings['user2user_encoded'].inverse()
+    mappings['podcastencoded2podcast'] = mappings['podcast2podcast_encoded'].inverse()
+    model = None
+    if (directory / NCF_DIR).exists():
+        model = NCFModel.from_npy_dir(directory / NCF_DIR)
+    elif (directory / ALS_DIR).exists():
+        model = ALSModel.from_npy_dir(directory / ALS_DIR)
+    return mappings, model
+
+
+def convert_model_dir(model_dir: Path) -> Dict[str, Any]:
+    """Ghi `model_dir/artifacts` từ mappings.pkl + model weights (NCF / ALS); swap cả thư mục atomically"""
+    metadata_path = model_dir / "model_metadata.json"
+    metadata = json.loads(metadata_path.read_text()) if metadata_path.exists() else None
+    fingerprint = files_fingerprint(model_dir, SOURCE_FILES)
+    with open(model_dir / "mappings.pkl", 'rb') as f:
+        mappings = pickle.load(f)
+    model = load_model(model_dir, metadata)
+
+    target = model_dir / ARTIFACTS_DIR
+    tmp = model_dir / f".{ARTIFACTS_DIR}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    for name, prefix in INDEXES:
+        IdIndex.save(mappings.get(name, {}), tmp, prefix)
+    if model is not None:
+        model.save_npy_dir(tmp / (ALS_DIR if isinstance(model, ALSModel) else NCF_DIR))
+    manifest = {
+        'format': FORMAT_VERSION,
+        'source_fingerprint': fingerprint,
+        'users': len(mappings.get('user2user_encoded', {})),
+        'podcasts': len(mappings.get('podcast2podcast_encoded', {})),
+        'model': model is not None,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    (tmp / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2))
+
+    # Process đang mmap bản cũ vẫn đọc được sau khi thư mục cũ bị xoá
+    old = model_dir / f".{ARTIFACTS_DIR}.old-{os.getpid()}"
+    if target.exists():
+        os.replace(target, old)
+    os.replace(tmp, target)
+    shutil.rmtree(old, ignore_errors=True)
+    return manifest
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Convert mappings.pkl + NCF weights to memory-mapped .npy artifacts")
+    parser.add_argument('--model-dir', default='./models', type=Path)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    manifest = convert_model_dir(args.model_dir)
+    print(f"✅ Wrote {args.model_dir / ARTIFACTS_DIR}: {manifest['users']} users, {manifest['podcasts']} podcasts, "
+          f"model={'yes' if manifest['model'] else 'no'} in {time.perf_counter() - started:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,579 @@
+"""
+MODEL REGISTRY
+Model bundles (mappings + training podcasts + metadata + NCF weights) được load ở background,
+validate + pre-warm rồi swap atomically; hỗ trợ chạy hai versions song song với traffic split
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import pickle
+import threading
+import time
+import zlib
+from collections.abc import Mapping
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from content_index import ContentIndex, document_text
+from interactions import InteractionLog, UserVectorOverlay
+from listened_index import ListenedIndex
+from model_artifacts import ARTIFACTS_DIR, MANIFEST_FILE, IdIndex, artifacts_ready, files_fingerprint, load_artifacts
+from als_model import ALSModel, load_model
+from ncf_model import NCFModel
+from neighbor_table import normalize_rows
+from scoring import ScoringEngine
+from shared_state import SharedState
+
+logger = logging.getLogger(__name__)
+
+# Files thuộc một model bundle; thay đổi ở bất kỳ file nào -> bundle mới
+BUNDLE_FILES = (
+    "mappings.pkl",
+    "podcasts.pkl",
+    "ratings.pkl",
+    "model_metadata.json",
+    "als_weights.npz",
+    "ncf_weights.npz",
+    "collaborative_filtering_model.h5",
+    f"{ARTIFACTS_DIR}/{MANIFEST_FILE}",
+)
+
+# Pre-warm: score một sample users x podcasts trước khi nhận traffic
+WARMUP_USERS = 32
+WARMUP_PODCASTS = 256
+
+# Số chiều của co-occurrence sketch (similar podcasts khi bundle không có NCF weights)
+COOCCURRENCE_DIM = 256
+# Similar podcasts: số chiều của TF-IDF sketch và tỉ trọng của nó so với collaborative vector
+CONTENT_SKETCH_DIM = 256
+SIMILAR_CONTENT_WEIGHT = 0.5
+
+
+class BundleValidationError(Exception):
+    """Bundle mới không hợp lệ; bundle đang active được giữ nguyên"""
+
+
+def bundle_fingerprint(model_dir: Path) -> str:
+    """(name, size, mtime) của các bundle files - đổi khi có file mới được copy vào"""
+    return files_fingerprint(model_dir, BUNDLE_FILES)
+
+
+def _max_index(mapping: Mapping) -> int:
+    if isinstance(mapping, IdIndex):
+        return mapping.max_index()
+    return max(mapping.values(), default=-1)
+
+
+class ModelBundle:
+    """Một version model đã load; immutable sau khi registry publish nó"""
+
+    def __init__(
+        self,
+        generation: int,
+        model_dir: Path,
+        mappings: Dict[str, Mapping],
+        podcasts_path: Path,
+        metadata: Dict[str, Any],
+        model: Optional[Union[NCFModel, ALSModel]],
+        fingerprint: str,
+        load_seconds: float = 0.0,
+    ):
+        self.generation = generation
+        self.model_dir = model_dir
+        self.mappings = mappings
+        self.podcasts_path = podcasts_path
+        self.metadata = metadata
+        self.model = model
+        self.fingerprint = fingerprint
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+        self.scoring_engine = ScoringEngine(
+            mappings.get('user2user_encoded', {}),
+            mappings.get('podcast2podcast_encoded', {}),
+            model
+        )
+        self.topk_table = None   # set by the top-K precompute for this bundle
+        self._encoded = None     # type: Optional[Tuple[Sequence[str], np.ndarray]]
+        self._podcasts_df = None  # type: Optional[pd.DataFrame]
+        self._listened = None     # type: Optional[ListenedIndex]
+        self._training_rows = None  # type: Optional[Dict[str, int]]
+        self.neighbor_table = None  # set by the similar-podcasts refresh for this bundle
+        self.ann_index = None       # set by the ANN index refresh for this bundle
+        self.interactions = None  # type: Optional[InteractionLog]
+        self.overlay = None       # type: Optional[UserVectorOverlay]
+        self._listened_lock = threading.Lock()
+
+    @property
+    def podcasts_df(self) -> pd.DataFrame:
+        """Training podcasts (podcasts.pkl); không nằm trên request path nên chỉ load khi cần"""
+        if self._podcasts_df is None:
+            if self.podcasts_path.exists():
+                logger.info("📥 Loading training podcasts data...")
+                self._podcasts_df = pd.read_pickle(self.podcasts_path)
+                logger.info(f"✅ Loaded {len(self._podcasts_df)} training podcasts")
+            else:
+                logger.warning("⚠️ No podcasts file found")
+                self._podcasts_df = pd.DataFrame()
+        return self._podcasts_df
+
+    def training_podcast(self, podcast_id: str) -> Optional[Dict[str, Any]]:
+        """Row của podcasts.pkl theo podcast_id (None nếu không có trong training data)"""
+        if self._training_rows is None:
+            df = self.podcasts_df
+            self._training_rows = {pid: i for i, pid in enumerate(df['podcast_id'])} if 'podcast_id' in df.columns else {}
+        row = self._training_rows.get(podcast_id)
+        return self.podcasts_df.iloc[row].to_dict() if row is not None else None
+
+    def attach_content(self, index: ContentIndex) -> None:
+        """Cold pairs được score bằng content index, profile = podcasts user đã nghe"""
+        self.scoring_engine.content = index
+        self.scoring_engine.history = lambda user_id: self.listened_index.podcast_ids(user_id)
+
+    def attach_interactions(self, log: InteractionLog, regularization: float = 10.0, steps: int = 1) -> None:
+        """Interaction events: listened history của bundle replay log, user vectors fold-in
+        vào embedding space của bundle (chỉ khi có NCF weights)"""
+        self.interactions = log
+        if self.model is not None:
+            self.overlay = UserVectorOverlay(self.model, self.scoring_engine.user2idx,
+                                             self.scoring_engine.encode_podcasts, log, regularization, steps)
+            self.scoring_engine.overlay = self.overlay
+
+    def index_training_podcasts(self, index: ContentIndex) -> int:
+        """Thêm training podcasts (podcasts.pkl) vào content index để listened history của
+        known users (training podcast IDs) build được profile"""
+        df = self.podcasts_df
+        if 'podcast_id' not in df.columns:
+            return 0
+        columns = [df[name] if name in df.columns else [None] * len(df) for name in ('title', 'topics', 'category')]
+        return index.add(
+            (str(podcast_id), document_text(title, topics), category)
+            for podcast_id, title, topics, category in zip(df['podcast_id'], *columns)
+        )
+
+    def podcast_vectors(self, podcast_ids: Sequence[str]) -> np.ndarray:
+        """Item vectors cho similar podcasts (zero row = không có vector): [content, collaborative],
+        mỗi phần unit-length, weighted theo SIMILAR_CONTENT_WEIGHT.
+
+        Content = TF-IDF sketch của content index (mọi catalog podcast đã index); collaborative =
+        trained podcast embedding (NCF weights) hoặc co-occurrence từ listened history, chỉ có cho
+        podcasts trong training data - catalog GUIDs thường chỉ có phần content.
+        """
+        content = self.scoring_engine.content
+        if content is not None:
+            content_part = normalize_rows(content.sketch(podcast_ids, CONTENT_SKETCH_DIM))
+        else:
+            content_part = np.zeros((len(podcast_ids), CONTENT_SKETCH_DIM), dtype=np.float32)
+
+        if self.model is None:
+            item_ids, sketch = self.listened_index.cooccurrence_vectors(COOCCURRENCE_DIM)
+            rows = {pid: i for i, pid in enumerate(item_ids)}
+            collaborative = np.zeros((len(podcast_ids), COOCCURRENCE_DIM), dtype=np.float32)
+            for i, pid in enumerate(podcast_ids):
+                row = rows.get(pid)
+                if row is not None:
+                    collaborative[i] = sketch[row]
+        else:
+            podcast_idx = self.scoring_engine.encode_podcasts(podcast_ids)
+            known = (podcast_idx >= 0) & (podcast_idx < self.model.num_podcasts)
+            collaborative = np.zeros((len(podcast_ids), self.model.embedding_size), dtype=np.float32)
+            collaborative[known] = self.model.podcast_embeddings[podcast_idx[known]]
+
+        return np.concatenate([
+            np.sqrt(SIMILAR_CONTENT_WEIGHT) * content_part,
+            np.sqrt(1.0 - SIMILAR_CONTENT_WEIGHT) * normalize_rows(collaborative),
+        ], axis=1)
+
+    @property
+    def listened_index(self) -> ListenedIndex:
+        """Listened history từ ratings.pkl, build lần đầu cần tới (CSR theo encoded user của bundle này).
+
+        Interactions nhận lúc runtime (interaction log) được replay vào index mới, nên bundle
+        reload vẫn thấy chúng; podcasts đã có trong ratings export bị bỏ qua.
+        """
+        if self._listened is None:
+            with self._listened_lock:
+                if self._listened is None:
+                    user2idx = self.mappings.get('user2user_encoded', {})
+                    index = ListenedIndex.load(self.model_dir / "ratings.pkl", user2idx, _max_index(user2idx) + 1)
+                    if self.interactions is not None:
+                        for user_id, podcast_ids in self.interactions.listened():
+                            index.append(user_id, podcast_ids)
+                    self._listened = index
+        return self._listened
+
+    @property
+    def version(self) -> str:
+        return str((self.metadata.get('model_info') or {}).get('version', 'unknown'))
+
+    def encode_podcasts(self, podcast_ids: Sequence[str]) -> np.ndarray:
+        """Encoded podcast indices cho catalog, cache theo catalog tuple (một lần mỗi snapshot)"""
+        cached = self._encoded
+        if cached is not None and cached[0] is podcast_ids:
+            return cached[1]
+        podcast_idx = self.scoring_engine.encode_podcasts(podcast_ids)
+        podcast_idx.setflags(write=False)
+        self._encoded = (podcast_ids, podcast_idx)
+        return podcast_idx
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "generation": self.generation,
+            "fingerprint": self.fingerprint,
+            "model_dir": str(self.model_dir),
+            "inference": "numpy" if self.model is not None else "simulated",
+            "loaded_at": datetime.fromtimestamp(self.loaded_at).isoformat(),
+            "load_seconds": round(self.load_seconds, 3),
+        }
+
+
+def load_bundle(model_dir: Path, generation: int) -> ModelBundle:
+    """Load mappings, metadata và model weights (NCF hoặc ALS, xem als_model.py) từ `model_dir`.
+
+    Ưu tiên `artifacts/` (memory-mapped, xem model_artifacts.py); pickles chỉ là fallback.
+    """
+    started = time.perf_counter()
+    fingerprint = bundle_fingerprint(model_dir)
+    logger.info(f"🔄 Loading model from {model_dir}")
+
+    mappings_path = model_dir / "mappings.pkl"
+    metadata_path = model_dir / "model_metadata.json"
+
+    # Load metadata
+    if metadata_path.exists():
+        logger.info("📥 Loading metadata...")
+        with open(metadata_path, 'r') as f:
+            metadata = json.load(f)
+        logger.info("✅ Metadata loaded")
+    else:
+        logger.warning("⚠️ No metadata file found")
+        metadata = {"model_info": {"version": "unknown"}}
+
+    if artifacts_ready(model_dir):
+        # Chỉ map file headers; pages được đọc khi lookup / scoring cần
+        mappings, model = load_artifacts(model_dir)
+        logger.info(f"✅ Memory-mapped artifacts: {len(mappings['user2user_encoded'])} users, "
+                    f"{len(mappings['podcast2podcast_encoded'])} podcasts, model={'yes' if model is not None else 'no'}")
+        return ModelBundle(generation, model_dir, mappings, model_dir / "podcasts.pkl", metadata, model,
+                           fingerprint, time.perf_counter() - started)
+
+    if (model_dir / ARTIFACTS_DIR).exists():
+        logger.warning("⚠️ Model artifacts are older than mappings.pkl / weights, loading pickles "
+                       "(run: python model_artifacts.py --model-dir <dir>)")
+
+    # Load mappings (quan trọng nhất)
+    if mappings_path.exists():
+        logger.info("📥 Loading mappings...")
+        with open(mappings_path, 'rb') as f:
+            mappings = pickle.load(f)
+        logger.info(f"✅ Loaded mappings: {len(mappings['user2user_encoded'])} users, {len(mappings['podcast2podcast_encoded'])} podcasts")
+    else:
+        logger.warning("⚠️ No mappings file found, creating empty mappings")
+        mappings = {
+            'user2user_encoded': {},
+            'podcast2podcast_encoded': {},
+            'userencoded2user': {},
+            'podcastencoded2podcast': {}
+        }
+
+    # Load trained weights (NumPy inference, không cần TensorFlow)
+    try:
+        model = load_model(model_dir, metadata)
+        if model is not None:
+            logger.info(f"✅ {type(model).__name__} loaded: {model.num_users} users, {model.num_podcasts} podcasts, "
+                        f"{model.num_parameters:,} params")
+        else:
+            logger.warning("⚠️ No model weights found (als_weights.npz / ncf_weights.npz / .h5), "
+                           "using training-pattern simulation")
+    except Exception as e:
+        logger.error(f"❌ Failed to load model weights, using training-pattern simulation: {e}")
+        model = None
+
+    return ModelBundle(generation, model_dir, mappings, model_dir / "podcasts.pkl", metadata, model, fingerprint,
+                       time.perf_counter() - started)
+
+
+def validate_bundle(bundle: ModelBundle) -> None:
+    """Mappings phải khớp với model weights; raise BundleValidationError nếu không"""
+    for key in ('user2user_encoded', 'podcast2podcast_encoded'):
+        if not isinstance(bundle.mappings.get(key), Mapping):
+            raise BundleValidationError(f"mappings.pkl is missing '{key}'")
+
+    model = bundle.model
+    if model is None:
+        return
+    user2idx = bundle.mappings['user2user_encoded']
+    podcast2idx = bundle.mappings['podcast2podcast_encoded']
+    if _max_index(user2idx) >= model.num_users:
+        raise BundleValidationError(f"user mappings exceed model users ({model.num_users})")
+    if _max_index(podcast2idx) >= model.num_podcasts:
+        raise BundleValidationError(f"podcast mappings exceed model podcasts ({model.num_podcasts})")
+
+
+def warm_bundle(bundle: ModelBundle) -> float:
+    """Score một sample để page weights vào memory và bắt lỗi numeric trước khi swap"""
+    started = time.perf_counter()
+    user_ids = list(itertools.islice(bundle.scoring_engine.user2idx, WARMUP_USERS)) or ['__warmup__']
+    podcast_ids = list(itertools.islice(bundle.scoring_engine.podcast2idx, WARMUP_PODCASTS)) or ['__warmup__']
+    scores = bundle.scoring_engine.score_users(user_ids, podcast_ids, bundle.encode_podcasts(podcast_ids))
+    if not np.all(np.isfinite(scores)):
+        raise BundleValidationError("warm-up produced non-finite scores")
+    if bundle.model is not None:
+        low, high = bundle.model.output_range
+        if scores.min() < low - 1e-3 or scores.max() > high + 1e-3:
+            raise BundleValidationError(f"warm-up scores outside output range {bundle.model.output_range}")
+    return time.perf_counter() - started
+
+
+class ModelRegistry:
+    """Giữ bundle active (+ optional canary) và reload ở background.
+
+    - Swap chỉ là gán reference: request đã lấy bundle cũ chạy xong trên bundle cũ.
+    - Canary nhận `canary_percent`% users, chọn ổn định theo crc32(user_id).
+    - Watcher poll fingerprint của `model_dir`; chỉ reload khi fingerprint đứng yên
+      qua hai lần poll (tránh đọc file đang copy dở).
+    - Multi-worker (`shared` != None): admin reload / promote / rollback ghi model state
+      vào shared dir, các workers khác poll và áp dụng cùng state (kể cả worker mới spawn).
+    """
+
+    def __init__(
+        self,
+        model_dir: Path,
+        poll_interval: float = 30.0,
+        on_swap: Optional[Callable[[], None]] = None,
+        shared: Optional[SharedState] = None,
+        shared_poll_interval: float = 2.0,
+        prepare: Optional[Callable[[ModelBundle], None]] = None,
+    ):
+        self.model_dir = model_dir
+        self.poll_interval = poll_interval
+        self.on_swap = on_swap
+        self.prepare = prepare      # gọi với bundle mới trước validate / warm-up
+        self.shared = shared
+        self.shared_poll_interval = shared_poll_interval
+        self.active = None          # type: Optional[ModelBundle]
+        self.canary = None          # type: Optional[ModelBundle]
+        self.canary_percent = 0.0
+        self.last_error = None      # type: Optional[str]
+        self._generation = 0
+        self._lock = asyncio.Lock()
+        self._watch_task = None     # type: Optional[asyncio.Task]
+        self._watched_fingerprint = None   # type: Optional[str]
+        self._rejected_fingerprint = None  # type: Optional[str]
+        self._state_seq = 0         # model state seq đã áp dụng (multi-worker)
+
+    # ------------------------------------------------------------------ #
+    # Loading
+    # ------------------------------------------------------------------ #
+    def _build(self, model_dir: Path, require_files: bool = True) -> ModelBundle:
+        """Load + validate + warm (blocking; chạy trong executor khi reload).
+
+        Startup cho phép thiếu files (empty mappings + simulation) như trước;
+        reload thì bắt buộc có mappings.pkl để không swap sang một bundle rỗng.
+        """
+        if require_files and not (model_dir / "mappings.pkl").exists():
+            raise BundleValidationError(f"{model_dir} has no mappings.pkl")
+        self._generation += 1
+        bundle = load_bundle(model_dir, self._generation)
+        if self.prepare is not None:
+            self.prepare(bundle)
+        validate_bundle(bundle)
+        warm_seconds = warm_bundle(bundle)
+        if model_dir == self.model_dir:
+            self._watched_fingerprint = bundle.fingerprint
+        logger.info(f"✅ Model bundle {bundle.version} (gen {bundle.generation}) ready: "
+                    f"load {bundle.load_seconds:.2f}s, warm-up {warm_seconds:.2f}s")
+        return bundle
+
+    def load_initial(self) -> bool:
+        """Load đồng bộ lúc startup"""
+        try:
+            self.active = self._build(self.model_dir, require_files=False)
+            self.last_error = None
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"❌ Error loading model: {e}")
+            return False
+
+    async def reload(self, model_dir: Optional[Path] = None, traffic_percent: Optional[float] = None) -> ModelBundle:
+        """Load bundle ở background rồi swap vào.
+
+        traffic_percent None / >= 100 -> thay active; 0 < percent < 100 -> chạy song song làm canary.
+        Raise nếu bundle không load/validate được; bundle hiện tại không bị ảnh hưởng.
+        """
+        bundle = await self._reload(model_dir, traffic_percent)
+        self._publish_state()
+        return bundle
+
+    def promote(self) -> ModelBundle:
+        """Canary -> active (100% traffic)"""
+        bundle = self._promote()
+        self._publish_state()
+        return bundle
+
+    def rollback(self) -> None:
+        """Bỏ canary, toàn bộ traffic về active"""
+        self._rollback()
+        self._publish_state()
+
+    async def _reload(self, model_dir: Optional[Path], traffic_percent: Optional[float]) -> ModelBundle:
+        model_dir = Path(model_dir) if model_dir is not None else self.model_dir
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            try:
+                bundle = await loop.run_in_executor(None, self._build, model_dir)
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"❌ Model reload from {model_dir} failed, keeping current bundle: {e}")
+                raise
+
+            self.last_error = None
+            if traffic_percent is None or traffic_percent >= 100:
+                self.active, self.canary, self.canary_percent = bundle, None, 0.0
+                logger.info(f"🔁 Active model swapped to {bundle.version} (gen {bundle.generation})")
+            else:
+                self.canary, self.canary_percent = bundle, max(0.0, float(traffic_percent))
+                logger.info(f"🧪 Canary model {bundle.version} (gen {bundle.generation}) "
+                            f"serving {self.canary_percent:g}% of users")
+            self._notify()
+            return bundle
+
+    def _promote(self) -> ModelBundle:
+        if self.canary is None:
+            raise ValueError("No canary model loaded")
+        self.active, self.canary, self.canary_percent = self.canary, None, 0.0
+        logger.info(f"🔁 Canary promoted: active model is {self.active.version} (gen {self.active.generation})")
+        self._notify()
+        return self.active
+
+    def _rollback(self) -> None:
+        self.canary, self.canary_percent = None, 0.0
+        self._notify()
+
+    def _notify(self) -> None:
+        if self.on_swap is not None:
+            try:
+                self.on_swap()
+            except Exception as e:
+                logger.error(f"❌ Model swap hook failed: {e}")
+
+    # ------------------------------------------------------------------ #
+    # Serving
+    # ------------------------------------------------------------------ #
+    def select(self, user_id: str) -> Optional[ModelBundle]:
+        """Bundle phục vụ user này; ổn định giữa các requests (và giữa các workers)"""
+        canary = self.canary
+        if canary is not None and zlib.crc32(user_id.encode('utf-8')) % 10000 < self.canary_percent * 100:
+            return canary
+        return self.active
+
+    def bundles(self) -> List[ModelBundle]:
+        return [bundle for bundle in (self.active, self.canary) if bundle is not None]
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "active": self.active.info() if self.active is not None else None,
+            "canary": dict(self.canary.info(), traffic_percent=self.canary_percent) if self.canary is not None else None,
+            "watching": str(self.model_dir) if self._watch_task is not None else None,
+            "last_error": self.last_error,
+        }
+
+    # ------------------------------------------------------------------ #
+    # Multi-worker model state
+    # ------------------------------------------------------------------ #
+    @staticmethod
+    def _spec(bundle: Optional[ModelBundle]) -> Optional[Dict[str, str]]:
+        if bundle is None:
+            return None
+        return {"model_dir": str(bundle.model_dir), "fingerprint": bundle.fingerprint}
+
+    @staticmethod
+    def _matches(bundle: Optional[ModelBundle], spec: Optional[Dict[str, Any]]) -> bool:
+        return (bundle is not None and spec is not None and str(bundle.model_dir) == spec["model_dir"]
+                and bundle.fingerprint == spec["fingerprint"])
+
+    def _publish_state(self) -> None:
+        if self.shared is None:
+            return
+        canary = self._spec(self.canary)
+        if canary is not None:
+            canary["traffic_percent"] = self.canary_percent
+        self._state_seq = self.shared.publish_model_state({"active": self._spec(self.active), "canary": canary})
+
+    async def _follow_state(self) -> None:
+        """Áp dụng model state mới nhất do worker khác publish (mỗi seq một lần)"""
+        state = self.shared.read_model_state()
+        if state is None or state.get("seq", 0) <= self._state_seq:
+            return
+        self._state_seq = state["seq"]
+        active, canary = state.get("active"), state.get("canary")
+        logger.info(f"📡 Applying shared model state {state['seq']}")
+        try:
+            if active is not None and not self._matches(self.active, active):
+                if self._matches(self.canary, active):
+                    self._promote()
+                else:
+                    await self._reload(Path(active["model_dir"]), None)
+            if canary is None:
+                if self.canary is not None:
+                    self._rollback()
+            elif not self._matches(self.canary, canary):
+                await self._reload(Path(canary["model_dir"]), canary["traffic_percent"])
+            else:
+                self.canary_percent = canary["traffic_percent"]
+        except Exception as e:
+            logger.error(f"❌ Failed to apply shared model state: {e}")
+
+    # ------------------------------------------------------------------ #
+    # ./models watcher
+    # ------------------------------------------------------------------ #
+    def start(self) -> None:
+        if (self.poll_interval > 0 or self.shared is not None) and (self._watch_task is None or self._watch_task.done()):
+            self._watch_task = asyncio.ensure_future(self._watch_loop())
+
+    async def stop(self) -> None:
+        if self._watch_task is not None and not self._watch_task.done():
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._watch_task = None
+
+    async def _watch_loop(self) -> None:
+        intervals = [self.poll_interval] if self.poll_interval > 0 else []
+        if self.shared is not None:
+            intervals.append(self.shared_poll_interval)
+        interval = min(intervals)
+        pending = None
+        next_scan = time.monotonic() + self.poll_interval
+        while True:
+            if self.shared is not None:
+                await self._follow_state()
+            if self.poll_interval > 0 and time.monotonic() >= next_scan:
+                next_scan = time.monotonic() + self.poll_interval
+                pending = await self._scan_model_dir(pending)
+            await asyncio.sleep(interval)
+
+    async def _scan_model_dir(self, pending: Optional[str]) -> Optional[str]:
+        """Reload khi fingerprint của model_dir đổi và đứng yên qua hai lần scan; trả về fingerprint đang chờ"""
+        fingerprint = bundle_fingerprint(self.model_dir)
+        if fingerprint == self._watched_fingerprint or fingerprint == self._rejected_fingerprint:
+            return None
+        if fingerprint != pending:
+            # Đợi thêm một poll để chắc file đã copy xong
+            return fingerprint
+        logger.info(f"📦 New model bundle detected in {self.model_dir}")
+        try:
+            # Mỗi worker tự watch model_dir, nên không cần broadcast
+            await self._reload(None, None)
+        except Exception:
+            self._rejected_fingerprint = fingerprint
+        return None
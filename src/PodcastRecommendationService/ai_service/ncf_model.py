@@ -0,0 +1,391 @@
+"""
+NCF MODEL - TENSORFLOW-FREE NUMPY INFERENCE
+Đọc weights từ collaborative_filtering_model.h5 (hoặc bản export .npz) và predict bằng NumPy
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import h5py  # Only needed to read the original Keras .h5 file
+except ImportError:  # pragma: no cover - optional dependency
+    h5py = None
+
+# Keras output layer is sigmoid, followed by a Lambda scaling to this range
+DEFAULT_OUTPUT_RANGE = (1.0, 5.0)
+
+# Rows scored per chunk in batch inference, keeps (rows x 256) hidden buffers small
+SCORE_CHUNK_ROWS = 16384
+
+_ACTIVATIONS = ('relu', 'sigmoid', 'linear')
+
+# Keras layers without weights that do not change inference (Dropout is a no-op at predict time)
+_PASSTHROUGH_LAYERS = frozenset({'InputLayer', 'Flatten', 'Concatenate', 'Dropout'})
+# The notebook's output Lambda (sigmoid -> output range), applied via `output_range`
+_OUTPUT_LAMBDA_LAYERS = frozenset({'rating_scaled'})
+
+# Layer activations + output range next to the raw .npy weights
+NPY_CONFIG_FILE = "ncf_config.json"
+
+
+class NCFModel:
+    """Neural Collaborative Filtering model: embeddings -> concat -> dense MLP -> rating"""
+
+    def __init__(
+        self,
+        user_embeddings: np.ndarray,
+        podcast_embeddings: np.ndarray,
+        dense_layers: List[Tuple[np.ndarray, np.ndarray, str]],
+        output_range: Tuple[float, float] = DEFAULT_OUTPUT_RANGE,
+        projections: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+    ):
+        if not dense_layers:
+            raise ValueError("NCF model needs at least one dense layer")
+        for _, _, activation in dense_layers:
+            if activation not in _ACTIVATIONS:
+                raise ValueError(f"Unsupported activation: {activation}")
+
+        self.user_embeddings = np.ascontiguousarray(user_embeddings, dtype=np.float32)
+        self.podcast_embeddings = np.ascontiguousarray(podcast_embeddings, dtype=np.float32)
+        self.dense_layers = [
+            (np.ascontiguousarray(w, dtype=np.float32), np.ascontiguousarray(b, dtype=np.float32), act)
+            for w, b, act in dense_layers
+        ]
+        self.output_range = (float(output_range[0]), float(output_range[1]))
+
+        embedding_size = self.user_embeddings.shape[1]
+        first_kernel, first_bias, _ = self.dense_layers[0]
+        if first_kernel.shape[0] != embedding_size + self.podcast_embeddings.shape[1]:
+            raise ValueError("First dense layer does not match concatenated embedding size")
+
+        # concat([u, p]) @ W == u @ W[:d] + p @ W[d:], so the first layer splits
+        # into a per-user and a per-podcast projection computed once at load
+        # (or read back from `save_npy_dir` output, which stores them precomputed)
+        if projections is not None:
+            self.user_projection, self.podcast_projection = projections
+        else:
+            self.user_projection = self.user_embeddings @ first_kernel[:embedding_size]
+            self.podcast_projection = self.podcast_embeddings @ first_kernel[embedding_size:] + first_bias
+
+    @property
+    def num_users(self) -> int:
+        return self.user_embeddings.shape[0]
+
+    @property
+    def num_podcasts(self) -> int:
+        return self.podcast_embeddings.shape[0]
+
+    @property
+    def embedding_size(self) -> int:
+        return self.user_embeddings.shape[1]
+
+    @property
+    def num_parameters(self) -> int:
+        return int(
+            self.user_embeddings.size + self.podcast_embeddings.size +
+            sum(w.size + b.size for w, b, _ in self.dense_layers)
+        )
+
+    # ------------------------------------------------------------------ #
+    # Loading / export
+    # ------------------------------------------------------------------ #
+    @classmethod
+    def from_h5(cls, path: Path, output_range: Tuple[float, float] = DEFAULT_OUTPUT_RANGE) -> "NCFModel":
+        """Read embeddings and dense weights directly from a Keras .h5 file"""
+        if h5py is None:
+            raise ImportError("h5py is required to read .h5 models (or export to .npz first)")
+
+        with h5py.File(path, 'r') as f:
+            config = json.loads(_as_str(f.attrs['model_config']))
+            layers = config['config']['layers']
+            weights = f['model_weights']
+
+            def has_weights(name: str) -> bool:
+                return name in weights and len(weights[name].attrs.get('weight_names', ())) > 0
+
+            def layer_weights(name: str, *keys: str) -> List[np.ndarray]:
+                group = weights[name]
+                # Keras nests weights under <layer>/<layer>/<var>
+                if name in group:
+                    group = group[name]
+                return [np.asarray(group[key]) for key in keys]
+
+            user_embeddings = podcast_embeddings = None
+            dense_layers = []
+            for layer in layers:
+                name = layer['config']['name']
+                if layer['class_name'] == 'Embedding':
+                    (embeddings,) = layer_weights(name, 'embeddings')
+                    if 'user' in name:
+                        user_embeddings = embeddings
+                    elif 'podcast' in name:
+                        podcast_embeddings = embeddings
+                elif layer['class_name'] == 'Dense':
+                    kernel, bias = layer_weights(name, 'kernel', 'bias')
+                    dense_layers.append((kernel, bias, layer['config'].get('activation', 'linear')))
+                elif has_weights(name):
+                    # e.g. BatchNormalization: skipping it would serve wrong scores without an error
+                    raise ValueError(f"{path}: unsupported layer {name!r} ({layer['class_name']}) has weights")
+                elif not (layer['class_name'] in _PASSTHROUGH_LAYERS or
+                          (layer['class_name'] == 'Lambda' and name in _OUTPUT_LAMBDA_LAYERS)):
+                    raise ValueError(f"{path}: unsupported layer {name!r} ({layer['class_name']})")
+
+        if user_embeddings is None or podcast_embeddings is None:
+            raise ValueError(f"{path} does not contain user/podcast embedding layers")
+
+        return cls(user_embeddings, podcast_embeddings, dense_layers, output_range)
+
+    @classmethod
+    def from_npz(cls, path: Path) -> "NCFModel":
+        """Load a compact bundle written by `save_npz`"""
+        with np.load(path, allow_pickle=False) as data:
+            activations = [str(a) for a in data['activations']]
+            dense_layers = [
+                (data[f'dense_{i}_kernel'], data[f'dense_{i}_bias'], activation)
+                for i, activation in enumerate(activations)
+            ]
+            return cls(
+                data['user_embeddings'],
+                data['podcast_embeddings'],
+                dense_layers,
+                tuple(data['output_range'].tolist()),
+            )
+
+    def save_npz(self, path: Path) -> None:
+        """Export weights to a TensorFlow/h5py-free .npz bundle"""
+        arrays = {
+            'user_embeddings': self.user_embeddings,
+            'podcast_embeddings': self.podcast_embeddings,
+            'activations': np.array([act for _, _, act in self.dense_layers]),
+            'output_range': np.array(self.output_range, dtype=np.float32),
+        }
+        for i, (kernel, bias, _) in enumerate(self.dense_layers):
+            arrays[f'dense_{i}_kernel'] = kernel
+            arrays[f'dense_{i}_bias'] = bias
+        np.savez(path, **arrays)
+
+    @classmethod
+    def from_npy_dir(cls, directory: Path, mmap_mode: Optional[str] = 'r') -> "NCFModel":
+        """Load raw .npy weights written by `save_npy_dir`, memory-mapped by default.
+
+        Projections are stored precomputed, so load time does not grow with the
+        number of users / podcasts; pages are read on first use.
+        """
+        config = json.loads((directory / NPY_CONFIG_FILE).read_text())
+
+        def load(name: str) -> np.ndarray:
+            return np.load(directory / f"{name}.npy", mmap_mode=mmap_mode, allow_pickle=False)
+
+        dense_layers = [
+            (load(f'dense_{i}_kernel'), load(f'dense_{i}_bias'), activation)
+            for i, activation in enumerate(config['activations'])
+        ]
+        return cls(
+            load('user_embeddings'),
+            load('podcast_embeddings'),
+            dense_layers,
+            tuple(config['output_range']),
+            projections=(load('user_projection'), load('podcast_projection')),
+        )
+
+    def save_npy_dir(self, directory: Path) -> None:
+        """Export weights + first-layer projections as one raw .npy file per array"""
+        directory.mkdir(parents=True, exist_ok=True)
+        arrays = {
+            'user_embeddings': self.user_embeddings,
+            'podcast_embeddings': self.podcast_embeddings,
+            'user_projection': self.user_projection,
+            'podcast_projection': self.podcast_projection,
+        }
+        for i, (kernel, bias, _) in enumerate(self.dense_layers):
+            arrays[f'dense_{i}_kernel'] = kernel
+            arrays[f'dense_{i}_bias'] = bias
+        for name, array in arrays.items():
+            np.save(directory / f"{name}.npy", np.ascontiguousarray(array, dtype=np.float32))
+        config = {
+            'activations': [act for _, _, act in self.dense_layers],
+            'output_range': list(self.output_range),
+        }
+        (directory / NPY_CONFIG_FILE).write_text(json.dumps(config))
+
+    # ------------------------------------------------------------------ #
+    # Inference
+    # ------------------------------------------------------------------ #
+    def _head(self, hidden: np.ndarray) -> np.ndarray:
+        """Run the MLP from the first-layer pre-activation to the scaled rating"""
+        hidden = _activate(hidden, self.dense_layers[0][2])
+        for kernel, bias, activation in self.dense_layers[1:]:
+            hidden = _activate(hidden @ kernel + bias, activation)
+        low, high = self.output_range
+        return hidden[..., 0] * (high - low) + low
+
+    def predict(self, user_indices: np.ndarray, podcast_indices: np.ndarray) -> np.ndarray:
+        """Pairwise prediction, same contract as `model.predict([users, podcasts])[:, 0]`"""
+        user_indices = np.asarray(user_indices, dtype=np.int64)
+        podcast_indices = np.asarray(podcast_indices, dtype=np.int64)
+        out = np.empty(len(user_indices), dtype=np.float32)
+        for start in range(0, len(user_indices), SCORE_CHUNK_ROWS):
+            end = start + SCORE_CHUNK_ROWS
+            out[start:end] = self._head(
+                self.user_projection[user_indices[start:end]] +
+                self.podcast_projection[podcast_indices[start:end]]
+            )
+        return out
+
+    def score_user(self, user_index: int, podcast_indices: np.ndarray) -> np.ndarray:
+        """Ratings of one user against many podcasts"""
+        podcast_indices = np.asarray(podcast_indices, dtype=np.int64)
+        out = np.empty(len(podcast_indices), dtype=np.float32)
+        user_row = self.user_projection[user_index]
+        for start in range(0, len(podcast_indices), SCORE_CHUNK_ROWS):
+            end = start + SCORE_CHUNK_ROWS
+            out[start:end] = self._head(self.podcast_projection[podcast_indices[start:end]] + user_row)
+        return out
+
+    def score_users(self, user_indices: np.ndarray, podcast_indices: np.ndarray) -> np.ndarray:
+        """(users x podcasts) rating block, one broadcasted MLP pass per chunk of users"""
+        user_indices = np.asarray(user_indices, dtype=np.int64)
+        return self.score_projections(self.user_projection[user_indices], podcast_indices)
+
+    def score_projections(self, user_rows: np.ndarray, podcast_indices: np.ndarray) -> np.ndarray:
+        """`score_users` với first-layer user projections cho sẵn (vd. folded-in users, xem `fold_in`)"""
+        podcast_indices = np.asarray(podcast_indices, dtype=np.int64)
+        return self.score_rows(user_rows, self.podcast_projection[podcast_indices])
+
+    def score_rows(self, user_rows: np.ndarray, podcast_rows: np.ndarray) -> np.ndarray:
+        """(users x podcasts) ratings từ first-layer projections của cả hai phía (vd. ANN centroids)"""
+        num_podcasts = len(podcast_rows)
+        out = np.empty((len(user_rows), num_podcasts), dtype=np.float32)
+        if num_podcasts == 0:
+            return out
+
+        users_per_chunk = max(1, SCORE_CHUNK_ROWS // num_podcasts)
+        for start in range(0, len(user_rows), users_per_chunk):
+            chunk = user_rows[start:start + users_per_chunk]
+            hidden = (chunk[:, None, :] + podcast_rows[None, :, :]).reshape(-1, podcast_rows.shape[1])
+            out[start:start + len(chunk)] = self._head(hidden).reshape(len(chunk), num_podcasts)
+        return out
+
+    # ------------------------------------------------------------------ #
+    # Online fold-in
+    # ------------------------------------------------------------------ #
+    def project_user(self, embedding: np.ndarray) -> np.ndarray:
+        """User embedding -> first-layer projection (cùng vai trò một row của `user_projection`)"""
+        return np.asarray(embedding, dtype=np.float32) @ self.dense_layers[0][0][:self.embedding_size]
+
+    def fold_in(
+        self,
+        podcast_indices: np.ndarray,
+        ratings: np.ndarray,
+        prior: np.ndarray,
+        regularization: float = 10.0,
+        steps: int = 1,
+    ) -> np.ndarray:
+        """User embedding khớp `ratings` của `podcast_indices`, podcast embeddings + MLP giữ nguyên.
+
+        Minimize sum (rating - predict(u, p))^2 + regularization * |u - prior|^2 bằng Gauss-Newton:
+        mỗi step linearize MLP quanh u hiện tại rồi giải một regularized least-squares nhỏ
+        (k x k với k ratings, hoặc d x d khi k > embedding size) - không cần retrain.
+        """
+        podcast_rows = self.podcast_projection[np.asarray(podcast_indices, dtype=np.int64)]
+        ratings = np.asarray(ratings, dtype=np.float32)
+        prior = np.asarray(prior, dtype=np.float32)
+        kernel = self.dense_layers[0][0][:self.embedding_size]
+        user = prior.copy()
+        for _ in range(steps):
+            predicted, gradient = self._head_gradient(user @ kernel + podcast_rows)
+            jacobian = gradient @ kernel.T  # (k x d): d rating / d user embedding
+            target = ratings - predicted + jacobian @ (user - prior)
+            if len(ratings) <= self.embedding_size:
+                gram = jacobian @ jacobian.T
+                gram.flat[::len(ratings) + 1] += regularization
+                user = prior + jacobian.T @ np.linalg.solve(gram, target)
+            else:
+                gram = jacobian.T @ jacobian
+                gram.flat[::self.embedding_size + 1] += regularization
+                user = prior + np.linalg.solve(gram, jacobian.T @ target)
+        return user.astype(np.float32)
+
+    def _head_gradient(self, hidden: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(`_head(hidden)`, d rating / d hidden) - backprop qua các dense layers"""
+        pre_activations = [hidden]
+        x = _activate(hidden.copy(), self.dense_layers[0][2])
+        for kernel, bias, activation in self.dense_layers[1:]:
+            pre_activations.append(x @ kernel + bias)
+            x = _activate(pre_activations[-1].copy(), activation)
+        low, high = self.output_range
+        gradient = np.full_like(x, high - low)
+        for i in range(len(self.dense_layers) - 1, -1, -1):
+            gradient = gradient * _derivative(pre_activations[i], self.dense_layers[i][2])
+            if i:
+                gradient = gradient @ self.dense_layers[i][0].T
+        return x[..., 0] * (high - low) + low, gradient
+
+
+def _activate(x: np.ndarray, activation: str) -> np.ndarray:
+    if activation == 'relu':
+        return np.maximum(x, 0.0, out=x)
+    if activation == 'sigmoid':
+        # Numerically stable form of 1 / (1 + exp(-x))
+        return 0.5 * (np.tanh(0.5 * x) + 1.0)
+    return x
+
+
+def _derivative(x: np.ndarray, activation: str) -> np.ndarray:
+    """Đạo hàm của activation tại pre-activation x"""
+    if activation == 'relu':
+        return (x > 0).astype(x.dtype)
+    if activation == 'sigmoid':
+        sigmoid = 0.5 * (np.tanh(0.5 * x) + 1.0)
+        return sigmoid * (1.0 - sigmoid)
+    return np.ones_like(x)
+
+
+def _as_str(value) -> str:
+    return value.decode('utf-8') if isinstance(value, bytes) else str(value)
+
+
+def output_range_from_metadata(metadata: Optional[dict]) -> Tuple[float, float]:
+    """`architecture.output_range` from model_metadata.json, or the Kaggle default"""
+    output_range = ((metadata or {}).get('architecture') or {}).get('output_range')
+    if output_range and len(output_range) == 2:
+        return float(output_range[0]), float(output_range[1])
+    return DEFAULT_OUTPUT_RANGE
+
+
+def load_ncf_model(model_dir: Path, metadata: Optional[dict] = None) -> Optional[NCFModel]:
+    """Prefer the exported .npz, fall back to the Keras .h5; None if neither is usable"""
+    npz_path = model_dir / "ncf_weights.npz"
+    h5_path = model_dir / "collaborative_filtering_model.h5"
+    if npz_path.exists():
+        return NCFModel.from_npz(npz_path)
+    if h5_path.exists() and h5py is not None:
+        return NCFModel.from_h5(h5_path, output_range_from_metadata(metadata))
+    return None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Export collaborative_filtering_model.h5 to a NumPy .npz bundle")
+    parser.add_argument('--model-dir', default='./models', type=Path)
+    parser.add_argument('--output', default=None, type=Path, help="Default: <model-dir>/ncf_weights.npz")
+    args = parser.parse_args(argv)
+
+    metadata_path = args.model_dir / "model_metadata.json"
+    metadata = json.loads(metadata_path.read_text()) if metadata_path.exists() else None
+
+    model = NCFModel.from_h5(args.model_dir / "collaborative_filtering_model.h5", output_range_from_metadata(metadata))
+    output = args.output or args.model_dir / "ncf_weights.npz"
+    model.save_npz(output)
+
+    print(f"✅ Exported {model.num_parameters:,} parameters "
+          f"({model.num_users} users, {model.num_podcasts} podcasts, dim={model.embedding_size}) -> {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
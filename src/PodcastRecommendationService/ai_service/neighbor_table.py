@@ -0,0 +1,228 @@
+"""
+ITEM-ITEM NEIGHBOR TABLE
+Top-N cosine neighbors (int32 rows + float16 similarities) cho mọi podcast trong catalog, tính bằng
+blocked matrix multiplies - full similarity matrix không bao giờ nằm trong memory - và serve bằng
+memory-mapped .npy files; podcasts mới được thêm incrementally
+"""
+
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from scoring import top_k_rows
+
+logger = logging.getLogger(__name__)
+
+VECTORS_FILE = "vectors.npy"
+NEIGHBORS_FILE = "neighbors.npy"
+SIMILARITIES_FILE = "similarities.npy"
+META_FILE = "neighbors_meta.json"
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Unit-length float32 rows (zero rows giữ nguyên = không có vector)"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+def blocked_neighbors(
+    queries: np.ndarray,
+    items: np.ndarray,
+    n: int,
+    block_cells: int = 1_000_000,
+    self_offset: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-n cosine neighbors của từng query trong `items` (rows đã normalize).
+
+    Mỗi block chỉ giữ (block x items) similarities; `self_offset` = row của query đầu tiên
+    trong `items` để loại chính nó.
+    """
+    n = min(n, len(items) - (1 if self_offset is not None else 0))
+    neighbors = np.empty((len(queries), max(n, 0)), dtype=np.int32)
+    similarities = np.empty((len(queries), max(n, 0)), dtype=np.float16)
+    if n <= 0:
+        return neighbors, similarities
+    rows_per_block = max(1, block_cells // max(1, len(items)))
+    for start in range(0, len(queries), rows_per_block):
+        block = queries[start:start + rows_per_block]
+        sims = block @ items.T
+        if self_offset is not None:
+            rows = np.arange(len(block))
+            sims[rows, self_offset + start + rows] = -np.inf
+        top = top_k_rows(sims, n)
+        neighbors[start:start + len(block)] = top
+        similarities[start:start + len(block)] = np.take_along_axis(sims, top, axis=1)
+    return neighbors, similarities
+
+
+class NeighborTable:
+    """Row r = podcast_ids[r]; neighbors[r] = rows của n podcasts giống nhất, similarity giảm dần.
+
+    Immutable sau khi publish: `add` trả về table mới nên request đang đọc table cũ không bị ảnh hưởng.
+    """
+
+    def __init__(
+        self,
+        podcast_ids: List[str],
+        vectors: np.ndarray,
+        neighbors: np.ndarray,
+        similarities: np.ndarray,
+        model_version: int,
+        catalog_version: int = 0,
+        duration_seconds: float = 0.0,
+    ):
+        self.podcast_ids = podcast_ids
+        self.vectors = vectors
+        self.neighbors = neighbors
+        self.similarities = similarities
+        self.model_version = model_version
+        self.catalog_version = catalog_version
+        self.duration_seconds = duration_seconds
+        self.rows = {pid: i for i, pid in enumerate(podcast_ids)}  # type: Dict[str, int]
+        self.directory = None    # type: Optional[Path]  # set by `load`
+        self._catalog_for = None  # type: Optional[Sequence[str]]
+        self._catalog_rows = None  # type: Optional[np.ndarray]
+
+    @property
+    def num_podcasts(self) -> int:
+        return len(self.podcast_ids)
+
+    @property
+    def n(self) -> int:
+        return self.neighbors.shape[1]
+
+    def stats(self) -> dict:
+        return {
+            "podcasts": self.num_podcasts,
+            "neighbors": self.n,
+            "catalog_version": self.catalog_version,
+            "model_version": self.model_version,
+            "duration_seconds": round(self.duration_seconds, 3),
+        }
+
+    def lookup(self, podcast_id: str, n: int, catalog_ids: Sequence[str]) -> Optional[Tuple[np.ndarray, List[float]]]:
+        """(candidate rows trong `catalog_ids`, similarities) của n neighbors còn trong catalog; None nếu không có podcast"""
+        row = self.rows.get(podcast_id)
+        if row is None:
+            return None
+        cols = self.catalog_rows(catalog_ids)[self.neighbors[row]]
+        live = cols >= 0
+        return cols[live][:n], [round(float(s), 4) for s in self.similarities[row][live][:n]]
+
+    def catalog_rows(self, catalog_ids: Sequence[str]) -> np.ndarray:
+        """table row -> candidate row (-1 = podcast đã bị xoá khỏi catalog), cache theo catalog tuple"""
+        if self._catalog_for is not catalog_ids:
+            rows = {pid: i for i, pid in enumerate(catalog_ids)}
+            self._catalog_rows = np.fromiter((rows.get(pid, -1) for pid in self.podcast_ids),
+                                             dtype=np.int64, count=self.num_podcasts)
+            self._catalog_for = catalog_ids
+        return self._catalog_rows
+
+    def with_catalog_version(self, catalog_version: int) -> "NeighborTable":
+        """Table mới cho `catalog_version`, share arrays / directory với table này (không mutate table đã publish)"""
+        table = NeighborTable(self.podcast_ids, self.vectors, self.neighbors, self.similarities,
+                              self.model_version, catalog_version, self.duration_seconds)
+        table.rows, table.directory = self.rows, self.directory
+        table._catalog_for, table._catalog_rows = self._catalog_for, self._catalog_rows
+        return table
+
+    def add(self, podcast_ids: List[str], vectors: np.ndarray, block_cells: int = 1_000_000) -> "NeighborTable":
+        """Table mới có thêm `podcast_ids`: neighbors của rows mới được tính trên toàn bộ items,
+        rows cũ chỉ merge các podcasts mới vào top-n hiện có (không tính lại cả table)
+        """
+        started = time.perf_counter()
+        vectors = normalize_rows(vectors)
+        keep = np.flatnonzero(vectors.any(axis=1))
+        if not keep.size:
+            return self
+        podcast_ids, vectors = [podcast_ids[i] for i in keep.tolist()], vectors[keep]
+        base, n = self.num_podcasts, self.n
+        items = np.concatenate([np.asarray(self.vectors, dtype=np.float32), vectors])
+        new_neighbors, new_similarities = blocked_neighbors(vectors, items, n, block_cells, self_offset=base)
+
+        neighbors = np.empty((base, n), dtype=np.int32)
+        similarities = np.empty((base, n), dtype=np.float16)
+        added = np.arange(base, base + len(podcast_ids), dtype=np.int32)
+        rows_per_block = max(1, block_cells // max(1, n + len(podcast_ids)))
+        for start in range(0, base, rows_per_block):
+            stop = min(start + rows_per_block, base)
+            sims = np.concatenate([
+                np.asarray(self.similarities[start:stop], dtype=np.float32),
+                np.asarray(self.vectors[start:stop], dtype=np.float32) @ vectors.T
+            ], axis=1)
+            candidates = np.concatenate([
+                np.asarray(self.neighbors[start:stop]),
+                np.broadcast_to(added, (stop - start, len(podcast_ids)))
+            ], axis=1)
+            top = top_k_rows(sims, n)
+            neighbors[start:stop] = np.take_along_axis(candidates, top, axis=1)
+            similarities[start:stop] = np.take_along_axis(sims, top, axis=1)
+
+        return NeighborTable(
+            self.podcast_ids + list(podcast_ids),
+            items,
+            np.concatenate([neighbors, new_neighbors]),
+            np.concatenate([similarities, new_similarities]),
+            self.model_version,
+            self.catalog_version,
+            time.perf_counter() - started,
+        )
+
+    def save(self, directory: Path) -> None:
+        """Ghi atomically (tmp + rename) như TopKTable"""
+        directory.mkdir(parents=True, exist_ok=True)
+        meta = {
+            "model_version": self.model_version,
+            "catalog_version": self.catalog_version,
+            "duration_seconds": self.duration_seconds,
+            "podcast_ids": self.podcast_ids,
+        }
+        for name, array in ((VECTORS_FILE, self.vectors), (NEIGHBORS_FILE, self.neighbors),
+                            (SIMILARITIES_FILE, self.similarities)):
+            tmp = directory / f".{name}.tmp"
+            with open(tmp, 'wb') as f:
+                np.save(f, array)
+            os.replace(tmp, directory / name)
+        tmp = directory / f".{META_FILE}.tmp"
+        tmp.write_text(json.dumps(meta))
+        os.replace(tmp, directory / META_FILE)
+
+    @classmethod
+    def load(cls, directory: Path) -> "NeighborTable":
+        meta = json.loads((directory / META_FILE).read_text())
+        table = cls(
+            meta['podcast_ids'],
+            np.load(directory / VECTORS_FILE, mmap_mode='r'),
+            np.load(directory / NEIGHBORS_FILE, mmap_mode='r'),
+            np.load(directory / SIMILARITIES_FILE, mmap_mode='r'),
+            meta['model_version'],
+            meta.get('catalog_version', 0),
+            meta.get('duration_seconds', 0.0),
+        )
+        table.directory = directory
+        return table
+
+
+def build_neighbor_table(
+    podcast_ids: Sequence[str],
+    vectors: np.ndarray,
+    model_version: int,
+    n: int = 50,
+    block_cells: int = 1_000_000,
+) -> NeighborTable:
+    """Full build; podcasts không có vector (zero row) bị bỏ qua"""
+    started = time.perf_counter()
+    vectors = normalize_rows(vectors)
+    keep = np.flatnonzero(vectors.any(axis=1))
+    vectors = vectors[keep]
+    neighbors, similarities = blocked_neighbors(vectors, vectors, n, block_cells, self_offset=0)
+    table = NeighborTable([podcast_ids[i] for i in keep.tolist()], vectors, neighbors, similarities,
+                          model_version, duration_seconds=time.perf_counter() - started)
+    logger.info(f"🧭 Built top-{table.n} neighbors for {table.num_podcasts} podcasts in {table.duration_seconds:.2f}s")
+    return table
@@ -0,0 +1,63 @@
+"""
+RESPONSE ENCODING
+Pre-encoded camelCase JSON fragments cho từng podcast (một lần mỗi catalog snapshot);
+responses được ghép từ fragments + predictedRating, byte-compatible với JSONResponse
+"""
+
+import json
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+try:
+    import orjson  # Fast encoder cho strings / ints; output giống json.dumps(ensure_ascii=False) compact
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+RATING_KEY = 'predictedRating'
+
+
+def encode_json(value: Any) -> bytes:
+    """Compact JSON như starlette JSONResponse (ensure_ascii=False, separators=(",", ":")).
+
+    Chỉ dùng cho str / int / None / dict / list không chứa float: orjson format float
+    exponents khác stdlib (1e+16 vs 1e16). Ratings đi qua `encode_rating`.
+    """
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode('utf-8')
+
+
+def encode_rating(rating: float) -> bytes:
+    # json.dumps dùng float.__repr__ cho floats
+    return float.__repr__(float(rating)).encode('ascii')
+
+
+class PodcastFragments:
+    """JSON bytes của mỗi candidate podcast, tách quanh `predictedRating`.
+
+    `row_payload(i)` trả về camelCase dict của PodcastRecommendation (rating placeholder);
+    mỗi row được encode lần đầu cần đến rồi dùng lại cho mọi request cùng snapshot.
+    """
+
+    def __init__(self, row_payload: Callable[[int], Dict[str, Any]], size: int):
+        self._row_payload = row_payload
+        self._prefixes = [None] * size  # type: List[Optional[bytes]]
+        self._suffixes = [None] * size  # type: List[Optional[bytes]]
+
+    def _encode(self, i: int) -> None:
+        payload = self._row_payload(i)
+        keys = list(payload)
+        split = keys.index(RATING_KEY)
+        head = encode_json({key: payload[key] for key in keys[:split]})
+        tail = encode_json({key: payload[key] for key in keys[split + 1:]})
+        # '{"podcastId":..,"title":..,"predictedRating":' + rating + ',"category":..}'
+        self._prefixes[i] = (head[:-1] + b',' if split else b'{') + b'"' + RATING_KEY.encode() + b'":'
+        self._suffixes[i] = b',' + tail[1:] if len(tail) > 2 else b'}'
+
+    def item(self, i: int, rating: float) -> bytes:
+        if self._prefixes[i] is None:
+            self._encode(i)
+        return self._prefixes[i] + encode_rating(rating) + self._suffixes[i]
+
+    def array(self, indices: Sequence[int], ratings: Sequence[float]) -> bytes:
+        """JSON array `[{...},{...}]` cho top-N của một user"""
+        return b'[' + b','.join(self.item(i, rating) for i, rating in zip(indices, ratings)) + b']'
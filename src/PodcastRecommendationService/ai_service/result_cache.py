@@ -0,0 +1,91 @@
+"""
+RECOMMENDATION RESULT CACHE
+Bounded LRU + TTL cache cho serialized recommendation results, key theo
+(user_id, num_recommendations, catalog_version, model_version)
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+# Ước lượng overhead mỗi entry (key tuple, OrderedDict node, bytes header)
+ENTRY_OVERHEAD_BYTES = 256
+
+
+class ResultCache:
+    """Memory-bounded LRU cache với TTL.
+
+    Invalidation không cần duyệt entries: catalog refresh / model reload bump version,
+    version nằm trong key nên entries cũ không bao giờ hit nữa và bị LRU đẩy ra dần.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, ttl_seconds: float = 300):
+        self.max_bytes = max(0, max_bytes)
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # type: OrderedDict[Hashable, Tuple[float, int, bytes]]
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, size, value = entry
+            if expires_at <= time.monotonic():
+                self._remove(key, size)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: bytes) -> None:
+        size = len(value) + ENTRY_OVERHEAD_BYTES
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous[1]
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, size, value)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                old_key, (_, old_size, _) = next(iter(self._entries.items()))
+                self._remove(old_key, old_size)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def _remove(self, key: Hashable, size: int) -> None:
+        del self._entries[key]
+        self.current_bytes -= size
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -0,0 +1,217 @@
+"""
+VECTORIZED SCORING ENGINE
+Score toàn bộ candidate catalog cho một user bằng NumPy, không đụng global RNG
+"""
+
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from content_index import ContentIndex
+from ncf_model import NCFModel
+
+if TYPE_CHECKING:
+    from interactions import UserVectorOverlay
+
+# Seeds used by the legacy per-pair scorer are always reduced modulo this value
+SEED_SPACE = 10000
+
+
+@lru_cache(maxsize=1)
+def _seed_tables() -> Tuple[np.ndarray, np.ndarray]:
+    """Precompute the value every legacy seed would have produced.
+
+    The old scorer did `np.random.seed(seed)` followed by a single draw, so the
+    score is a pure function of the seed. Drawing once per seed from a private
+    RandomState gives the identical numbers without touching `np.random`.
+    """
+    rng = np.random.RandomState()
+    known = np.empty(SEED_SPACE, dtype=np.float64)
+    cold = np.empty(SEED_SPACE, dtype=np.float64)
+    for seed in range(SEED_SPACE):
+        rng.seed(seed)
+        known[seed] = rng.normal(4.0, 0.8)
+        rng.seed(seed)
+        cold[seed] = rng.uniform(2.5, 4.5)
+    np.clip(known, 1.0, 5.0, out=known)
+    known.setflags(write=False)
+    cold.setflags(write=False)
+    return known, cold
+
+
+class ScoringEngine:
+    """Batch scorer: một lần gọi = một user x toàn bộ candidates"""
+
+    def __init__(
+        self,
+        user2idx: Mapping[str, int],
+        podcast2idx: Mapping[str, int],
+        model: Optional[NCFModel] = None,
+        content: Optional[ContentIndex] = None,
+        history: Optional[Callable[[str], Sequence[str]]] = None,
+    ):
+        self.user2idx = user2idx or {}
+        self.podcast2idx = podcast2idx or {}
+        self.model = model
+        # Cold pairs: content-based scorer + podcasts user đã nghe (None = legacy hash fallback)
+        self.content = content
+        self.history = history
+        # Folded-in vectors từ interaction events, đọc trước user embeddings đã train
+        self.overlay = None  # type: Optional[UserVectorOverlay]
+        self._known_table, self._cold_table = _seed_tables()
+
+    def encode_podcasts(self, podcast_ids: Sequence[str]) -> np.ndarray:
+        """Map podcast IDs to training indices (-1 = not in training data).
+
+        Depends only on the catalog, so callers should compute it once per
+        catalog refresh and reuse it for every user.
+        """
+        lookup_many = getattr(self.podcast2idx, 'lookup_many', None)
+        if lookup_many is not None:
+            return lookup_many(podcast_ids)  # memory-mapped IdIndex: vectorized binary search
+        lookup = self.podcast2idx.get
+        return np.fromiter(
+            (lookup(pid, -1) for pid in podcast_ids),
+            dtype=np.int64,
+            count=len(podcast_ids),
+        )
+
+    def encode_users(self, user_ids: Sequence[str]) -> np.ndarray:
+        """Map user IDs to training indices (-1 = cold user)"""
+        lookup_many = getattr(self.user2idx, 'lookup_many', None)
+        if lookup_many is not None:
+            return lookup_many(user_ids)
+        lookup = self.user2idx.get
+        return np.fromiter(
+            (lookup(uid, -1) for uid in user_ids),
+            dtype=np.int64,
+            count=len(user_ids),
+        )
+
+    def score_user(
+        self,
+        user_id: str,
+        podcast_ids: Sequence[str],
+        podcast_idx: np.ndarray,
+        candidate_rows: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """Return predicted ratings (float64) aligned with `podcast_ids` (or `candidate_rows`)"""
+        return self.score_users([user_id], podcast_ids, podcast_idx, candidate_rows)[0]
+
+    def score_users(
+        self,
+        user_ids: Sequence[str],
+        podcast_ids: Sequence[str],
+        podcast_idx: np.ndarray,
+        candidate_rows: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """Return a (users x podcasts) float64 rating matrix.
+
+        Pairs where both sides are in the training mappings are scored as one
+        block; everything else uses the content-based scorer. Users with an
+        overlay vector (online fold-in) are scored with it against every known
+        podcast, including users that are not in the mappings.
+
+        `candidate_rows` (sorted positions in `podcast_ids` / `podcast_idx`)
+        restricts scoring to a filtered subset; columns then follow its order.
+        """
+        if candidate_rows is not None:
+            podcast_idx = podcast_idx[candidate_rows]
+        user_idx = self.encode_users(user_ids)
+        scores = np.empty((len(user_ids), len(podcast_idx)), dtype=np.float64)
+        overlaid = self.overlay.projections(user_ids) if self.overlay is not None else {}
+
+        known_rows = np.flatnonzero(user_idx >= 0)
+        if overlaid:
+            known_rows = known_rows[~np.isin(known_rows, list(overlaid))]
+        known_cols = np.flatnonzero(podcast_idx >= 0)
+        if known_rows.size and known_cols.size:
+            scores[np.ix_(known_rows, known_cols)] = self._score_known_block(
+                user_idx[known_rows], podcast_idx[known_cols]
+            )
+        if overlaid and known_cols.size:
+            rows = list(overlaid)
+            scores[np.ix_(rows, known_cols)] = self.model.score_projections(
+                np.stack([overlaid[row] for row in rows]), podcast_idx[known_cols]
+            )
+
+        cold_cols = np.flatnonzero(podcast_idx < 0)
+        for row, uidx in enumerate(user_idx):
+            cols = cold_cols if uidx >= 0 or row in overlaid else np.arange(len(podcast_idx))
+            if cols.size:
+                catalog_cols = cols if candidate_rows is None else candidate_rows[cols]
+                scores[row, cols] = self._score_cold(user_ids[row], podcast_ids, catalog_cols)
+
+        return scores
+
+    def _score_known_block(self, user_idx: np.ndarray, podcast_idx: np.ndarray) -> np.ndarray:
+        # Legacy training-pattern simulation, overwritten below wherever trained weights exist
+        block = self._known_table[(user_idx[:, None] * 7 + podcast_idx[None, :] * 11) % SEED_SPACE]
+        if self.model is not None:
+            rows = np.flatnonzero(user_idx < self.model.num_users)
+            cols = np.flatnonzero(podcast_idx < self.model.num_podcasts)
+            if rows.size and cols.size:
+                block[np.ix_(rows, cols)] = self.model.score_users(user_idx[rows], podcast_idx[cols])
+        return block
+
+    def _score_cold(self, user_id: str, podcast_ids: Sequence[str], cols: np.ndarray) -> np.ndarray:
+        if self.content is not None:
+            # TF-IDF profile từ listened history, score toàn bộ catalog trong một sparse mat-vec
+            history = self.history(user_id) if self.history is not None else ()
+            return self.content.score(self.content.profile(history), podcast_ids)[cols]
+        # Legacy hash() seeding (salted per process) khi không có content index
+        seeds = np.fromiter(
+            (hash(user_id + podcast_ids[i]) % SEED_SPACE for i in cols),
+            dtype=np.int64,
+            count=len(cols),
+        )
+        return self._cold_table[seeds]
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, highest first.
+
+    Uses argpartition (O(n)) instead of a full sort. Ties are broken by
+    position so the result matches a stable descending sort of the catalog.
+    """
+    n = scores.shape[0]
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.int64)
+    if k >= n:
+        return np.argsort(-scores, kind='stable')
+
+    threshold = scores[np.argpartition(-scores, k - 1)[k - 1]]
+    above = np.flatnonzero(scores > threshold)
+    ties = np.flatnonzero(scores == threshold)[:k - len(above)]
+    chosen = np.concatenate([above, ties])
+    return chosen[np.lexsort((chosen, -scores[chosen]))]
+
+
+def top_k_rows(scores: np.ndarray, k: int) -> np.ndarray:
+    """Per-row top-k column indices of a (users x podcasts) matrix, highest first.
+
+    Same argpartition approach as `top_k_indices`, with the whole block
+    selected in one call. Rows whose k-th value is tied with unselected
+    columns are redone with `top_k_indices`, so every row matches the
+    single-user ordering exactly.
+    """
+    num_rows, n = scores.shape
+    k = min(k, n)
+    if k <= 0:
+        return np.empty((num_rows, 0), dtype=np.int64)
+    if k == n:
+        return np.argsort(-scores, axis=1, kind='stable')
+
+    chosen = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    values = np.take_along_axis(scores, chosen, axis=1)
+    order = np.lexsort((chosen, -values), axis=-1)
+    chosen = np.take_along_axis(chosen, order, axis=1)
+
+    threshold = np.take_along_axis(values, order[:, -1:], axis=1)
+    ambiguous = np.flatnonzero(
+        (scores == threshold).sum(axis=1) > (values == threshold).sum(axis=1)
+    )
+    for row in ambiguous:
+        chosen[row] = top_k_indices(scores[row], k)
+    return chosen
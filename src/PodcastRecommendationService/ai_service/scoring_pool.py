@@ -0,0 +1,77 @@
+"""
+SCORING POOL
+Bounded thread pool cho CPU work của recommendation requests (NumPy nhả GIL trong matrix ops),
+để event loop luôn rảnh cho /health, /metrics và I/O; admission limit shed load sớm (503 +
+Retry-After) thay vì để requests xếp hàng và latency tăng không giới hạn
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+
+class OverloadedError(Exception):
+    """Admission limit đã đầy; caller trả 503 với Retry-After"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Scoring pool is saturated, retry after {retry_after:g}s")
+        self.retry_after = retry_after
+
+
+class ScoringPool:
+    """`admit()` giới hạn số requests đang chờ / chạy scoring; `run()` chạy CPU work trên pool.
+
+    Counters chỉ được đọc / ghi trên event loop thread nên không cần lock.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_pending: int = 64, retry_after: float = 1.0):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending  # 0 = không giới hạn
+        self.retry_after = retry_after
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='scoring')
+        self.pending = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    def acquire(self) -> Callable[[], None]:
+        """Admission cho work kéo dài hơn một `with` block (streaming response); trả về release
+        function - gọi nhiều lần chỉ nhả slot một lần"""
+        if self.max_pending and self.pending >= self.max_pending:
+            self.rejected += 1
+            raise OverloadedError(self.retry_after)
+        self.pending += 1
+        self.admitted += 1
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if not released:
+                released = True
+                self.pending -= 1
+
+        return release
+
+    @contextmanager
+    def admit(self) -> Iterator[None]:
+        release = self.acquire()
+        try:
+            yield
+        finally:
+            release()
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,237 @@
+"""
+SHARED STATE (MULTI-WORKER)
+Khi chạy nhiều workers (gunicorn -c gunicorn_conf.py), một worker giữ leader lock: chỉ nó fetch
+catalog từ ContentService và precompute top-K, rồi publish vào SHARED_STATE_DIR (tmpfs);
+workers còn lại đọc bản đã publish. Admin model operations và interaction events được broadcast
+qua cùng thư mục, cùng với metrics snapshot của từng worker (cho /metrics).
+"""
+
+import fcntl
+import json
+import logging
+import os
+import pickle
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LEADER_LOCK_FILE = "leader.lock"
+CATALOG_FILE = "catalog.pkl"
+MODEL_STATE_FILE = "model_state.json"
+TOPK_SUBDIR = "topk"
+LATEST_FILE = "LATEST"
+INTERACTIONS_SUBDIR = "interactions"
+METRICS_SUBDIR = "metrics"
+
+# Interaction events: một segment file mỗi phút, segments cũ hơn retention bị leader xoá
+INTERACTION_SEGMENT_SECONDS = 60
+INTERACTION_RETENTION_SECONDS = 600
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """tmp + rename: readers thấy file cũ hoặc file mới, không bao giờ thấy file ghi dở"""
+    tmp = path.with_name(f".{path.name}.tmp-{os.getpid()}")
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class SharedState:
+    """State dùng chung giữa các workers của cùng một gunicorn master"""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock_fd = None        # type: Optional[int]
+        self._published = None      # catalog store mà worker này (leader) đã publish
+        self._catalog = None        # catalog store đã load từ file
+        self._catalog_key = None    # type: Optional[Tuple[int, int, int]]
+
+    # ------------------------------------------------------------------ #
+    # Leader election
+    # ------------------------------------------------------------------ #
+    @property
+    def is_leader(self) -> bool:
+        return self._lock_fd is not None
+
+    def try_lead(self) -> bool:
+        """Non-blocking flock; kernel nhả lock khi leader chết nên worker khác tiếp quản.
+
+        Chỉ gọi trong worker (sau fork): fd được fork chia sẻ cùng lock.
+        """
+        if self._lock_fd is None:
+            fd = os.open(self.directory / LEADER_LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return False
+            self._lock_fd = fd
+            logger.info(f"👑 Worker {os.getpid()} is the shared-state leader")
+        return True
+
+    def release(self) -> None:
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    @property
+    def role(self) -> str:
+        return "leader" if self.is_leader else "follower"
+
+    # ------------------------------------------------------------------ #
+    # Catalog
+    # ------------------------------------------------------------------ #
+    def publish_catalog(self, store: Any) -> None:
+        """Leader: ghi catalog store (chỉ khi là object mới)"""
+        if store is self._published:
+            return
+        write_atomic(self.directory / CATALOG_FILE, pickle.dumps(store, protocol=pickle.HIGHEST_PROTOCOL))
+        self._published = self._catalog = store
+        self._catalog_key = self._file_key(self.directory / CATALOG_FILE)
+
+    def load_catalog(self) -> Optional[Any]:
+        """Follower: catalog đã publish; trả về đúng object cũ nếu file không đổi"""
+        path = self.directory / CATALOG_FILE
+        if self._file_key(path) == self._catalog_key and self._catalog is not None:
+            return self._catalog
+        try:
+            with open(path, 'rb') as f:
+                key = self._stat_key(os.fstat(f.fileno()))
+                store = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        self._catalog, self._catalog_key = store, key
+        return store
+
+    @classmethod
+    def _file_key(cls, path: Path) -> Optional[Tuple[int, int, int]]:
+        try:
+            return cls._stat_key(path.stat())
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _stat_key(stat: os.stat_result) -> Tuple[int, int, int]:
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    # ------------------------------------------------------------------ #
+    # Precomputed top-K (một thư mục mỗi model fingerprint)
+    # ------------------------------------------------------------------ #
+    def new_topk_dir(self, fingerprint: str) -> Path:
+        return self.directory / TOPK_SUBDIR / fingerprint / str(time.time_ns())
+
+    def commit_topk(self, fingerprint: str, directory: Path) -> None:
+        """Trỏ LATEST vào table vừa build và xoá các bản cũ (mmap đang mở vẫn đọc được)"""
+        root = self.directory / TOPK_SUBDIR / fingerprint
+        write_atomic(root / LATEST_FILE, directory.name.encode())
+        for stale in root.iterdir():
+            if stale.is_dir() and stale.name != directory.name:
+                shutil.rmtree(stale, ignore_errors=True)
+
+    def latest_topk(self, fingerprint: str) -> Optional[Path]:
+        try:
+            name = (self.directory / TOPK_SUBDIR / fingerprint / LATEST_FILE).read_text().strip()
+        except FileNotFoundError:
+            return None
+        return self.directory / TOPK_SUBDIR / fingerprint / name
+
+    def prune_topk(self, live_fingerprints) -> None:
+        root = self.directory / TOPK_SUBDIR
+        if root.exists():
+            for stale in root.iterdir():
+                if stale.name not in live_fingerprints:
+                    shutil.rmtree(stale, ignore_errors=True)
+
+    # ------------------------------------------------------------------ #
+    # Model state (admin reload / promote / rollback)
+    # ------------------------------------------------------------------ #
+    def publish_model_state(self, state: Dict[str, Any]) -> int:
+        seq = time.time_ns()
+        write_atomic(self.directory / MODEL_STATE_FILE, json.dumps(dict(state, seq=seq)).encode())
+        return seq
+
+    def read_model_state(self) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads((self.directory / MODEL_STATE_FILE).read_text())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    # ------------------------------------------------------------------ #
+    # Interaction events (append-only JSON lines, mọi worker đọc)
+    # ------------------------------------------------------------------ #
+    def append_interactions(self, data: bytes) -> None:
+        """O_APPEND một lần write(): lines của các workers không xen vào nhau"""
+        root = self.directory / INTERACTIONS_SUBDIR
+        root.mkdir(exist_ok=True)
+        segment = root / f"{int(time.time()) // INTERACTION_SEGMENT_SECONDS:012d}.jsonl"
+        fd = os.open(segment, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+    def read_interactions(self, cursor: Optional[Tuple[str, int]]) -> Tuple[List[bytes], Optional[Tuple[str, int]]]:
+        """Lines mới sau `cursor` (segment, offset) và cursor mới; chỉ đọc tới newline cuối cùng"""
+        root = self.directory / INTERACTIONS_SUBDIR
+        try:
+            segments = sorted(name for name in os.listdir(root) if name.endswith('.jsonl'))
+        except FileNotFoundError:
+            return [], cursor
+        lines = []
+        for name in segments:
+            if cursor is not None and name < cursor[0]:
+                continue
+            offset = cursor[1] if cursor is not None and name == cursor[0] else 0
+            try:
+                with open(root / name, 'rb') as f:
+                    f.seek(offset)
+                    data = f.read()
+            except FileNotFoundError:
+                continue
+            end = data.rfind(b'\n') + 1
+            lines.extend(data[:end].splitlines())
+            cursor = (name, offset + end)
+        return lines, cursor
+
+    def prune_interactions(self) -> None:
+        root = self.directory / INTERACTIONS_SUBDIR
+        if not root.exists():
+            return
+        oldest = (int(time.time()) - INTERACTION_RETENTION_SECONDS) // INTERACTION_SEGMENT_SECONDS
+        for segment in root.iterdir():
+            if segment.suffix == '.jsonl' and segment.stem.isdigit() and int(segment.stem) < oldest:
+                segment.unlink(missing_ok=True)
+
+    # ------------------------------------------------------------------ #
+    # Per-worker metrics (worker nhận /metrics scrape merge snapshots của các workers khác)
+    # ------------------------------------------------------------------ #
+    def publish_metrics(self, data: bytes) -> None:
+        root = self.directory / METRICS_SUBDIR
+        root.mkdir(exist_ok=True)
+        write_atomic(root / f"{os.getpid()}.json", data)
+
+    def read_worker_metrics(self, max_age: float) -> List[Tuple[str, bytes]]:
+        """(pid, snapshot) của các workers khác; snapshot cũ hơn max_age (worker đã chết) bị xoá"""
+        root = self.directory / METRICS_SUBDIR
+        try:
+            names = os.listdir(root)
+        except FileNotFoundError:
+            return []
+        own = f"{os.getpid()}.json"
+        snapshots = []
+        for name in names:
+            if not name.endswith('.json') or name == own:
+                continue
+            path = root / name
+            try:
+                if time.time() - path.stat().st_mtime > max_age:
+                    path.unlink(missing_ok=True)
+                    continue
+                snapshots.append((name[:-len('.json')], path.read_bytes()))
+            except FileNotFoundError:
+                continue
+        return snapshots
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# ai_service modules are flat (chạy từ ai_service/), không phải một package
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
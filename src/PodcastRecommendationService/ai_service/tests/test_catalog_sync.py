@@ -0,0 +1,85 @@
+"""CatalogSync against an in-process ContentService stub (httpx.MockTransport)"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from catalog_sync import MAX_PAGES, CatalogSync, CatalogSyncError
+
+BASE_URL = "http://content-service"
+
+
+def make_podcasts(count):
+    return [{'id': f'podcast-{i}', 'title': f'Podcast {i}', 'duration': '00:10:00'} for i in range(count)]
+
+
+def run_sync(handler, page_size=10):
+    requests = []
+
+    def record(request):
+        requests.append(request)
+        return handler(request)
+
+    async def sync():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(record))
+        try:
+            engine = CatalogSync(BASE_URL, page_size=page_size, client=client)
+            return await asyncio.wait_for(engine.sync(), 5)
+        finally:
+            await client.aclose()
+
+    return asyncio.run(sync()), requests
+
+
+def page_of(request, podcasts):
+    page, size = int(request.url.params['page']), int(request.url.params['pageSize'])
+    return podcasts[(page - 1) * size:page * size]
+
+
+def test_walks_pages_without_total_count():
+    podcasts = make_podcasts(25)
+    store, requests = run_sync(lambda request: httpx.Response(200, json={'podcasts': page_of(request, podcasts)}))
+    assert store.podcast_ids == tuple(p['id'] for p in podcasts)
+    assert len(requests) == 3
+
+
+def test_stops_when_server_ignores_page():
+    podcasts = make_podcasts(25)
+    store, requests = run_sync(lambda request: httpx.Response(200, json={'podcasts': podcasts}))
+    assert store.podcast_ids == tuple(p['id'] for p in podcasts)
+    assert len(requests) == 2
+
+
+def test_stops_when_pages_repeat_known_ids():
+    podcasts = make_podcasts(20)
+
+    def handler(request):
+        # Page 3+ lặp lại page 1 nhưng khác body (field thứ tự khác) -> fingerprint khác, không có ID mới
+        page = int(request.url.params['page'])
+        items = page_of(request, podcasts) if page <= 2 else [dict(reversed(list(p.items()))) for p in podcasts[:10]]
+        return httpx.Response(200, json={'podcasts': items})
+
+    store, requests = run_sync(handler)
+    assert len(store) == 20
+    assert len(requests) == 3
+
+
+def test_bare_list_is_a_single_unpaged_response():
+    podcasts = make_podcasts(25)
+    store, requests = run_sync(lambda request: httpx.Response(200, content=json.dumps(podcasts)))
+    assert len(store) == 25
+    assert len(requests) == 1
+
+
+def test_page_cap():
+    def handler(request):
+        page = int(request.url.params['page'])
+        return httpx.Response(200, json={'podcasts': [{'id': f'podcast-{page}'}]})
+
+    with pytest.raises(CatalogSyncError):
+        run_sync(handler, page_size=1)
+
+    with pytest.raises(CatalogSyncError):
+        run_sync(lambda request: httpx.Response(200, json={'podcasts': [], 'totalCount': (MAX_PAGES + 1) * 10}))
@@ -0,0 +1,216 @@
+"""
+PRECOMPUTED TOP-K TABLE
+Top-K podcasts (int32 candidate indices + float16 ratings) cho mọi known user trong mappings,
+tính offline sau mỗi model load / catalog refresh và serve bằng memory-mapped .npy files
+"""
+
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from scoring import ScoringEngine, top_k_rows
+
+logger = logging.getLogger(__name__)
+
+INDICES_FILE = "topk_indices.npy"
+SCORES_FILE = "topk_scores.npy"
+META_FILE = "topk_meta.json"
+
+
+class TopKTable:
+    """Row r = user có encoded index r; cột = candidate index trong `podcast_ids`, score giảm dần"""
+
+    def __init__(
+        self,
+        indices: np.ndarray,
+        scores: np.ndarray,
+        podcast_ids: Tuple[str, ...],
+        catalog_version: int,
+        model_version: int,
+        duration_seconds: float = 0.0,
+    ):
+        self.indices = indices
+        self.scores = scores
+        self.podcast_ids = podcast_ids
+        self.catalog_version = catalog_version
+        self.model_version = model_version
+        self.duration_seconds = duration_seconds
+        self.directory = None    # type: Optional[Path]  # set by `load`
+        # (catalog podcast_ids, table column -> catalog row); một tuple để scoring threads đọc nhất quán
+        self._remap = None       # type: Optional[Tuple[Tuple[str, ...], np.ndarray]]
+
+    @property
+    def num_users(self) -> int:
+        return self.indices.shape[0]
+
+    @property
+    def k(self) -> int:
+        return self.indices.shape[1]
+
+    def stats(self) -> dict:
+        return {
+            "users": self.num_users,
+            "k": self.k,
+            "catalog_version": self.catalog_version,
+            "model_version": self.model_version,
+            "duration_seconds": round(self.duration_seconds, 3),
+        }
+
+    def lookup(self, user_index: int, n: int, podcast_ids: Tuple[str, ...]) -> Optional[Tuple[np.ndarray, List[float]]]:
+        """(candidate indices, ratings) của top n cho catalog `podcast_ids`, hoặc None nếu phải score online.
+
+        Table được build trên catalog cũ hơn thì chỉ giữ podcasts vẫn còn trong catalog
+        hiện tại (live-catalog filter); podcasts mới chỉ xuất hiện sau lần precompute kế tiếp.
+        """
+        if not 0 <= user_index < self.num_users:
+            return None
+        cols = np.asarray(self.indices[user_index], dtype=np.int64)
+        scores = self.scores[user_index]
+
+        if podcast_ids is not self.podcast_ids and podcast_ids != self.podcast_ids:
+            remapped = self._remap_to(podcast_ids)[cols]
+            live = remapped >= 0
+            cols, scores = remapped[live], scores[live]
+
+        if len(cols) < n and len(cols) < len(podcast_ids):
+            return None
+        # float16 giữ đủ độ chính xác để round về đúng rating 2 chữ số thập phân
+        return cols[:n], [round(float(s), 2) for s in scores[:n]]
+
+    def _remap_to(self, podcast_ids: Tuple[str, ...]) -> np.ndarray:
+        cached = self._remap
+        if cached is not None and cached[0] is podcast_ids:
+            return cached[1]
+        rows = {pid: i for i, pid in enumerate(podcast_ids)}
+        remap = np.fromiter((rows.get(pid, -1) for pid in self.podcast_ids),
+                            dtype=np.int64, count=len(self.podcast_ids))
+        self._remap = (podcast_ids, remap)
+        return remap
+
+    def save(self, directory: Path) -> None:
+        """Ghi atomically (tmp + rename); readers đang mmap file cũ không bị ảnh hưởng"""
+        directory.mkdir(parents=True, exist_ok=True)
+        meta = {
+            "catalog_version": self.catalog_version,
+            "model_version": self.model_version,
+            "k": self.k,
+            "num_users": self.num_users,
+            "duration_seconds": self.duration_seconds,
+            "podcast_ids": list(self.podcast_ids),
+        }
+        for name, array in ((INDICES_FILE, self.indices), (SCORES_FILE, self.scores)):
+            tmp = directory / f".{name}.tmp"
+            with open(tmp, 'wb') as f:
+                np.save(f, array)
+            os.replace(tmp, directory / name)
+        tmp = directory / f".{META_FILE}.tmp"
+        tmp.write_text(json.dumps(meta))
+        os.replace(tmp, directory / META_FILE)
+
+    @classmethod
+    def load(cls, directory: Path) -> "TopKTable":
+        meta = json.loads((directory / META_FILE).read_text())
+        table = cls(
+            np.load(directory / INDICES_FILE, mmap_mode='r'),
+            np.load(directory / SCORES_FILE, mmap_mode='r'),
+            tuple(meta['podcast_ids']),
+            meta['catalog_version'],
+            meta['model_version'],
+            meta.get('duration_seconds', 0.0),
+        )
+        table.directory = directory
+        return table
+
+
+def known_user_ids(user2idx: Mapping[str, int]) -> List[str]:
+    """User IDs theo thứ tự encoded index (row của table)"""
+    if hasattr(user2idx, 'ids_by_index'):
+        return user2idx.ids_by_index()  # memory-mapped IdIndex
+    user_ids = [None] * len(user2idx)  # type: List[Optional[str]]
+    for user_id, idx in user2idx.items():
+        user_ids[idx] = user_id
+    return user_ids
+
+
+def _score_block(
+    engine: ScoringEngine,
+    block_users: Sequence[str],
+    podcast_ids: Sequence[str],
+    podcast_idx: np.ndarray,
+    k: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    # Cùng rounding + tie-break như online path
+    scores = np.round(engine.score_users(block_users, podcast_ids, podcast_idx), 2)
+    top = top_k_rows(scores, k)
+    return top.astype(np.int32), np.take_along_axis(scores, top, axis=1).astype(np.float16)
+
+
+def precompute_topk(
+    engine: ScoringEngine,
+    user_ids: Sequence[str],
+    podcast_ids: Sequence[str],
+    podcast_idx: np.ndarray,
+    k: int = 100,
+    workers: Optional[int] = None,
+    block_cells: int = 1_000_000,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-k (indices int32, scores float16) cho từng user, song song qua worker threads.
+
+    Threads (không fork): matmul của NumPy nhả GIL, và fork từ process đã có nhiều threads
+    (scoring pool, interaction consumer, ...) có thể để child giữ một lock không bao giờ được nhả.
+    """
+    k = min(k, len(podcast_ids))
+    workers = max(1, workers or os.cpu_count() or 1)
+    # Block nhỏ đủ để chia đều cho workers, nhưng không vượt block_cells ô mỗi block
+    users_per_block = max(1, min(block_cells // max(1, len(podcast_ids)), -(-len(user_ids) // (workers * 4))))
+    indices = np.empty((len(user_ids), k), dtype=np.int32)
+    scores = np.empty((len(user_ids), k), dtype=np.float16)
+    user_ids = list(user_ids)
+    starts = list(range(0, len(user_ids), users_per_block))
+
+    def score(start: int) -> None:
+        block_indices, block_scores = _score_block(engine, user_ids[start:start + users_per_block],
+                                                   podcast_ids, podcast_idx, k)
+        indices[start:start + len(block_indices)] = block_indices
+        scores[start:start + len(block_scores)] = block_scores
+
+    workers = min(workers, len(starts))
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='topk') as pool:
+            # list(): re-raise exception đầu tiên của một block
+            list(pool.map(score, starts))
+    else:
+        for start in starts:
+            score(start)
+    return indices, scores
+
+
+def build_topk_table(
+    engine: ScoringEngine,
+    podcast_ids: Tuple[str, ...],
+    podcast_idx: np.ndarray,
+    catalog_version: int,
+    model_version: int,
+    directory: Path,
+    k: int = 100,
+    workers: Optional[int] = None,
+    block_cells: int = 1_000_000,
+) -> TopKTable:
+    """Precompute cho mọi known user, ghi ra `directory` và trả về bản memory-mapped"""
+    started = time.perf_counter()
+    user_ids = known_user_ids(engine.user2idx)
+    indices, scores = precompute_topk(engine, user_ids, podcast_ids, podcast_idx, k, workers, block_cells)
+    duration = time.perf_counter() - started
+
+    TopKTable(indices, scores, podcast_ids, catalog_version, model_version, duration).save(directory)
+    table = TopKTable.load(directory)
+    table.podcast_ids = podcast_ids  # same tuple object as the snapshot -> identity check in lookup
+    logger.info(f"📊 Precomputed top-{table.k} for {table.num_users} users x {len(podcast_ids)} podcasts "
+                f"in {duration:.2f}s (catalog v{catalog_version}, model v{model_version})")
+    return table
@@ -0,0 +1,276 @@
+"""
+UPSTREAM HTTP CLIENT
+Một pooled httpx client dùng chung (app lifespan) cho mọi upstream call (ContentService, UserService):
+connection pool + keep-alive, per-endpoint timeouts, jittered retries cho GET, retry budget,
+circuit breaker per service và latency/pool stats
+"""
+
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Status codes worth retrying for idempotent GETs
+RETRYABLE_STATUS = {429, 502, 503, 504}
+
+# Latency samples kept per endpoint for percentile stats
+LATENCY_WINDOW = 1024
+
+
+class CircuitOpenError(httpx.HTTPError):
+    """Upstream circuit is open: fail fast, caller should serve last good data"""
+
+
+@dataclass(frozen=True)
+class EndpointPolicy:
+    """Timeouts + retry settings cho một upstream endpoint"""
+    connect_timeout: float = 2.0
+    read_timeout: float = 10.0
+    retries: int = 2
+    backoff_base: float = 0.2
+    backoff_max: float = 2.0
+
+    @property
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """closed -> open sau N lỗi liên tiếp; half-open cho một probe request sau reset_timeout"""
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+        if self.state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def release_probe(self) -> None:
+        """Probe kết thúc (kể cả cancelled / exception khác): half-open cho probe kế tiếp"""
+        self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+class RetryBudget:
+    """Retries chỉ được phép khi còn budget: mỗi request nạp `ratio` token, mỗi retry tốn 1"""
+
+    def __init__(self, ratio: float = 0.2, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+
+    def deposit(self) -> None:
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+class EndpointStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.short_circuited = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)  # type: Deque[float]
+
+    def as_dict(self) -> Dict[str, Any]:
+        samples = sorted(self.latencies)
+
+        def percentile(q: float) -> Optional[float]:
+            if not samples:
+                return None
+            return round(samples[min(len(samples) - 1, int(q * len(samples)))] * 1000, 2)
+
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "short_circuited": self.short_circuited,
+            "latency_ms": {"p50": percentile(0.50), "p95": percentile(0.95), "p99": percentile(0.99)},
+        }
+
+
+class Endpoint:
+    """Một upstream endpoint: GET với policy, retry budget và circuit breaker của service"""
+
+    def __init__(self, upstream: "UpstreamClient", service: str, name: str, policy: EndpointPolicy):
+        self.upstream = upstream
+        self.service = service
+        self.name = name
+        self.policy = policy
+        self.stats = EndpointStats()
+
+    async def get(self, url: str, params: Optional[Dict[str, Any]] = None,
+                  headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        breaker = self.upstream.breaker(self.service)
+        budget = self.upstream.retry_budget(self.service)
+        budget.deposit()
+        attempt = 0
+
+        while True:
+            if not breaker.allow():
+                self.stats.short_circuited += 1
+                raise CircuitOpenError(f"{self.service} circuit open")
+
+            self.stats.requests += 1
+            started = time.perf_counter()
+            self.upstream.in_flight += 1
+            try:
+                response = await self.upstream.client.get(url, params=params, headers=headers, timeout=self.policy.timeout)
+                error = None  # type: Optional[Exception]
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                response, error = None, e
+            finally:
+                self.upstream.in_flight -= 1
+                self.stats.latencies.append(time.perf_counter() - started)
+                # Không có await giữa đây và record_*: không request nào khác lọt vào như probe thứ hai
+                breaker.release_probe()
+
+            failed = error is not None or response.status_code >= 500 or response.status_code == 429
+            if failed:
+                self.stats.errors += 1
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+                return response
+
+            retryable = error is not None or response.status_code in RETRYABLE_STATUS
+            # Breaker vừa open -> không retry vào upstream đang lỗi, trả lỗi thật cho caller
+            if (not retryable or attempt >= self.policy.retries or breaker.state == CircuitBreaker.OPEN
+                    or not budget.withdraw()):
+                if error is not None:
+                    raise error
+                return response
+
+            self.stats.retries += 1
+            await asyncio.sleep(self.policy.backoff(attempt))
+            attempt += 1
+
+
+class UpstreamClient:
+    """Shared pooled client; tạo trong app lifespan, dùng chung cho mọi upstream endpoint"""
+
+    def __init__(
+        self,
+        max_connections: int = 50,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._transport = transport
+        self._client = None       # type: Optional[httpx.AsyncClient]
+        self._breakers = {}       # type: Dict[str, CircuitBreaker]
+        self._budgets = {}        # type: Dict[str, RetryBudget]
+        self._endpoints = {}      # type: Dict[str, Endpoint]
+        self.in_flight = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(limits=self.limits, transport=self._transport)
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def breaker(self, service: str) -> CircuitBreaker:
+        if service not in self._breakers:
+            self._breakers[service] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+        return self._breakers[service]
+
+    def retry_budget(self, service: str) -> RetryBudget:
+        if service not in self._budgets:
+            self._budgets[service] = RetryBudget()
+        return self._budgets[service]
+
+    def endpoint(self, service: str, name: str, policy: Optional[EndpointPolicy] = None) -> Endpoint:
+        key = f"{service}.{name}"
+        if key not in self._endpoints:
+            self._endpoints[key] = Endpoint(self, service, name, policy or EndpointPolicy())
+        return self._endpoints[key]
+
+    def endpoints(self) -> List[Endpoint]:
+        return list(self._endpoints.values())
+
+    def pool_stats(self) -> Dict[str, Any]:
+        stats = {
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "in_flight_requests": self.in_flight,
+        }
+        # httpcore connection pool internals: best effort, not a public API
+        try:
+            connections = self._client._transport._pool.connections if self._client is not None else []
+            stats["open_connections"] = len(connections)
+            stats["idle_connections"] = sum(1 for c in connections if c.is_idle())
+        except AttributeError:
+            pass
+        return stats
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pool": self.pool_stats(),
+            "breakers": {
+                service: {
+                    "state": breaker.state,
+                    "consecutive_failures": breaker.consecutive_failures,
+                    "times_opened": breaker.times_opened,
+                }
+                for service, breaker in self._breakers.items()
+            },
+            "endpoints": {key: endpoint.stats.as_dict() for key, endpoint in self._endpoints.items()},
+        }